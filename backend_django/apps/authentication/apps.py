@@ -8,3 +8,6 @@ class AuthenticationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.authentication'
     verbose_name = 'Authentication'
+
+    def ready(self):
+        from . import signals  # noqa: F401
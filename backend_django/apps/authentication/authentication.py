@@ -0,0 +1,52 @@
+"""
+JWT authentication with a per-user cache
+
+JWTAuthentication loads the user row on every request. CachedJWTAuthentication
+keeps the loaded user in the default cache for JWT_USER_CACHE_SECONDS, keyed
+by user id, so parallel SPA calls authenticate without a query. Saving or
+deleting a user drops the entry (apps.authentication.signals), so role,
+profile and is_active changes apply on the next request - in every worker
+only if they share the cache, so settings keep it off without CACHE_SHARED.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+CACHE_KEY = 'jwt-user:{}'
+
+
+def user_cache_key(user_id):
+    return CACHE_KEY.format(user_id)
+
+
+def invalidate_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        timeout = getattr(settings, 'JWT_USER_CACHE_SECONDS', 0)
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if not timeout or user_id is None:
+            return super().get_user(validated_token)
+
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            # Loads the user and checks is_active / revoked tokens
+            user = super().get_user(validated_token)
+            cache.set(key, user, timeout)
+            return user
+
+        # Only active users are cached and saves invalidate, but keep the checks of get_user
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        return user
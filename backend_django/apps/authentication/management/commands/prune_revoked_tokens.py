@@ -0,0 +1,63 @@
+"""
+Management command to delete revoked refresh tokens that have expired.
+An expired token is rejected on its own, so its RevokedToken row is no longer
+needed. Rows are deleted in batches of primary keys taken from the
+expires_at index, each batch in its own short transaction, so the job never
+holds long locks on the table.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from apps.authentication.models import RevokedToken
+
+
+class Command(BaseCommand):
+    help = 'Delete expired revoked refresh tokens in batches and report the table size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows deleted per transaction (default 5000)')
+        parser.add_argument('--sleep', type=float, default=0.1, help='Seconds to pause between batches (default 0.1)')
+        parser.add_argument('--dry-run', action='store_true', help='Count expired rows without deleting them')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        expired = RevokedToken.objects.filter(expires_at__lt=now)
+        self.report('Before')
+
+        if options['dry_run']:
+            self.stdout.write(f'Would delete {expired.count()} expired revoked token(s)')
+            return
+
+        db = router.db_for_write(RevokedToken)
+        deleted = 0
+        while True:
+            with transaction.atomic(using=db):
+                batch = list(expired.order_by('expires_at').values_list('jti', flat=True)[:options['batch_size']])
+                if not batch:
+                    break
+                deleted += RevokedToken.objects.filter(jti__in=batch).delete()[0]
+            if len(batch) < options['batch_size']:
+                break
+            time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired revoked token(s)'))
+        self.report('After')
+
+    def report(self, label):
+        """Row count and (PostgreSQL) on-disk size of the revoked token table"""
+        table = RevokedToken._meta.db_table
+        connection = connections[router.db_for_write(RevokedToken)]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # Planner estimate: an exact count scans the whole table
+                cursor.execute(
+                    'SELECT reltuples::bigint, pg_total_relation_size(oid) FROM pg_class WHERE oid = %s::regclass',
+                    [table],
+                )
+                rows, size = cursor.fetchone()
+            self.stdout.write(f'{label}: {table} ~{max(rows, 0)} row(s), {size} bytes (table + indexes)')
+        else:
+            self.stdout.write(f'{label}: {table} {RevokedToken.objects.count()} row(s)')
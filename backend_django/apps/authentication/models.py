@@ -103,3 +103,23 @@ class User(AbstractBaseUser, PermissionsMixin):
     @property
     def is_merchandiser(self):
         return self.role in ['admin', 'manager', 'merchandiser']
+
+
+class RevokedToken(models.Model):
+    """
+    Revoked refresh token (logout, or replaced by rotation), keyed by its jti.
+
+    Only the jti and expiry are kept: the revocation check is a primary key
+    lookup, and rows can be deleted once the token would have expired anyway
+    (see the prune_revoked_tokens command).
+    """
+    jti = models.CharField(max_length=64, primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = 'revoked_tokens'
+        verbose_name = 'Revoked token'
+        verbose_name_plural = 'Revoked tokens'
+
+    def __str__(self):
+        return self.jti
@@ -3,7 +3,9 @@ Authentication serializers
 """
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 from .models import User
+from .tokens import RevocableRefreshToken
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -268,3 +270,8 @@ class DeleteAccountSerializer(serializers.Serializer):
         if value.lower() != 'delete my account':
             raise serializers.ValidationError("Please type 'delete my account' to confirm.")
         return value
+
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    """Token refresh that rejects revoked refresh tokens and revokes rotated ones"""
+    token_class = RevocableRefreshToken
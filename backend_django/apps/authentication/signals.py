@@ -0,0 +1,21 @@
+"""
+Authentication signal handlers
+
+Drop a user's cached JWT resolution (apps.authentication.authentication)
+whenever the user row changes. QuerySet.update() sends no signals; callers
+updating users in bulk must call invalidate_user themselves.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_user
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+    # Again after commit: a request may re-cache the old row before the transaction commits
+    transaction.on_commit(lambda: invalidate_user(instance.pk))
@@ -0,0 +1,32 @@
+"""
+Refresh tokens revoked through the RevokedToken table
+
+simplejwt's token_blacklist app keeps every issued refresh token (full token
+text) in an outstanding table. RevocableRefreshToken only records the tokens
+that are revoked, by jti, and checks that table whenever a refresh token is
+verified. The method names match simplejwt's BlacklistMixin, so
+BLACKLIST_AFTER_ROTATION revokes the replaced token on refresh.
+"""
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .models import RevokedToken
+
+
+class RevocableRefreshToken(RefreshToken):
+    def verify(self, *args, **kwargs):
+        self.check_blacklist()
+        super().verify(*args, **kwargs)
+
+    def check_blacklist(self):
+        if RevokedToken.objects.filter(jti=self[api_settings.JTI_CLAIM]).exists():
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        RevokedToken.objects.get_or_create(
+            jti=self[api_settings.JTI_CLAIM],
+            defaults={'expires_at': datetime_from_epoch(self['exp'])},
+        )
@@ -0,0 +1,76 @@
+"""
+Per-request user details
+
+Order responses embed the same handful of users (merchandiser, creator,
+whoever changed an approval or wrote a log entry) once per order or row.
+format_user() formats each user once per request through an identity map
+kept for the request by UserDetailsMixin.
+
+With ?users=ref (or an X-User-Details: ref header) embedded details and
+names are left out (null) - the row keeps the user's id - and the response
+carries each user once:
+
+    {"data": <the usual payload>, "users": {"<user id>": {"id": ..., "fullName": ..., ...}}}
+
+Outside a UserDetailsMixin view format_user() formats directly and details
+are always embedded.
+"""
+import threading
+
+from rest_framework.response import Response
+
+_state = threading.local()
+
+
+def _format(user):
+    return {
+        'id': str(user.id),
+        'email': user.email,
+        'fullName': user.full_name,
+        'role': user.role,
+        'phone': user.phone,
+        'department': user.department,
+        'isActive': user.is_active,
+    }
+
+
+def format_user(user):
+    """camelCase details of `user` (None for no user), formatted once per request"""
+    if user is None:
+        return None
+    users = getattr(_state, 'users', None)
+    if users is None:
+        return _format(user)
+    key = str(user.pk)
+    if key not in users:
+        users[key] = _format(user)
+    return users[key]
+
+
+def by_reference():
+    """Whether this response references users by id (?users=ref)"""
+    return getattr(_state, 'by_reference', False)
+
+
+def embed(user):
+    """Details to embed for `user`: None when referencing by id (the user goes in the users table)"""
+    details = format_user(user)
+    return None if by_reference() else details
+
+
+class UserDetailsMixin:
+    """ViewSet mixin: per-request user identity map and the ?users=ref response shape"""
+
+    def dispatch(self, request, *args, **kwargs):
+        previous = (getattr(_state, 'users', None), getattr(_state, 'by_reference', False))
+        mode = request.GET.get('users') or request.headers.get('X-User-Details')
+        _state.users, _state.by_reference = {}, (mode or '').strip().lower() == 'ref'
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _state.users, _state.by_reference = previous
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if by_reference() and isinstance(response, Response) and not response.exception and response.data is not None:
+            response.data = {'data': response.data, 'users': dict(_state.users)}
+        return super().finalize_response(request, response, *args, **kwargs)
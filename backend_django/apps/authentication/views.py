@@ -8,6 +8,7 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.contrib.auth import get_user_model
+from .tokens import RevocableRefreshToken
 from .serializers import (
     UserSerializer,
     UserListSerializer,
@@ -182,7 +183,7 @@ class LogoutView(APIView):
         try:
             refresh_token = request.data.get('refresh_token')
             if refresh_token:
-                token = RefreshToken(refresh_token)
+                token = RevocableRefreshToken(refresh_token)
                 token.blacklist()
                 return Response({
                     'message': 'Logout successful'
@@ -0,0 +1,123 @@
+"""
+Read replica routing
+
+When REPLICA_DATABASE_URL is set, settings add a `replica` database alias.
+Reads made inside replica_reads() - the reporting and read-only endpoints
+marked with @use_replica or listed in a viewset's `replica_actions` - go to
+the replica; everything else uses `default`.
+
+Reads stay on `default` after the first write in the block (so a request
+reads its own writes) and inside transactions on `default`. Writes always go
+to `default`. A user who just made a write request is pinned to `default`
+for REPLICA_PIN_SECONDS (ReplicaPinningMiddleware), so the next page load
+does not miss it to replication lag. Pins live in the default cache, so
+every worker must see them: without a shared cache (CACHE_SHARED) reads stay
+on `default`. Without a replica the router is a no-op.
+"""
+import threading
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = 'replica'
+PIN_KEY = 'replica-pin:{}'
+
+_state = threading.local()
+
+
+def replica_configured():
+    return REPLICA in connections.databases
+
+
+def replica_reads_enabled():
+    """Whether requests may read from the replica: it is configured and pins reach every worker"""
+    return replica_configured() and settings.CACHE_SHARED
+
+
+def pin_to_primary(user_id):
+    cache.set(PIN_KEY.format(user_id), True, getattr(settings, 'REPLICA_PIN_SECONDS', 5))
+
+
+def _pinned(request):
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_authenticated and cache.get(PIN_KEY.format(user.pk)))
+
+
+@contextmanager
+def replica_reads():
+    """Route reads to the replica inside the block, until its first write"""
+    previous = (getattr(_state, 'active', False), getattr(_state, 'wrote', False))
+    _state.active, _state.wrote = True, False
+    try:
+        yield
+    finally:
+        _state.active, _state.wrote = previous
+
+
+def replica_reads_for(request):
+    """replica_reads() for a request, unless replica reads are off or the user is pinned to default"""
+    if not replica_reads_enabled() or _pinned(request):
+        return nullcontext()
+    return replica_reads()
+
+
+def use_replica(view):
+    """
+    View decorator (function views and view methods): run the view body under
+    replica_reads(). Place it below @api_view so authentication runs first.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        request = next(arg for arg in args if hasattr(arg, 'META'))
+        with replica_reads_for(request):
+            return view(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaReadsMixin:
+    """ViewSet mixin: actions named in `replica_actions` read from the replica"""
+    replica_actions = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        self._replica_reads = None
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self._replica_reads is not None:
+                self._replica_reads.__exit__(None, None, None)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in self.replica_actions:
+            # Entered after authentication and permission checks, left in dispatch
+            self._replica_reads = replica_reads_for(request)
+            self._replica_reads.__enter__()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (
+            getattr(_state, 'active', False)
+            and not getattr(_state, 'wrote', False)
+            and replica_configured()
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return REPLICA
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if getattr(_state, 'active', False):
+            # Read-after-write: the rest of the block reads from default
+            _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is migrated through replication
+        return db != REPLICA
@@ -0,0 +1,112 @@
+"""
+Management command to delete expired files under MEDIA_ROOT.
+A file is expired when no FileField/ImageField row references it and it is
+older than the retention window (e.g. files left behind by deleted orders or
+replaced profile pictures). Only applies to local file storage; R2 objects
+are not touched.
+"""
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import models
+
+from apps.core.utils import is_r2_storage_enabled
+
+
+class Command(BaseCommand):
+    help = 'Delete unreferenced files under MEDIA_ROOT older than the retention window'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.MEDIA_CLEANUP_MAX_AGE_DAYS,
+            help='Only delete files not modified for this many days (default: MEDIA_CLEANUP_MAX_AGE_DAYS)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Delete even when the database references no files at all',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List files that would be deleted without deleting them',
+        )
+
+    def handle(self, *args, **options):
+        if is_r2_storage_enabled():
+            self.stdout.write('R2 storage is enabled - nothing to clean under MEDIA_ROOT')
+            return
+
+        media_root = settings.MEDIA_ROOT
+        if not os.path.isdir(media_root):
+            self.stdout.write(f'{media_root} does not exist - nothing to clean')
+            return
+
+        referenced = self._referenced_files()
+        if not referenced and not options['force']:
+            # Usually means DATABASE_URL points at the wrong (e.g. empty) database
+            self.stdout.write(
+                self.style.WARNING('No files are referenced in the database - skipping cleanup (use --force to override)')
+            )
+            return
+
+        cutoff = time.time() - options['days'] * 86400
+        dry_run = options['dry_run']
+        deleted_count = 0
+        deleted_bytes = 0
+
+        for dirpath, dirnames, filenames in os.walk(media_root, topdown=False):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                relative = os.path.relpath(path, media_root).replace(os.sep, '/')
+                if relative in referenced:
+                    continue
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if stat.st_mtime > cutoff:
+                    continue
+
+                deleted_count += 1
+                deleted_bytes += stat.st_size
+                if dry_run:
+                    self.stdout.write(f'Would delete {relative}')
+                    continue
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    self.stderr.write(f'Could not delete {relative}: {e}')
+
+            # Remove directories emptied by the cleanup (never MEDIA_ROOT itself)
+            if not dry_run and dirpath != media_root:
+                try:
+                    os.rmdir(dirpath)
+                except OSError:
+                    pass  # Not empty
+
+        action = 'Would delete' if dry_run else 'Deleted'
+        self.stdout.write(
+            self.style.SUCCESS(f'{action} {deleted_count} expired file(s), {deleted_bytes} bytes')
+        )
+
+    def _referenced_files(self):
+        """Names of all files referenced by any FileField/ImageField in the database"""
+        referenced = set()
+        for model in apps.get_models():
+            for field in model._meta.concrete_fields:
+                if isinstance(field, models.FileField):
+                    names = (
+                        model._default_manager
+                        .exclude(**{field.name: ''})
+                        .exclude(**{f'{field.name}__isnull': True})
+                        .values_list(field.name, flat=True)
+                        .iterator()
+                    )
+                    referenced.update(names)
+        return referenced
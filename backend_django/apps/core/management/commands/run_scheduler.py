@@ -0,0 +1,75 @@
+"""
+Management command to run periodic jobs in one long-lived process.
+Replaces external cron entries for check_etd_reminders, check_eta_alerts and
+media cleanup. Safe to run in several containers: each job run is guarded
+by a database lease (see apps.core.scheduler).
+"""
+import signal
+
+from django.core.management.base import BaseCommand
+
+from apps.core.models import JobLease
+from apps.core.scheduler import Scheduler, get_default_jobs
+
+
+class Command(BaseCommand):
+    help = 'Run the in-process periodic job scheduler'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run all due jobs once and exit',
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='List registered jobs with their recorded runtime metrics and exit',
+        )
+        parser.add_argument(
+            '--poll-seconds',
+            type=int,
+            default=None,
+            help='Seconds between polls for due jobs (default: SCHEDULER_POLL_SECONDS)',
+        )
+
+    def handle(self, *args, **options):
+        jobs = get_default_jobs()
+
+        if options['list']:
+            self._list_jobs(jobs)
+            return
+
+        scheduler = Scheduler(jobs, poll_seconds=options['poll_seconds'])
+
+        if options['once']:
+            ran = scheduler.run_pending()
+            self.stdout.write(
+                self.style.SUCCESS(f"Ran {len(ran)} job(s): {', '.join(ran) or 'none due'}")
+            )
+            return
+
+        signal.signal(signal.SIGTERM, scheduler.stop)
+        signal.signal(signal.SIGINT, scheduler.stop)
+
+        self.stdout.write(self.style.SUCCESS(f'Scheduler {scheduler.owner} started'))
+        for job in jobs:
+            self.stdout.write(f'  {job.name}: every {job.interval_seconds}s - {job.description}')
+        scheduler.run_forever()
+
+    def _list_jobs(self, jobs):
+        leases = {lease.name: lease for lease in JobLease.objects.filter(name__in=[job.name for job in jobs])}
+        for job in jobs:
+            lease = leases.get(job.name)
+            if lease is None:
+                self.stdout.write(f'{job.name}: every {job.interval_seconds}s, never run')
+                continue
+            average = lease.average_duration_ms
+            self.stdout.write(
+                f'{job.name}: every {job.interval_seconds}s, '
+                f'runs={lease.run_count} failures={lease.failure_count} '
+                f'last={lease.last_status or "-"} in {lease.last_duration_ms if lease.last_duration_ms is not None else "-"}ms '
+                f'avg={f"{average:.0f}ms" if average is not None else "-"} '
+                f'next={lease.next_run_at.isoformat() if lease.next_run_at else "-"} '
+                f'held_by={lease.owner if lease.lease_expires_at else "-"}'
+            )
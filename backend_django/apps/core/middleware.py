@@ -0,0 +1,219 @@
+"""
+Core middleware
+"""
+import cProfile
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from . import db_routing, profiling
+
+logger = logging.getLogger('apps.request_metrics')
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper collecting query count, time and SQL statements
+    for one request (see django.db.connection.execute_wrapper).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        self.statement_time = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            # Statements are grouped by SQL text (parameters are placeholders)
+            self.statements[sql] += 1
+            self.statement_time[sql] += elapsed
+
+    @property
+    def duplicates(self):
+        """Queries that repeat a statement already run in this request"""
+        return self.count - len(self.statements)
+
+    def top_repeated(self, limit):
+        return [(sql, count) for sql, count in self.statements.most_common(limit) if count > 1]
+
+
+def view_name(request):
+    """Resolved view as 'ViewSet.action' (or function name), '-' when unresolved"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '-'
+    view = match.func
+    view_class = getattr(view, 'cls', None) or getattr(view, 'view_class', None)
+    if view_class is None:
+        return getattr(view, '__name__', match.view_name or '-')
+    action = (getattr(view, 'actions', None) or {}).get(request.method.lower())
+    return f'{view_class.__name__}.{action}' if action else view_class.__name__
+
+
+class RequestMetricsMiddleware:
+    """
+    Records wall time, database time, query count and duplicate query count
+    for every request.
+
+    - Adds a Server-Timing header (visible in the browser's network panel)
+    - Logs one line per request to the 'apps.request_metrics' logger
+    - Requests over REQUEST_METRICS_SLOW_MS, REQUEST_METRICS_MAX_QUERIES or
+      REQUEST_METRICS_MAX_DUPLICATES are logged as warnings with their most
+      repeated SQL statements
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'REQUEST_METRICS_ENABLED', True)
+        self.slow_ms = getattr(settings, 'REQUEST_METRICS_SLOW_MS', 1000)
+        self.max_queries = getattr(settings, 'REQUEST_METRICS_MAX_QUERIES', 50)
+        self.max_duplicates = getattr(settings, 'REQUEST_METRICS_MAX_DUPLICATES', 10)
+        self.top_statements = getattr(settings, 'REQUEST_METRICS_TOP_STATEMENTS', 5)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+        db_ms = recorder.duration * 1000
+
+        response['Server-Timing'] = ', '.join([
+            f'total;dur={total_ms:.1f}',
+            f'db;dur={db_ms:.1f};desc="{recorder.count} queries"',
+            f'dup;desc="{recorder.duplicates} duplicate queries"',
+        ])
+
+        line = (
+            f'view={view_name(request)} method={request.method} path={request.path} status={response.status_code} '
+            f'total_ms={total_ms:.1f} db_ms={db_ms:.1f} queries={recorder.count} duplicates={recorder.duplicates}'
+        )
+        over = [
+            name for name, value, limit in (
+                ('total_ms', total_ms, self.slow_ms),
+                ('queries', recorder.count, self.max_queries),
+                ('duplicates', recorder.duplicates, self.max_duplicates),
+            )
+            if value >= limit
+        ]
+        if not over:
+            logger.info(line)
+            return response
+
+        repeated = recorder.top_repeated(self.top_statements)
+        details = ''.join(
+            f'\n  {count}x {recorder.statement_time[sql] * 1000:.1f}ms {sql[:500]}'
+            for sql, count in repeated
+        )
+        logger.warning(f"{line} over={','.join(over)}{details}")
+        return response
+
+
+class RequestProfilingMiddleware:
+    """
+    Profiles single requests on demand (see apps.core.profiling).
+
+    A request carrying the PROFILING_HEADER header from an admin (JWT) runs
+    under cProfile with its SQL recorded; the stored artifact's id is returned
+    in the X-Profile-Id response header. Requests without the header only pay
+    for one META lookup.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'PROFILING_ENABLED', True)
+        header = getattr(settings, 'PROFILING_HEADER', 'X-Profile')
+        self.meta_key = 'HTTP_' + header.upper().replace('-', '_')
+
+    def __call__(self, request):
+        if not self.enabled or self.meta_key not in request.META:
+            return self.get_response(request)
+
+        user = self.admin_user(request)
+        if user is None or not profiling.acquire():
+            return self.get_response(request)
+
+        try:
+            recorder = profiling.SQLRecorder(getattr(settings, 'PROFILING_MAX_STATEMENTS', 1000))
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.disable()
+            total_ms = (time.perf_counter() - start) * 1000
+            profile_id = profiling.save(
+                {
+                    'method': request.method,
+                    'path': request.get_full_path(),
+                    'view': view_name(request),
+                    'status': response.status_code,
+                    'user': user.email,
+                    'totalMs': round(total_ms, 1),
+                },
+                profiler,
+                recorder,
+            )
+        finally:
+            profiling.release()
+
+        response['X-Profile-Id'] = profile_id
+        logger.info(f'view={view_name(request)} method={request.method} path={request.path} profile={profile_id}')
+        return response
+
+    def admin_user(self, request):
+        """The admin the request's JWT belongs to, None otherwise (the header is then ignored)"""
+        try:
+            result = JWTAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return None
+        if result is None:
+            return None
+        user = result[0]
+        return user if user.is_active and getattr(user, 'role', None) == 'admin' else None
+
+
+class ReplicaPinningMiddleware:
+    """
+    Pins a user to the primary database for REPLICA_PIN_SECONDS after a
+    successful write request, so their next reads do not hit a lagging
+    replica (see apps.core.db_routing). Not used without a replica or a
+    shared cache.
+    """
+
+    def __init__(self, get_response):
+        if not db_routing.replica_reads_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+            # DRF sets request.user on the underlying request when it authenticates
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                db_routing.pin_to_primary(user.pk)
+        return response
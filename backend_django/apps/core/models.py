@@ -52,3 +52,66 @@ class Notification(TimestampedModel):
         
     def __str__(self):
         return f'{self.title} - {self.user.full_name}'
+
+
+class JobLease(TimestampedModel):
+    """
+    Lease and runtime metrics for a periodic job run by `run_scheduler`.
+    
+    One row per job name. A scheduler process may only run a job while it holds
+    an unexpired lease on its row, so several containers can run the scheduler
+    without executing the same job twice. `next_run_at` is shared across
+    processes so the job interval is respected cluster-wide.
+    """
+    STATUS_CHOICES = [
+        ('success', 'Success'),
+        ('failed', 'Failed'),
+    ]
+    
+    name = models.CharField(max_length=100, unique=True)
+    owner = models.CharField(max_length=255, blank=True, default='', help_text='Scheduler instance holding the lease')
+    lease_expires_at = models.DateTimeField(blank=True, null=True)
+    next_run_at = models.DateTimeField(blank=True, null=True, db_index=True)
+    
+    # Runtime metrics
+    last_started_at = models.DateTimeField(blank=True, null=True)
+    last_finished_at = models.DateTimeField(blank=True, null=True)
+    last_duration_ms = models.PositiveIntegerField(blank=True, null=True)
+    last_status = models.CharField(max_length=20, choices=STATUS_CHOICES, blank=True, null=True)
+    last_error = models.TextField(blank=True, null=True)
+    run_count = models.PositiveIntegerField(default=0)
+    failure_count = models.PositiveIntegerField(default=0)
+    total_duration_ms = models.BigIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'job_leases'
+        ordering = ['name']
+    
+    def __str__(self):
+        return f'{self.name} ({self.last_status or "never run"})'
+    
+    @property
+    def average_duration_ms(self):
+        """Average runtime across all recorded runs"""
+        if not self.run_count:
+            return None
+        return self.total_duration_ms / self.run_count
+
+
+class Counter(TimestampedModel):
+    """
+    Named monotonically increasing counter used to allocate document numbers
+    (order, PI and LC numbers). See apps.core.counters.
+    
+    `value` is the last number handed out. Rows are locked with
+    SELECT ... FOR UPDATE while allocating, so concurrent requests never
+    receive the same number.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    value = models.BigIntegerField(default=0, help_text='Last allocated number')
+    
+    class Meta:
+        db_table = 'counters'
+    
+    def __str__(self):
+        return f'{self.name} = {self.value}'
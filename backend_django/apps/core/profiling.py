@@ -0,0 +1,155 @@
+"""
+On-demand request profiling
+
+Admins send the PROFILING_HEADER header (e.g. `X-Profile: 1`) with a request
+to have that one request run under cProfile with every SQL statement
+recorded (see RequestProfilingMiddleware). The artifact - call tree sorted
+by cumulative time plus the SQL list - is written as JSON to PROFILING_DIR
+on local disk and served to admins by the profile views in apps.core.views.
+
+Artifacts are capped at PROFILING_MAX_BYTES; the oldest are removed once
+there are more than PROFILING_MAX_FILES or they are older than
+PROFILING_RETENTION_HOURS.
+"""
+import cProfile
+import io
+import json
+import pstats
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+PROFILE_ID = re.compile(r'^\d{8}T\d{12}-[0-9a-f]{8}$')
+
+# cProfile can only run one profiler per process at a time; concurrent
+# profiling requests run unprofiled rather than wait
+_lock = threading.Lock()
+
+
+def profile_dir():
+    return Path(getattr(settings, 'PROFILING_DIR', Path(settings.BASE_DIR) / 'profiles'))
+
+
+class SQLRecorder:
+    """Database execute wrapper keeping every statement with its parameters and time"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.count = 0
+        self.duration = 0.0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            if len(self.statements) < self.limit:
+                self.statements.append({
+                    'ms': round(elapsed * 1000, 3),
+                    'sql': sql,
+                    'params': repr(params)[:500],
+                    'many': many,
+                })
+
+
+def acquire():
+    return _lock.acquire(blocking=False)
+
+
+def release():
+    _lock.release()
+
+
+def call_tree(profiler):
+    """cProfile stats as text: functions by cumulative time, then what each called"""
+    limit = getattr(settings, 'PROFILING_TOP_FUNCTIONS', 100)
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.strip_dirs().sort_stats(pstats.SortKey.CUMULATIVE)
+    stats.print_stats(limit)
+    stats.print_callees(limit)
+    return out.getvalue()
+
+
+def save(meta, profiler, recorder):
+    """Write the artifact for one profiled request; returns its id"""
+    created = timezone.now()
+    profile_id = f'{created:%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}'
+    artifact = {
+        'id': profile_id,
+        'createdAt': created.isoformat(),
+        **meta,
+        'dbMs': round(recorder.duration * 1000, 1),
+        'queries': recorder.count,
+        'truncated': recorder.count > len(recorder.statements),
+        'sql': recorder.statements,
+        'profile': call_tree(profiler),
+    }
+    content = _fit(artifact, getattr(settings, 'PROFILING_MAX_BYTES', 2 * 1024 * 1024))
+
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / f'{profile_id}.json').write_bytes(content)
+    prune()
+    return profile_id
+
+
+def _fit(artifact, max_bytes):
+    """Serialize, dropping SQL statements and then call tree text until under max_bytes"""
+    content = json.dumps(artifact, indent=1).encode()
+    while len(content) > max_bytes and artifact['sql']:
+        artifact['sql'] = artifact['sql'][:len(artifact['sql']) // 2]
+        artifact['truncated'] = True
+        content = json.dumps(artifact, indent=1).encode()
+    if len(content) > max_bytes:
+        excess = len(content) - max_bytes
+        artifact['profile'] = artifact['profile'][:max(0, len(artifact['profile']) - excess - 100)]
+        artifact['truncated'] = True
+        content = json.dumps(artifact, indent=1).encode()
+    return content
+
+
+def prune():
+    """Delete artifacts past the retention period, then the oldest over PROFILING_MAX_FILES"""
+    files = sorted(profile_dir().glob('*.json'), key=lambda path: path.name, reverse=True)
+    max_files = getattr(settings, 'PROFILING_MAX_FILES', 50)
+    cutoff = time.time() - getattr(settings, 'PROFILING_RETENTION_HOURS', 24) * 3600
+    for number, path in enumerate(files):
+        try:
+            if number >= max_files or path.stat().st_mtime < cutoff:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def list_profiles():
+    """Summaries of the stored artifacts, newest first"""
+    prune()
+    profiles = []
+    for path in sorted(profile_dir().glob('*.json'), key=lambda path: path.name, reverse=True):
+        try:
+            artifact = json.loads(path.read_bytes())
+        except (OSError, ValueError):
+            continue
+        profiles.append({
+            key: artifact.get(key)
+            for key in ('id', 'createdAt', 'method', 'path', 'view', 'status', 'user', 'totalMs', 'dbMs', 'queries')
+        } | {'size': path.stat().st_size})
+    return profiles
+
+
+def profile_path(profile_id):
+    """Path of a stored artifact, None for unknown or malformed ids"""
+    if not PROFILE_ID.match(profile_id or ''):
+        return None
+    path = profile_dir() / f'{profile_id}.json'
+    return path if path.is_file() else None
@@ -0,0 +1,129 @@
+"""
+Fast JSON renderer
+
+Drop-in replacement for DRF's JSONRenderer that encodes with orjson when it
+is installed. The output is byte-identical to JSONRenderer with the default
+settings (compact, UTF-8): UUIDs, strings and numbers are encoded natively,
+while datetimes, dates, times, Decimals and lazy strings go through DRF's
+JSONEncoder. The renderer falls back to JSONRenderer in these cases:
+
+- orjson is not installed
+- indented output is requested (e.g. the browsable API)
+- an object orjson cannot encode, or a dict with non-string keys
+- a float formatted differently from the stdlib: orjson writes 1e16 and
+  0.00001 where json writes 1e+16 and 1e-05
+
+One difference remains: NaN and infinity render as null, where JSONRenderer
+raises (STRICT_JSON).
+"""
+import re
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+# Where orjson and json write a float differently: exponents (1e16 / 1e+16,
+# 1e-7 / 1e-07) and small numbers written out (0.00001 / 1e-05). Both also
+# occur inside strings (UUIDs, text), so each hit is checked for a number token.
+EXPONENT = re.compile(rb'e[-\d]')
+SMALL = re.compile(rb'0\.0000')
+DIGITS = b'0123456789.'
+
+
+def _token_start(content, pos):
+    """Whether a JSON number token starts at pos (after an optional minus sign)"""
+    if pos and content[pos - 1] == ord('-'):
+        pos -= 1
+    return pos == 0 or content[pos - 1] in b':,['
+
+
+def has_stdlib_float_forms(content):
+    """Whether compact orjson output holds a float the stdlib json module writes differently"""
+    for match in EXPONENT.finditer(content):
+        start = match.start()
+        while start and content[start - 1] in DIGITS:
+            start -= 1
+        if start < match.start() and _token_start(content, start):
+            return True
+    return any(_token_start(content, match.start()) for match in SMALL.finditer(content))
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if has_stdlib_float_forms(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same escaping as JSONRenderer: U+2028/U+2029 are valid JSON but not valid JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+def columnar(objects, tables=()):
+    """
+    A list of dicts as {"columns": [...], "rows": [[...], ...]}. Keys named in
+    `tables` hold lists of dicts; each becomes its own table under "tables",
+    whose first column, `row`, is the index of the parent row.
+    """
+    columns = _columns(objects, exclude=tables)
+    result = {'columns': columns, 'rows': [[obj.get(key) for key in columns] for obj in objects]}
+    if tables:
+        result['tables'] = {}
+        for name in tables:
+            children = [(index, child) for index, obj in enumerate(objects) for child in obj.get(name) or ()]
+            child_columns = _columns([child for _, child in children])
+            result['tables'][name] = {
+                'columns': ['row', *child_columns],
+                'rows': [[index, *(child.get(key) for key in child_columns)] for index, child in children],
+            }
+    return result
+
+
+def _columns(objects, exclude=()):
+    """Keys of the objects in first-seen order"""
+    columns = {}
+    for obj in objects:
+        columns.update(dict.fromkeys(obj))
+    return [key for key in columns if key not in exclude]
+
+
+class ColumnarJSONRenderer(FastJSONRenderer):
+    """
+    `?format=columnar`: list responses as a column header plus one array per
+    row, so keys are sent once instead of once per object (see columnar()).
+    The view's `columnar_tables` names nested lists flattened into their own
+    table. A list wrapped as {"data": [...], ...} (e.g. ?users=ref) has its
+    "data" made columnar. Other responses (single objects, errors) render as
+    plain JSON.
+    """
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        tables = getattr((renderer_context or {}).get('view'), 'columnar_tables', ())
+        if _is_object_list(data):
+            data = columnar(data, tables)
+        elif isinstance(data, dict) and _is_object_list(data.get('data')):
+            data = {**data, 'data': columnar(data['data'], tables)}
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+def _is_object_list(data):
+    return isinstance(data, list) and all(isinstance(obj, dict) for obj in data)
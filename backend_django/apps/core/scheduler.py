@@ -0,0 +1,205 @@
+"""
+In-process periodic job scheduler
+
+Runs registered jobs from one long-lived process (see the `run_scheduler`
+management command) instead of booting Django from an external cron for every
+run. Each job is guarded by a row in `job_leases`: a scheduler instance only
+runs a job after atomically claiming that row, so running the scheduler in
+several containers never executes the same job concurrently.
+"""
+import logging
+import os
+import socket
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import JobLease
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob:
+    """A job that runs every `interval_seconds`"""
+
+    def __init__(self, name, interval_seconds, func, lease_seconds=None, description=''):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self.lease_seconds = lease_seconds or settings.SCHEDULER_LEASE_SECONDS
+        self.description = description
+
+    def __repr__(self):
+        return f'<PeriodicJob {self.name} every {self.interval_seconds}s>'
+
+
+def command_job(name, command_name, interval_seconds, *command_args, **kwargs):
+    """Build a PeriodicJob that runs a management command"""
+    def run():
+        call_command(command_name, *command_args)
+
+    return PeriodicJob(
+        name,
+        interval_seconds,
+        run,
+        lease_seconds=kwargs.get('lease_seconds'),
+        description=kwargs.get('description', f'manage.py {command_name}'),
+    )
+
+
+def get_default_jobs():
+    """Jobs registered with `run_scheduler`"""
+    return [
+        command_job(
+            'check_etd_reminders',
+            'check_etd_reminders',
+            settings.SCHEDULER_ALERT_INTERVAL_SECONDS,
+            description='ETD passed with no delivery recorded',
+        ),
+        command_job(
+            'check_eta_alerts',
+            'check_eta_alerts',
+            settings.SCHEDULER_ALERT_INTERVAL_SECONDS,
+            description='ETA within 10 days or overdue',
+        ),
+        command_job(
+            'cleanup_media',
+            'cleanup_media',
+            settings.SCHEDULER_MEDIA_CLEANUP_INTERVAL_SECONDS,
+            description='Delete expired, unreferenced files under media/',
+        ),
+        command_job(
+            'prune_revoked_tokens',
+            'prune_revoked_tokens',
+            settings.SCHEDULER_TOKEN_PRUNE_INTERVAL_SECONDS,
+            description='Delete expired revoked refresh tokens',
+        ),
+    ]
+
+
+def default_owner():
+    """Identifier for this scheduler process (host, pid and a random suffix)"""
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+def acquire_lease(job, owner, now=None):
+    """
+    Claim the lease for `job` if it is due and no other instance holds it.
+
+    The claim is a single conditional UPDATE, so at most one instance wins
+    even when several poll at the same moment.
+    Returns True if this owner now holds the lease.
+    """
+    now = now or timezone.now()
+    JobLease.objects.get_or_create(name=job.name, defaults={'next_run_at': now})
+
+    claimed = (
+        JobLease.objects
+        .filter(name=job.name)
+        .filter(Q(next_run_at__isnull=True) | Q(next_run_at__lte=now))
+        .filter(Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now))
+        .update(
+            owner=owner,
+            lease_expires_at=now + timedelta(seconds=job.lease_seconds),
+            last_started_at=now,
+            updated_at=now,
+        )
+    )
+    return claimed == 1
+
+
+def release_lease(job, owner, started_at, error=None):
+    """Release the lease, schedule the next run and record runtime metrics"""
+    finished_at = timezone.now()
+    duration_ms = int((finished_at - started_at).total_seconds() * 1000)
+    failed = error is not None
+
+    JobLease.objects.filter(name=job.name, owner=owner).update(
+        lease_expires_at=None,
+        next_run_at=started_at + timedelta(seconds=job.interval_seconds),
+        last_finished_at=finished_at,
+        last_duration_ms=duration_ms,
+        last_status='failed' if failed else 'success',
+        last_error=error[:10000] if failed else None,
+        run_count=F('run_count') + 1,
+        failure_count=F('failure_count') + (1 if failed else 0),
+        total_duration_ms=F('total_duration_ms') + duration_ms,
+        updated_at=finished_at,
+    )
+    return duration_ms
+
+
+class Scheduler:
+    """
+    Polls registered jobs and runs the ones that are due.
+
+    Usage:
+        scheduler = Scheduler(get_default_jobs())
+        scheduler.run_forever()
+    """
+
+    def __init__(self, jobs, owner=None, poll_seconds=None):
+        self.jobs = list(jobs)
+        self.owner = owner or default_owner()
+        self.poll_seconds = poll_seconds or settings.SCHEDULER_POLL_SECONDS
+        self._stopping = False
+
+    def stop(self, *args):
+        """Finish the current job and exit the loop (safe as a signal handler)"""
+        self._stopping = True
+
+    def run_job(self, job):
+        """Run one job if its lease can be claimed. Returns True if it ran."""
+        close_old_connections()
+        started_at = timezone.now()
+        if not acquire_lease(job, self.owner, now=started_at):
+            return False
+
+        logger.info('Scheduler %s running job %s', self.owner, job.name)
+        error = None
+        try:
+            job.func()
+        except Exception:
+            error = traceback.format_exc()
+            logger.exception('Scheduled job %s failed', job.name)
+        finally:
+            # The job may have left a broken connection behind
+            close_old_connections()
+            duration_ms = release_lease(job, self.owner, started_at, error=error)
+
+        logger.info(
+            'Scheduled job %s finished in %sms (%s)',
+            job.name, duration_ms, 'failed' if error else 'success'
+        )
+        return True
+
+    def run_pending(self):
+        """Run every due job once. Returns the names of jobs that ran."""
+        ran = []
+        for job in self.jobs:
+            if self._stopping:
+                break
+            if self.run_job(job):
+                ran.append(job.name)
+        return ran
+
+    def run_forever(self):
+        """Poll until `stop()` is called"""
+        logger.info(
+            'Scheduler %s started with %d job(s), polling every %ss',
+            self.owner, len(self.jobs), self.poll_seconds
+        )
+        while not self._stopping:
+            self.run_pending()
+            # Sleep in short steps so SIGTERM is handled promptly
+            deadline = time.monotonic() + self.poll_seconds
+            while not self._stopping and time.monotonic() < deadline:
+                time.sleep(min(1, self.poll_seconds))
+        logger.info('Scheduler %s stopped', self.owner)
@@ -184,27 +184,42 @@ def validate_file(file):
     return True, None
 
 
+def _order_number_counter(prefix, date_str):
+    """Counter name and seed for order numbers issued on one day"""
+    from apps.orders.models import Order
+    from .counters import max_sequence
+    
+    day_prefix = f'{prefix}-{date_str}-'
+    
+    def seed():
+        # Continue after the last order number already issued today
+        return max_sequence(
+            Order.objects.filter(order_number__startswith=day_prefix).values_list('order_number', flat=True),
+            day_prefix,
+        )
+    
+    return f'order_number:{prefix}-{date_str}', seed
+
+
 def generate_order_number(prefix='PB'):
     """
     Generate unique order number
     Format: PB-YYYYMMDD-XXXX
+    
+    Numbers come from a per-day counter row (see apps.core.counters), so
+    concurrent requests cannot receive the same number.
+    """
+    return generate_order_numbers(1, prefix=prefix)[0]
+
+
+def generate_order_numbers(count, prefix='PB'):
+    """
+    Allocate `count` consecutive order numbers in one step (for bulk imports)
+    Format: PB-YYYYMMDD-XXXX
     """
     from datetime import datetime
-    from apps.orders.models import Order
-    
-    today = datetime.now()
-    date_str = today.strftime('%Y%m%d')
-    
-    # Get last order number for today
-    last_order = Order.objects.filter(
-        order_number__startswith=f'{prefix}-{date_str}'
-    ).order_by('-order_number').first()
-    
-    if last_order:
-        # Extract sequence number and increment
-        last_sequence = int(last_order.order_number.split('-')[-1])
-        sequence = last_sequence + 1
-    else:
-        sequence = 1
+    from .counters import allocate_block
     
-    return f'{prefix}-{date_str}-{sequence:04d}'
+    date_str = datetime.now().strftime('%Y%m%d')
+    name, seed = _order_number_counter(prefix, date_str)
+    return [f'{prefix}-{date_str}-{sequence:04d}' for sequence in allocate_block(name, count, seed=seed)]
@@ -5,11 +5,15 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status, viewsets
+from django.http import FileResponse
 from django.db.models import Count, Sum, Q
 from django.db.models.functions import TruncMonth
 from apps.orders.models import Order, OrderStatus, OrderCategory
 from datetime import date, timedelta
+from . import profiling
+from .db_routing import use_replica
 from .models import Notification
+from .permissions import IsAdmin
 from .serializers import NotificationSerializer
 from rest_framework.decorators import action
 
@@ -67,6 +71,7 @@ def document_delete_view(request, document_id):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@use_replica
 def dashboard_view(request):
     """
     GET /api/v1/dashboard
@@ -229,6 +234,7 @@ def dashboard_view(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@use_replica
 def dashboard_stats_view(request):
     """
     GET /api/v1/dashboard/stats/
@@ -349,6 +355,7 @@ def dashboard_stats_view(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@use_replica
 def orders_by_merchandiser_view(request):
     """
     GET /api/v1/dashboard/orders-by-merchandiser/
@@ -443,3 +450,23 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
         """DELETE /notifications/clear-all/ - delete all notifications for the user"""
         deleted_count, _ = Notification.objects.filter(user=request.user).delete()
         return Response({'message': f'{deleted_count} notifications cleared'})
+
+
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def profile_list_view(request):
+    """
+    GET /profiles/ - stored request profiles (admin only), newest first.
+    Profile a request by sending the X-Profile header with it.
+    """
+    return Response(profiling.list_profiles())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def profile_download_view(request, profile_id):
+    """GET /profiles/{id}/ - download one profile artifact (call tree + SQL) as JSON (admin only)"""
+    path = profiling.profile_path(profile_id)
+    if path is None:
+        return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+    return FileResponse(path.open('rb'), as_attachment=True, filename=path.name, content_type='application/json')
@@ -8,17 +8,20 @@ from django.db.models import Sum, F, DecimalField, Q
 from django.db.models.functions import Coalesce
 from .models import ProformaInvoice, LetterOfCredit
 from .serializers import ProformaInvoiceSerializer, LetterOfCreditSerializer
+from apps.core.counters import allocate, max_sequence
+from apps.core.db_routing import ReplicaReadsMixin, use_replica
 from apps.core.permissions import IsMerchandiser
 from apps.orders.models import Order
 from apps.orders.serializers import OrderSerializer
 
 
-class ProformaInvoiceViewSet(viewsets.ModelViewSet):
+class ProformaInvoiceViewSet(ReplicaReadsMixin, viewsets.ModelViewSet):
     """CRUD for Proforma Invoices"""
     queryset = ProformaInvoice.objects.select_related('order', 'created_by').all()
     serializer_class = ProformaInvoiceSerializer
     permission_classes = [permissions.IsAuthenticated, IsMerchandiser]
     pagination_class = None
+    replica_actions = {'list'}  # Served from the read replica when configured
     
     def get_queryset(self):
         """Filter by user role, search, and optionally by order"""
@@ -51,6 +54,11 @@ class ProformaInvoiceViewSet(viewsets.ModelViewSet):
         context['request'] = self.request
         return context
     
+    @staticmethod
+    def _pi_number_seed():
+        """Last PI number already issued (seeds the pi_number counter once)"""
+        return max_sequence(ProformaInvoice.objects.values_list('pi_number', flat=True), 'PI-')
+    
     def perform_create(self, serializer):
         """Auto-generate PI number, increment version, and set created_by"""
         order_id = serializer.validated_data.get('order').id
@@ -60,8 +68,7 @@ class ProformaInvoiceViewSet(viewsets.ModelViewSet):
         next_version = (latest_pi.version + 1) if latest_pi else 1
         
         # Auto-generate PI number
-        pi_count = ProformaInvoice.objects.count() + 1
-        pi_number = f"PI-{pi_count:05d}"
+        pi_number = f"PI-{allocate('pi_number', seed=self._pi_number_seed):05d}"
         
         serializer.save(
             pi_number=pi_number,
@@ -76,12 +83,13 @@ class ProformaInvoiceViewSet(viewsets.ModelViewSet):
         return instance
 
 
-class LetterOfCreditViewSet(viewsets.ModelViewSet):
+class LetterOfCreditViewSet(ReplicaReadsMixin, viewsets.ModelViewSet):
     """CRUD for Letters of Credit"""
     queryset = LetterOfCredit.objects.select_related('order', 'created_by').all()
     serializer_class = LetterOfCreditSerializer
     permission_classes = [permissions.IsAuthenticated, IsMerchandiser]
     pagination_class = None
+    replica_actions = {'list'}  # Served from the read replica when configured
     
     def get_queryset(self):
         """Filter by user role and search"""
@@ -108,10 +116,14 @@ class LetterOfCreditViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    @staticmethod
+    def _lc_number_seed():
+        """Last LC number already issued (seeds the lc_number counter once)"""
+        return max_sequence(LetterOfCredit.objects.values_list('lc_number', flat=True), 'LC-')
+    
     def perform_create(self, serializer):
         """Auto-generate LC number and set created_by"""
-        lc_count = LetterOfCredit.objects.count() + 1
-        lc_number = f"LC-{lc_count:05d}"
+        lc_number = f"LC-{allocate('lc_number', seed=self._lc_number_seed):05d}"
         serializer.save(lc_number=lc_number, created_by=self.request.user)
     
     def perform_update(self, serializer):
@@ -128,6 +140,7 @@ class FinancialAnalyticsView(APIView):
     """
     permission_classes = [permissions.IsAuthenticated]
     
+    @use_replica
     def get(self, request):
         """
         Calculate financial metrics:
@@ -197,6 +210,7 @@ class OrderProfitsView(APIView):
     """
     permission_classes = [permissions.IsAuthenticated]
     
+    @use_replica
     def get(self, request):
         """
         Get all orders with profit information
@@ -6,6 +6,7 @@ from .models import Order
 from .models_task import Task
 from .models_style_color import OrderStyle, OrderColor
 from .models_order_line import OrderLine
+from .utils import order_changes
 
 
 @admin.register(Order)
@@ -87,19 +88,25 @@ class OrderAdmin(admin.ModelAdmin):
     @admin.action(description='Mark selected orders as Running')
     def mark_as_running(self, request, queryset):
         """Bulk action to mark orders as running"""
+        order_ids = list(queryset.values_list('id', flat=True))
         updated = queryset.update(category='running', status='running')
+        order_changes.touch_many(order_ids)
         self.message_user(request, f'{updated} order(s) marked as Running.')
     
     @admin.action(description='Mark selected orders as Completed')
     def mark_as_completed(self, request, queryset):
         """Bulk action to mark orders as completed"""
+        order_ids = list(queryset.values_list('id', flat=True))
         updated = queryset.update(status='completed')
+        order_changes.touch_many(order_ids)
         self.message_user(request, f'{updated} order(s) marked as Completed.')
     
     @admin.action(description='Mark selected orders as Archived')
     def mark_as_archived(self, request, queryset):
         """Bulk action to mark orders as archived"""
+        order_ids = list(queryset.values_list('id', flat=True))
         updated = queryset.update(category='archived')
+        order_changes.touch_many(order_ids)
         self.message_user(request, f'{updated} order(s) marked as Archived.')
 
 
@@ -8,3 +8,6 @@ class OrdersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.orders'
     verbose_name = 'Orders'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,176 @@
+"""Management command to time the heavy API endpoints and record the results as JSON.
+
+Requests go through the full middleware/URL/view stack in-process (Django test
+client with a JWT for --user), against whatever data is in the database -
+normally the dataset from seed_benchmark_data. Each endpoint is requested
+--warmup times untimed, then --repeat times timed; the result file records the
+timings, query counts and response sizes together with the git commit, so runs
+from two commits can be compared with --compare.
+
+Usage:
+    python manage.py benchmark_endpoints --output bench-before.json
+    python manage.py benchmark_endpoints --output bench-after.json --compare bench-before.json
+    python manage.py benchmark_endpoints --endpoint order-list --endpoint dashboard --repeat 10
+"""
+import json
+import math
+import platform
+import statistics
+import subprocess
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Count
+from django.test import Client
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.core.middleware import QueryRecorder
+from apps.orders.models import ApprovalHistory, Order
+from apps.orders.models_order_line import OrderLine
+
+from .seed_benchmark_data import ADMIN_EMAIL
+
+User = get_user_model()
+
+# name -> path ({order_id} is the order with the most lines)
+ENDPOINTS = {
+    'order-list': '/api/v1/orders/',
+    'order-detail': '/api/v1/orders/{order_id}/',
+    'dashboard': '/api/v1/dashboard/',
+    'dashboard-stats': '/api/v1/dashboard/stats/',
+    'financial-analytics': '/api/v1/financials/analytics/pipeline/',
+    'export-excel': '/api/v1/orders/export-excel/',
+    'export-tna': '/api/v1/orders/export-tna/',
+    'download-po': '/api/v1/orders/{order_id}/download-po/',
+}
+
+
+def _git(*args):
+    try:
+        result = subprocess.run(['git', *args], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class Command(BaseCommand):
+    help = 'Time the heavy API endpoints (order list/detail, dashboards, analytics, exports, PO PDF) and write the results to JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', default=ADMIN_EMAIL, help=f'Email of the user making the requests (default {ADMIN_EMAIL})')
+        parser.add_argument('--endpoint', dest='endpoints', action='append', choices=list(ENDPOINTS), help='Only time this endpoint (may be repeated)')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed requests per endpoint (default 5)')
+        parser.add_argument('--warmup', type=int, default=1, help='Untimed requests per endpoint before timing (default 1)')
+        parser.add_argument('--output', default=None, help='Result file (default benchmark-<commit>.json)')
+        parser.add_argument('--compare', default=None, help='Earlier result file to compare against')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+        user = User.objects.filter(email=options['user']).first()
+        if user is None:
+            raise CommandError(f"User {options['user']} not found - run seed_benchmark_data or pass --user")
+        baseline = self.load(options['compare']) if options['compare'] else None
+
+        order_id = (
+            Order.objects.annotate(line_count=Count('styles__lines'))
+            .order_by('-line_count', 'id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        names = options['endpoints'] or list(ENDPOINTS)
+        if order_id is None and any('{order_id}' in ENDPOINTS[name] for name in names):
+            raise CommandError('No orders in the database - run seed_benchmark_data first')
+
+        host = next((h for h in settings.ALLOWED_HOSTS if h not in ('*', '') and not h.startswith('.')), 'localhost')
+        client = Client(HTTP_HOST=host, HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+        commit = _git('rev-parse', '--short', 'HEAD')
+        results = {
+            'meta': {
+                'commit': commit,
+                'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+                'created_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'user': user.email,
+                'repeat': options['repeat'],
+                'warmup': options['warmup'],
+                'dataset': {
+                    'orders': Order.objects.count(),
+                    'lines': OrderLine.objects.count(),
+                    'approval_history': ApprovalHistory.objects.count(),
+                },
+            },
+            'endpoints': {},
+        }
+
+        for name in names:
+            path = ENDPOINTS[name].format(order_id=order_id)
+            for _ in range(options['warmup']):
+                self.request(client, path)
+            runs = [self.request(client, path) for _ in range(options['repeat'])]
+            timings = [run['ms'] for run in runs]
+            last = runs[-1]
+            results['endpoints'][name] = {
+                'path': path,
+                'status': last['status'],
+                'bytes': last['bytes'],
+                'queries': last['queries'],
+                'min_ms': round(min(timings), 1),
+                'median_ms': round(statistics.median(timings), 1),
+                'p95_ms': round(_percentile(timings, 0.95), 1),
+                'max_ms': round(max(timings), 1),
+                'runs_ms': [round(ms, 1) for ms in timings],
+            }
+            self.report(name, results['endpoints'][name], (baseline or {}).get('endpoints', {}).get(name))
+
+        output = Path(options['output'] or f"benchmark-{commit or 'unknown'}.json")
+        output.write_text(json.dumps(results, indent=2) + '\n')
+        self.stdout.write(self.style.SUCCESS(f'\nResults written to {output}'))
+
+    def load(self, path):
+        try:
+            return json.loads(Path(path).read_text())
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Cannot read {path}: {exc}')
+
+    def request(self, client, path):
+        """One timed GET (including reading the whole body); returns ms, status, bytes and query count"""
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for db in connections.all():
+                stack.enter_context(db.execute_wrapper(recorder))
+            response = client.get(path)
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+        return {
+            'ms': (time.perf_counter() - start) * 1000,
+            'status': response.status_code,
+            'bytes': len(body),
+            'queries': recorder.count,
+        }
+
+    def report(self, name, result, previous):
+        line = (
+            f"{name:<20} {result['status']}  median {result['median_ms']:>9.1f} ms  "
+            f"p95 {result['p95_ms']:>9.1f} ms  {result['queries']:>5} queries  {result['bytes']:>10} bytes"
+        )
+        if previous:
+            change = (result['median_ms'] - previous['median_ms']) / previous['median_ms'] * 100 if previous['median_ms'] else 0.0
+            line += f"  (was {previous['median_ms']:.1f} ms / {previous['queries']} queries, {change:+.1f}%)"
+        style = self.style.SUCCESS if result['status'] == 200 else self.style.ERROR
+        self.stdout.write(style(line))
@@ -0,0 +1,79 @@
+"""Management command to compare the two ways of loading full orders for OrderSerializer.
+
+prefetch:  OrderSerializer.setup_eager_loading (one query per relation)
+json-tree: apps.orders.utils.order_json_tree (one jsonb_agg query, PostgreSQL)
+
+Loads the order with the most lines, then --batch orders at once, --repeat
+times each way, and reports load and serialize times with query counts. The
+serialized output of both paths must be identical; the command fails if not.
+Run it against the seed_benchmark_data dataset on PostgreSQL.
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+
+from apps.orders.models import Order
+from apps.orders.serializers import OrderSerializer
+from apps.orders.utils import order_json_tree
+
+
+def _prefetch(queryset):
+    return list(OrderSerializer.setup_eager_loading(queryset))
+
+
+LOADERS = {
+    'prefetch': _prefetch,
+    'json-tree': order_json_tree.load_orders,
+}
+
+
+class Command(BaseCommand):
+    help = "Compare loading full orders with the prefetch plan and the single-query JSON tree loader."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=50, help='Orders loaded together in the batch case (default 50)')
+        parser.add_argument('--repeat', type=int, default=10, help='Timed runs per loader and case (default 10)')
+
+    def handle(self, *args, **options):
+        if not order_json_tree.supported():
+            raise CommandError("The JSON tree loader needs PostgreSQL.")
+
+        largest = Order.objects.annotate(line_count=Count('styles__lines')).order_by('-line_count').values_list('id', 'line_count').first()
+        if largest is None:
+            raise CommandError("No orders - run seed_benchmark_data first.")
+        batch_ids = list(Order.objects.order_by('-created_at').values_list('id', flat=True)[:options['batch']])
+        cases = {
+            f"largest order ({largest[1]} lines)": Order.objects.filter(pk=largest[0]),
+            f"{len(batch_ids)} orders": Order.objects.filter(pk__in=batch_ids),
+        }
+
+        for case, queryset in cases.items():
+            self.stdout.write(case)
+            outputs = {}
+            for name, loader in LOADERS.items():
+                load_times, total_times = [], []
+                for _ in range(options['repeat'] + 1):  # first run untimed (warm-up)
+                    with CaptureQueriesContext(connection) as queries:
+                        start = time.perf_counter()
+                        orders = loader(queryset)
+                        loaded = time.perf_counter()
+                        content = JSONRenderer().render(
+                            OrderSerializer(sorted(orders, key=lambda order: order.created_at), many=True).data
+                        )
+                        finished = time.perf_counter()
+                    load_times.append((loaded - start) * 1000)
+                    total_times.append((finished - start) * 1000)
+                outputs[name] = content
+                self.stdout.write(
+                    f"  {name:<10} load {statistics.median(load_times[1:]):8.1f} ms   "
+                    f"load+serialize {statistics.median(total_times[1:]):8.1f} ms   "
+                    f"{len(queries.captured_queries)} queries"
+                )
+            if outputs['prefetch'] != outputs['json-tree']:
+                raise CommandError(f"{case}: the loaders produced different OrderSerializer output")
+        self.stdout.write(self.style.SUCCESS("Both loaders produce identical OrderSerializer output."))
@@ -0,0 +1,83 @@
+"""Management command to check that the fast order list path renders the same bytes as before.
+OrderListSerializer builds its output straight from the instance and the API
+renders with apps.core.renderers.FastJSONRenderer. This renders every order (or
+a sample) both ways - DRF's field-by-field serializer with the stdlib
+JSONRenderer, and the fast path - and reports the first order whose bytes
+differ. Run it after changing OrderListSerializer or the list queryset.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import ModelSerializer
+
+from apps.core.renderers import FastJSONRenderer
+from apps.orders.models import Order
+from apps.orders.serializers import OrderListSerializer
+from apps.orders.views import OrderViewSet
+
+
+class ReferenceOrderListSerializer(OrderListSerializer):
+    """OrderListSerializer as it was before the fast path: DRF fields, then camelCase"""
+
+    def to_representation(self, instance):
+        data = ModelSerializer.to_representation(self, instance)
+        return {
+            'id': str(data['id']),
+            'poNumber': data['order_number'],
+            'customerName': data['customer_name'],
+            'buyerName': data.get('buyer_name'),
+            'fabricType': data['fabric_type'],
+            'quantity': float(data['quantity']) if data['quantity'] else 0,
+            'unit': data['unit'],
+            'currency': data.get('currency'),
+            'status': data['status'],
+            'category': data['category'],
+            'orderDate': data['order_date'],
+            'expectedDeliveryDate': data['expected_delivery_date'],
+            'merchandiser': str(data['merchandiser']) if data['merchandiser'] else None,
+            'merchandiserName': data.get('merchandiser_name'),
+            'createdAt': data['created_at'],
+            'earliestEtd': data.get('earliest_etd'),
+            'lineStatusCounts': data.get('line_status_counts') or {},
+            'lines': data.get('lines') or [],
+            'lcIssueDate': data.get('lc_issue_date'),
+            'piSentDate': data.get('pi_sent_date'),
+            'orderType': data.get('order_type'),
+            'productionSummary': data.get('production_summary'),
+            'createdById': str(data['created_by']) if data.get('created_by') else None,
+            'createdByDetails': self._get_created_by_details(instance),
+            'notes': data.get('notes'),
+        }
+
+
+class Command(BaseCommand):
+    help = "Compare the fast order list JSON with DRF's field-by-field output, byte for byte."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, help='Only check the newest N orders')
+
+    def handle(self, *args, **options):
+        queryset = OrderViewSet.queryset.order_by('-created_at')
+        if options['limit']:
+            queryset = queryset[:options['limit']]
+        orders = list(queryset)
+
+        expected = [ReferenceOrderListSerializer(order).data for order in orders]
+        actual = OrderListSerializer(orders, many=True).data
+        if JSONRenderer().render(expected) == FastJSONRenderer().render(actual):
+            self.stdout.write(self.style.SUCCESS(f"Order list JSON identical for {len(orders)} order(s)."))
+            return
+
+        for order, before, after in zip(orders, expected, actual):
+            before_bytes, after_bytes = JSONRenderer().render(before), FastJSONRenderer().render(after)
+            if before_bytes != after_bytes:
+                offset = next(
+                    (i for i, (a, b) in enumerate(zip(before_bytes, after_bytes)) if a != b),
+                    min(len(before_bytes), len(after_bytes)),
+                )
+                raise CommandError(
+                    f"Order {order.id} differs at byte {offset}:\n"
+                    f"  expected ...{before_bytes[max(0, offset - 60):offset + 60].decode(errors='replace')}\n"
+                    f"  actual   ...{after_bytes[max(0, offset - 60):offset + 60].decode(errors='replace')}"
+                )
+        raise CommandError("Order list JSON differs (list framing only).")
@@ -0,0 +1,435 @@
+"""Management command guarding the API against N+1 query regressions.
+
+Runs every registered endpoint against two generated datasets (see
+seed_benchmark_data) of different sizes in a throwaway test database and
+fails when an endpoint:
+
+- makes more queries on the larger dataset (query count grows with the data), or
+- exceeds its query budget on the larger dataset.
+
+Every OrderViewSet action must have an entry in ENDPOINTS, so new actions
+cannot skip the check. On failure the offending SQL is printed: for growth,
+the statements that ran more often on the larger dataset; for budget
+overruns, the most repeated statements.
+
+The test database is created from the models, without running migrations.
+
+Endpoints with an N+1 that predates this check carry a `known_growth` note:
+their growth is reported but does not fail the run (their budget still caps
+the larger dataset). Remove the note once the endpoint is fixed; growth
+introduced since must be fixed, not noted.
+
+Budgets are the PostgreSQL query counts on the larger dataset plus explicit
+headroom (see _budget); after an intended change, re-measure on PostgreSQL
+with --verbose and update the measured count. Other databases make a
+different number of queries (orders.retrieve, for one, uses the single-query
+loader only on PostgreSQL), so there only growth is checked.
+
+Usage:
+    python manage.py check_query_budgets
+    python manage.py check_query_budgets --endpoint orders.list --verbose
+"""
+import io
+import math
+import re
+import shutil
+import tempfile
+from collections import Counter
+from contextlib import ExitStack
+from datetime import date, timedelta
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.authentication.models import User
+from apps.core.middleware import QueryRecorder
+from apps.financials.models import LetterOfCredit, ProformaInvoice
+from apps.orders.models import ApprovalHistory, CustomApprovalGate, Order, OrderActivityLog
+from apps.orders.models_document import Document
+from apps.orders.models_order_line import OrderLine
+from apps.orders.models_production_entry import ProductionEntry
+from apps.orders.models_supplier_delivery import SupplierDelivery
+from apps.orders.views import OrderViewSet
+
+from .seed_benchmark_data import ADMIN_EMAIL
+
+# Dataset sizes (orders, lines); approval history is HISTORY_PER_LINE rows per line
+DATASETS = {'small': (4, 24), 'large': (12, 144)}
+HISTORY_PER_LINE = 4
+
+ORDER = '/api/v1/orders/{order}/'
+CREATE_LINES = 10
+
+# Savepoint names carry a per-connection counter; strip it so statements compare across runs
+SAVEPOINT_ID = re.compile(r'"s\d+_x\d+"')
+
+
+def _line_payload(ctx):
+    return [
+        {'id': line['id'], 'colorCode': line['color_code'], 'cadCode': line['cad_code'], 'quantity': line['quantity']}
+        for line in ctx['lines']
+    ]
+
+
+def _order_update_payload(ctx):
+    styles = {}
+    for line in _line_payload(ctx):
+        styles.setdefault(ctx['line_styles'][line['id']], []).append(line)
+    return [
+        {'id': style_id, 'styleNumber': ctx['style_numbers'][style_id], 'lines': lines}
+        for style_id, lines in styles.items()
+    ]
+
+
+def _budget(measured):
+    """Query budget for `measured` queries (PostgreSQL, larger dataset): 25% headroom, at least 5 queries"""
+    return max(measured + 5, math.ceil(measured * 1.25))
+
+
+# Endpoints in the order they are requested (reads, then writes, then deletes).
+# `view` is 'ViewSet.action' for OrderViewSet entries (checked for coverage);
+# paths and payload callables are filled from the dataset context.
+# `known_growth` marks an existing N+1 (see module docstring).
+ENDPOINTS = [
+    # Orders - reads
+    {'name': 'orders.list', 'view': 'OrderViewSet.list', 'method': 'get', 'path': '/api/v1/orders/', 'budget': _budget(14)},
+    {'name': 'orders.retrieve', 'view': 'OrderViewSet.retrieve', 'method': 'get', 'path': ORDER, 'budget': _budget(2)},
+    {'name': 'orders.stats', 'view': 'OrderViewSet.stats', 'method': 'get', 'path': '/api/v1/orders/stats/', 'budget': _budget(20)},
+    {'name': 'orders.changes', 'view': 'OrderViewSet.changes', 'method': 'get', 'path': '/api/v1/orders/changes/?since=0', 'budget': _budget(15)},
+    {'name': 'orders.alerts_upcoming_etd', 'view': 'OrderViewSet.alerts_upcoming_etd', 'method': 'get',
+     'path': '/api/v1/orders/alerts/upcoming-etd/', 'budget': _budget(2)},
+    {'name': 'orders.alerts_stuck_approvals', 'view': 'OrderViewSet.alerts_stuck_approvals', 'method': 'get',
+     'path': '/api/v1/orders/alerts/stuck-approvals/', 'budget': _budget(3)},
+    {'name': 'orders.get_documents', 'view': 'OrderViewSet.get_documents', 'method': 'get', 'path': ORDER + 'documents/',
+     'budget': _budget(24), 'known_growth': 'uploader and line looked up per document'},
+    {'name': 'orders.download_document', 'view': 'OrderViewSet.download_document', 'method': 'get',
+     'path': ORDER + 'documents/{document}/download/', 'budget': _budget(3)},
+    {'name': 'orders.get_line_approval_history', 'view': 'OrderViewSet.get_line_approval_history', 'method': 'get',
+     'path': ORDER + 'lines/{line}/approval-history/', 'budget': _budget(17), 'known_growth': 'changed_by and line looked up per entry'},
+    {'name': 'orders.download_po', 'view': 'OrderViewSet.download_po', 'method': 'get', 'path': ORDER + 'download-po/', 'budget': _budget(2)},
+    {'name': 'orders.export_excel', 'view': 'OrderViewSet.export_excel', 'method': 'get', 'path': '/api/v1/orders/export-excel/',
+     'budget': _budget(3903), 'known_growth': 'approval history and documents queried per line'},
+    {'name': 'orders.export_tna', 'view': 'OrderViewSet.export_tna', 'method': 'get', 'path': '/api/v1/orders/export-tna/',
+     'budget': _budget(143), 'known_growth': 'approval history and deliveries queried per line'},
+    {'name': 'orders.custom_gates.list', 'view': 'OrderViewSet.custom_approval_gates', 'method': 'get',
+     'path': ORDER + 'lines/{line}/custom-gates/', 'budget': _budget(5)},
+    {'name': 'orders.activity_logs.list', 'view': 'OrderViewSet.activity_logs', 'method': 'get', 'path': ORDER + 'activity-logs/',
+     'budget': _budget(30), 'known_growth': 'style looked up per log entry'},
+    {'name': 'orders.get_line_activity_logs', 'view': 'OrderViewSet.get_line_activity_logs', 'method': 'get',
+     'path': ORDER + 'lines/{line}/activity-logs/', 'budget': _budget(6)},
+
+    # Dashboard
+    {'name': 'dashboard', 'method': 'get', 'path': '/api/v1/dashboard/',
+     'budget': _budget(15), 'known_growth': 'ETD lookups and recent-order merchandisers depend on the data'},
+    {'name': 'dashboard.stats', 'method': 'get', 'path': '/api/v1/dashboard/stats/', 'budget': _budget(10)},
+    {'name': 'dashboard.orders_by_merchandiser', 'method': 'get',
+     'path': '/api/v1/dashboard/orders-by-merchandiser/?merchandiser_name={merchandiser_name}', 'budget': _budget(2)},
+
+    # Financials
+    {'name': 'financials.analytics', 'method': 'get', 'path': '/api/v1/financials/analytics/pipeline/',
+     'budget': _budget(102), 'known_growth': 'styles, colors and deliveries queried per order'},
+    {'name': 'financials.order_profits', 'method': 'get', 'path': '/api/v1/financials/order-profits/',
+     'budget': _budget(1076), 'known_growth': 'lines, offers, gates and deliveries queried per order'},
+    {'name': 'financials.pis.list', 'method': 'get', 'path': '/api/v1/financials/pis/', 'budget': _budget(1)},
+    {'name': 'financials.pis.retrieve', 'method': 'get', 'path': '/api/v1/financials/pis/{pi}/', 'budget': _budget(2)},
+    {'name': 'financials.lcs.list', 'method': 'get', 'path': '/api/v1/financials/lcs/', 'budget': _budget(1)},
+    {'name': 'financials.lcs.retrieve', 'method': 'get', 'path': '/api/v1/financials/lcs/{lc}/', 'budget': _budget(2)},
+
+    # Production entries and supplier deliveries - reads
+    {'name': 'production_entries.list', 'method': 'get', 'path': '/api/v1/orders/production-entries/?order={order}', 'budget': _budget(3)},
+    {'name': 'production_entries.retrieve', 'method': 'get', 'path': '/api/v1/orders/production-entries/{entry}/', 'budget': _budget(2)},
+    {'name': 'production_entries.summary', 'method': 'get', 'path': '/api/v1/orders/production-entries/summary/?order={order}', 'budget': _budget(2)},
+    {'name': 'production_entries.throughput', 'method': 'get',
+     'path': '/api/v1/orders/production-entries/throughput/?group_by=order&date_from={date_from}', 'budget': _budget(4)},
+    {'name': 'supplier_deliveries.list', 'method': 'get', 'path': '/api/v1/orders/supplier-deliveries/?order={order}',
+     'budget': _budget(15), 'known_growth': 'line and style looked up per delivery'},
+    {'name': 'supplier_deliveries.retrieve', 'method': 'get', 'path': '/api/v1/orders/supplier-deliveries/{delivery}/', 'budget': _budget(5)},
+
+    # Orders - writes
+    {'name': 'orders.create', 'view': 'OrderViewSet.create', 'method': 'post', 'path': '/api/v1/orders/', 'budget': _budget(26),
+     'data': lambda ctx: {
+         'poNumber': 'BUDGET-1', 'customerName': 'Budget Customer', 'fabricType': 'Single Jersey', 'quantity': 1000,
+         'etd': ctx['etd'], 'eta': ctx['eta'],
+         'styles': [{'styleNumber': 'BUDGET-1-01', 'lines': [
+             {'colorCode': f'QB{number:03d}', 'quantity': 100, 'millPrice': 1, 'provaPrice': 2}
+             for number in range(CREATE_LINES)
+         ]}],
+     }},
+    {'name': 'orders.update', 'view': 'OrderViewSet.update', 'method': 'put', 'path': ORDER, 'budget': _budget(23),
+     'data': lambda ctx: {
+         'poNumber': ctx['order_number'], 'customerName': 'Budget Customer', 'fabricType': 'Single Jersey', 'quantity': 1000,
+         'styles': _order_update_payload(ctx),
+     }},
+    {'name': 'orders.partial_update', 'view': 'OrderViewSet.partial_update', 'method': 'patch', 'path': ORDER, 'budget': _budget(23),
+     'data': lambda ctx: {'notes': 'Query budget check', 'styles': _order_update_payload(ctx)}},
+    {'name': 'orders.update_approval', 'view': 'OrderViewSet.update_approval', 'method': 'patch', 'path': ORDER + 'approvals/', 'budget': _budget(32),
+     'data': lambda ctx: {'approvalType': 'labDip', 'status': 'approved', 'orderLineId': ctx['line']}},
+    {'name': 'orders.bulk_update_approvals', 'view': 'OrderViewSet.bulk_update_approvals', 'method': 'post',
+     'path': '/api/v1/orders/approvals/bulk/', 'budget': _budget(21),
+     'data': lambda ctx: {'updates': [
+         {'orderLineId': line['id'], 'approvalType': 'price', 'status': 'submission'} for line in ctx['lines']
+     ]}},
+    {'name': 'orders.change_stage', 'view': 'OrderViewSet.change_stage', 'method': 'post', 'path': ORDER + 'change-stage/', 'budget': _budget(20),
+     'data': {'stage': 'Production'}},
+    {'name': 'orders.update_line_status', 'view': 'OrderViewSet.update_line_status', 'method': 'patch',
+     'path': ORDER + 'lines/{line}/status/', 'budget': _budget(23), 'data': {'status': 'running'}},
+    {'name': 'orders.bulk_update_line_status', 'view': 'OrderViewSet.bulk_update_line_status', 'method': 'patch',
+     'path': ORDER + 'lines/bulk-status/', 'budget': _budget(20), 'data': {'status': 'bulk'}},
+    {'name': 'orders.update_swatch_dates', 'view': 'OrderViewSet.update_swatch_dates', 'method': 'patch',
+     'path': ORDER + 'lines/{line}/swatch-dates/', 'budget': _budget(23), 'data': lambda ctx: {'swatchReceivedDate': ctx['today']}},
+    {'name': 'orders.update_produced_quantity', 'view': 'OrderViewSet.update_produced_quantity', 'method': 'patch',
+     'path': ORDER + 'lines/{line}/produced-quantity/', 'budget': _budget(24), 'data': {'producedQuantity': 500}},
+    {'name': 'orders.upload_document', 'view': 'OrderViewSet.upload_document', 'method': 'post', 'path': ORDER + 'documents/upload/',
+     'budget': _budget(9), 'format': 'multipart',
+     'data': lambda ctx: {'file': SimpleUploadedFile('budget.txt', b'query budget'), 'category': 'other'}},
+    {'name': 'orders.update_approval_history', 'view': 'OrderViewSet.update_approval_history', 'method': 'patch',
+     'path': ORDER + 'approval-history/{history}/', 'budget': _budget(13), 'data': {'notes': 'Checked'}},
+    {'name': 'orders.custom_gates.create', 'view': 'OrderViewSet.custom_approval_gates', 'method': 'post',
+     'path': ORDER + 'lines/{line}/custom-gates/', 'budget': _budget(11),
+     'data': lambda ctx: {'name': 'Budget Gate', 'orderLineId': ctx['line']}},
+    {'name': 'orders.custom_gates.update', 'view': 'OrderViewSet.update_custom_gate', 'method': 'patch',
+     'path': ORDER + 'custom-gates/{gate}/', 'budget': _budget(18), 'data': {'status': 'approved'}},
+    {'name': 'orders.activity_logs.create', 'view': 'OrderViewSet.activity_logs', 'method': 'post', 'path': ORDER + 'activity-logs/',
+     'budget': _budget(3), 'data': {'content': 'Query budget check'}},
+    {'name': 'orders.activity_logs.update', 'view': 'OrderViewSet.update_activity_log', 'method': 'patch',
+     'path': ORDER + 'activity-logs/{log}/', 'budget': _budget(7), 'data': {'content': 'Query budget check (edited)'}},
+    {'name': 'orders.request_deletion', 'view': 'OrderViewSet.request_deletion', 'method': 'post',
+     'path': ORDER + 'request-deletion/', 'budget': _budget(6), 'data': {'reason': 'Query budget check'}},
+
+    # Production entries and supplier deliveries - writes
+    {'name': 'production_entries.create', 'method': 'post', 'path': '/api/v1/orders/production-entries/', 'budget': _budget(18),
+     'data': lambda ctx: {'order': ctx['order'], 'orderLine': ctx['line'], 'entryType': 'knitting', 'entryDate': ctx['today'], 'quantity': 100}},
+    {'name': 'production_entries.update', 'method': 'patch', 'path': '/api/v1/orders/production-entries/{entry}/', 'budget': _budget(20),
+     'data': {'quantity': 150}},
+    {'name': 'production_entries.import', 'method': 'post', 'path': '/api/v1/orders/production-entries/import/',
+     'budget': _budget(20), 'format': 'multipart',
+     'data': lambda ctx: {'file': SimpleUploadedFile('production.csv', ''.join(
+         [f'PO,Style,Color,CAD,Type,Date,Quantity\n'] + [
+             f"{ctx['order_number']},{line['style_number']},{line['color_code']},{line['cad_code'] or ''},dyeing,{ctx['today']},10\n"
+             for line in ctx['lines']
+         ]).encode())}},
+    {'name': 'supplier_deliveries.create', 'method': 'post', 'path': '/api/v1/orders/supplier-deliveries/', 'budget': _budget(14),
+     'data': lambda ctx: {'order': ctx['order'], 'orderLine': ctx['line'], 'deliveryDate': ctx['today'], 'deliveredQuantity': 100}},
+    {'name': 'supplier_deliveries.update', 'method': 'patch', 'path': '/api/v1/orders/supplier-deliveries/{delivery}/', 'budget': _budget(12),
+     'data': {'deliveredQuantity': 120}},
+
+    # Deletes
+    {'name': 'orders.delete_approval_history', 'view': 'OrderViewSet.delete_approval_history', 'method': 'delete',
+     'path': ORDER + 'approval-history/{history}/delete/', 'budget': _budget(19)},
+    {'name': 'orders.custom_gates.delete', 'view': 'OrderViewSet.update_custom_gate', 'method': 'delete',
+     'path': ORDER + 'custom-gates/{gate}/', 'budget': _budget(12)},
+    {'name': 'orders.activity_logs.delete', 'view': 'OrderViewSet.update_activity_log', 'method': 'delete',
+     'path': ORDER + 'activity-logs/{log}/', 'budget': _budget(4)},
+    {'name': 'production_entries.destroy', 'method': 'delete', 'path': '/api/v1/orders/production-entries/{entry}/', 'budget': _budget(16)},
+    {'name': 'supplier_deliveries.destroy', 'method': 'delete', 'path': '/api/v1/orders/supplier-deliveries/{delivery}/', 'budget': _budget(9)},
+    {'name': 'orders.destroy', 'view': 'OrderViewSet.destroy', 'method': 'delete', 'path': ORDER, 'budget': _budget(44)},
+]
+
+
+def _order_viewset_actions():
+    actions = {'list', 'retrieve', 'create', 'update', 'partial_update', 'destroy'}
+    actions.update(action.__name__ for action in OrderViewSet.get_extra_actions())
+    return {f'OrderViewSet.{action}' for action in actions}
+
+
+class Command(BaseCommand):
+    help = 'Fail when an API endpoint makes more queries on a larger dataset or exceeds its query budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', dest='endpoints', action='append', help='Only check this endpoint name (may be repeated)')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the test database between runs')
+        parser.add_argument('--verbose', action='store_true', help='Print the query count of every endpoint')
+
+    def handle(self, *args, **options):
+        missing = sorted(_order_viewset_actions() - {endpoint['view'] for endpoint in ENDPOINTS if 'view' in endpoint})
+        if missing:
+            raise CommandError(f"No query budget for: {', '.join(missing)} - add them to ENDPOINTS")
+
+        endpoints = ENDPOINTS
+        if options['endpoints']:
+            unknown = set(options['endpoints']) - {endpoint['name'] for endpoint in ENDPOINTS}
+            if unknown:
+                raise CommandError(f"Unknown endpoint(s): {', '.join(sorted(unknown))}")
+            endpoints = [endpoint for endpoint in ENDPOINTS if endpoint['name'] in options['endpoints']]
+
+        media_root = tempfile.mkdtemp(prefix='query-budgets-')
+        # Schema straight from the models: the migration history does not apply
+        # to an empty database (0023_milloffer_standalone recreates mill_offers)
+        migrate = {alias: connections[alias].settings_dict['TEST'].get('MIGRATE', True) for alias in connections}
+        for alias in connections:
+            connections[alias].settings_dict['TEST']['MIGRATE'] = False
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        try:
+            with override_settings(MEDIA_ROOT=media_root, REQUEST_METRICS_ENABLED=False):
+                runs = {size: self.run_dataset(size, endpoints) for size in DATASETS}
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+            shutil.rmtree(media_root, ignore_errors=True)
+            for alias, value in migrate.items():
+                connections[alias].settings_dict['TEST']['MIGRATE'] = value
+
+        budgets_apply = connections['default'].vendor == 'postgresql'
+        if not budgets_apply:
+            self.stdout.write(self.style.WARNING(
+                f"Budgets are PostgreSQL query counts; on {connections['default'].vendor} only growth is checked"
+            ))
+
+        failures = 0
+        for endpoint in endpoints:
+            name = endpoint['name']
+            small, large = runs['small'][name], runs['large'][name]
+            problems = []
+            for size, run in (('small', small), ('large', large)):
+                if run['status'] >= 400:
+                    problems.append(f"{size} dataset returned HTTP {run['status']}: {run['body'][:300]!r}")
+            growth = [
+                f'  +{extra}x {sql[:500]}'
+                for sql, extra in (large['statements'] - small['statements']).most_common(5)
+            ]
+            if large['count'] > small['count'] and not endpoint.get('known_growth'):
+                problems.append(f"query count grows with the dataset: {small['count']} -> {large['count']}")
+                problems.extend(growth)
+            if budgets_apply and large['count'] > endpoint['budget']:
+                problems.append(f"{large['count']} queries, budget {endpoint['budget']}")
+                problems.extend(
+                    f'  {count}x {sql[:500]}'
+                    for sql, count in large['statements'].most_common(5) if count > 1
+                )
+
+            if problems:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f'FAIL {name}'))
+                for problem in problems:
+                    self.stdout.write(f'  {problem}')
+            elif large['count'] > small['count']:
+                self.stdout.write(self.style.WARNING(
+                    f"known {name}: {small['count']} -> {large['count']} queries ({endpoint['known_growth']})"
+                ))
+                if options['verbose']:
+                    for line in growth:
+                        self.stdout.write(f'  {line}')
+            elif options['verbose']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"ok   {name}: {small['count']} / {large['count']} queries (budget {endpoint['budget']})"
+                ))
+
+        if failures:
+            raise CommandError(f'{failures} of {len(endpoints)} endpoint(s) failed the query budget check')
+        self.stdout.write(self.style.SUCCESS(f'All {len(endpoints)} endpoint(s) within their query budgets'))
+
+    def run_dataset(self, size, endpoints):
+        """Seed the test database with dataset `size` and request every endpoint once"""
+        n_orders, n_lines = DATASETS[size]
+        call_command('flush', interactive=False, verbosity=0)
+        call_command(
+            'seed_benchmark_data', orders=n_orders, lines=n_lines, history=n_lines * HISTORY_PER_LINE,
+            merchandisers=3, stdout=io.StringIO(),
+        )
+        ctx = self.build_context()
+        user = User.objects.get(email=ADMIN_EMAIL)
+        client = Client(raise_request_exception=False, HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+        runs = {}
+        for endpoint in endpoints:
+            data = endpoint.get('data')
+            if callable(data):
+                data = data(ctx)
+            kwargs = {}
+            if data is not None:
+                if endpoint.get('format') == 'multipart':
+                    kwargs['data'] = data
+                else:
+                    kwargs.update(data=data, content_type='application/json')
+
+            recorder = QueryRecorder()
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                response = getattr(client, endpoint['method'])(endpoint['path'].format(**ctx), **kwargs)
+                body = b''.join(response.streaming_content) if response.streaming else response.content
+            statements = Counter()
+            for sql, count in recorder.statements.items():
+                statements[SAVEPOINT_ID.sub('"savepoint"', sql)] += count
+            runs[endpoint['name']] = {
+                'status': response.status_code,
+                'body': body,
+                'count': recorder.count,
+                'statements': statements,
+            }
+        return runs
+
+    def build_context(self):
+        """
+        Pick the order with the most lines as the target of detail endpoints and
+        add the rows the generator does not make (gates, activity logs,
+        documents, PIs and LCs), scaled with the dataset.
+        """
+        today = date.today()
+        order = Order.objects.annotate(line_count=Count('styles__lines')).order_by('-line_count', 'order_number').first()
+        # Keep ETD/ETA recent so order updates pass validation
+        Order.objects.filter(id=order.id).update(etd=today + timedelta(days=30), eta=today + timedelta(days=50))
+        order.refresh_from_db()
+        user = User.objects.get(email=ADMIN_EMAIL)
+        lines = list(OrderLine.objects.filter(style__order=order).select_related('style').order_by('sequence_number'))
+
+        for number, line in enumerate(lines):
+            CustomApprovalGate.objects.create(
+                order_line=line, name=f'Gate {number}', gate_key=f'custom_gate_{number}', created_by=user,
+            )
+            OrderActivityLog.objects.create(order=order, order_line=line, content=f'Note {number}', created_by=user)
+            if number % 4 == 0:
+                Document.objects.create(
+                    order=order, order_line=line, file=ContentFile(b'document', name=f'document-{number}.txt'),
+                    file_name=f'document-{number}.txt', file_type='text/plain', file_size=8,
+                    category=Document.Category.OTHER, uploaded_by=user,
+                )
+        # The generator may leave the target order without an entry or delivery
+        ProductionEntry.objects.create(
+            order=order, order_line=lines[0], entry_type='knitting', entry_date=today, quantity=100, created_by=user,
+        )
+        SupplierDelivery.objects.create(
+            order=order, order_line=lines[0], style=lines[0].style, delivery_date=today, delivered_quantity=100, created_by=user,
+        )
+        for number, each in enumerate(Order.objects.order_by('order_number')):
+            ProformaInvoice.objects.create(order=each, pi_number=f'PI-{number:04d}', amount=1000, created_by=user)
+            LetterOfCredit.objects.create(
+                order=each, lc_number=f'LC-{number:04d}', amount=1000, issue_date=today,
+                expiry_date=today + timedelta(days=90), created_by=user,
+            )
+
+        return {
+            'order': str(order.id),
+            'order_number': order.order_number,
+            'merchandiser_name': order.merchandiser.full_name,
+            'etd': order.etd.isoformat(),
+            'eta': order.eta.isoformat(),
+            'today': today.isoformat(),
+            'date_from': (today - timedelta(days=365)).isoformat(),
+            'line': str(lines[0].id),
+            'lines': [
+                {
+                    'id': str(line.id), 'color_code': line.color_code, 'cad_code': line.cad_code,
+                    'quantity': str(line.quantity), 'style_number': line.style.style_number,
+                }
+                for line in lines
+            ],
+            'line_styles': {str(line.id): str(line.style_id) for line in lines},
+            'style_numbers': {str(line.style_id): line.style.style_number for line in lines},
+            'history': str(ApprovalHistory.objects.filter(order=order).order_by('created_at').values_list('id', flat=True).first()),
+            'gate': str(CustomApprovalGate.objects.filter(order_line__style__order=order).order_by('name').values_list('id', flat=True).first()),
+            'log': str(OrderActivityLog.objects.filter(order=order).order_by('created_at').values_list('id', flat=True).first()),
+            'document': str(Document.objects.filter(order=order).values_list('id', flat=True).first()),
+            'entry': str(ProductionEntry.objects.filter(order=order).values_list('id', flat=True).first()),
+            'delivery': str(SupplierDelivery.objects.filter(order=order).values_list('id', flat=True).first()),
+            'pi': str(ProformaInvoice.objects.filter(order=order).values_list('id', flat=True).first()),
+            'lc': str(LetterOfCredit.objects.filter(order=order).values_list('id', flat=True).first()),
+        }
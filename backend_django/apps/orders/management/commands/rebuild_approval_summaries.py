@@ -0,0 +1,34 @@
+"""Management command to rebuild per-order approval counts from the order lines.
+OrderApprovalSummary rows are normally maintained incrementally; run this to
+backfill them up front or to repair counts after bulk edits made outside the ORM.
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.orders.models import Order
+from apps.orders.utils.approval_counts import rebuild_summary
+
+
+class Command(BaseCommand):
+    help = "Recompute OrderApprovalSummary counts from OrderLine.approval_status."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--order',
+            dest='order_ids',
+            action='append',
+            help='Only rebuild this order (may be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        order_ids = options.get('order_ids')
+        queryset = Order.objects.all()
+        if order_ids:
+            queryset = queryset.filter(id__in=order_ids)
+
+        rebuilt = 0
+        for order_id in queryset.values_list('id', flat=True).iterator():
+            rebuild_summary(order_id)
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt approval summaries for {rebuilt} order(s)."))
@@ -0,0 +1,34 @@
+"""Management command to rebuild per-line production rollups from the production entries.
+ProductionRollup rows are normally maintained incrementally; run this to repair
+them after entries were changed outside the ORM (raw SQL, QuerySet.update()).
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.orders.models import Order
+from apps.orders.utils.production_rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute ProductionRollup totals from ProductionEntry rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--order',
+            dest='order_ids',
+            action='append',
+            help='Only rebuild this order (may be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        order_ids = options.get('order_ids')
+        queryset = Order.objects.all()
+        if order_ids:
+            queryset = queryset.filter(id__in=order_ids)
+
+        rebuilt = 0
+        for order_id in queryset.values_list('id', flat=True).iterator():
+            rebuild_rollups(order_id)
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt production rollups for {rebuilt} order(s)."))
@@ -0,0 +1,449 @@
+"""Management command to generate a large, reproducible dataset for performance work.
+
+Rows are built in memory and written with bulk_create, a chunk of orders at a
+time. All random choices (including primary keys and timestamps) come from one
+seeded generator, so the same options always produce the same dataset
+relative to --anchor-date.
+
+Bulk inserts send no signals, so the rows normally maintained by them
+(approval summaries, line approval states, production rollups and change
+feed entries) are written here as well.
+
+Usage:
+    python manage.py seed_benchmark_data --orders 10000 --lines 200000 --history 1000000
+    python manage.py seed_benchmark_data --clear
+"""
+import random
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core import counters
+from apps.orders.models import ApprovalHistory, Order, OrderCategory, OrderStatus, OrderType
+from apps.orders.models_approval_summary import OrderApprovalSummary
+from apps.orders.models_line_approval_state import LineApprovalState
+from apps.orders.models_order_change import OrderChange
+from apps.orders.models_order_line import OrderLine
+from apps.orders.models_production_entry import ProductionEntry, ProductionEntryType
+from apps.orders.models_production_rollup import ProductionRollup
+from apps.orders.models_style_color import OrderStyle
+from apps.orders.models_supplier_delivery import SupplierDelivery
+from apps.orders.utils import order_changes
+from apps.orders.utils.approval_counts import compute_counts, derive_order_status
+
+User = get_user_model()
+
+ORDER_NUMBER_PREFIX = 'BENCH-'
+ADMIN_EMAIL = 'bench.admin@provabook.local'
+MERCHANDISER_EMAIL = 'bench.merchandiser{:02d}@provabook.local'
+
+GATES = [choice[0] for choice in ApprovalHistory.APPROVAL_TYPE_CHOICES]
+PENDING_STATUSES = ('submission', 'resubmission')
+
+# category -> (weight, possible statuses, order age range in days, stages)
+CATEGORY_PROFILES = {
+    OrderCategory.UPCOMING: (25, [OrderStatus.UPCOMING, OrderStatus.IN_DEVELOPMENT], (0, 60), ['Design']),
+    OrderCategory.RUNNING: (45, [OrderStatus.RUNNING, OrderStatus.BULK], (20, 180), ['Bulk', 'Production']),
+    OrderCategory.ARCHIVED: (30, [OrderStatus.COMPLETED, OrderStatus.ARCHIVED], (120, 540), ['Delivered']),
+}
+
+CUSTOMERS = [f'Bench Customer {n:03d}' for n in range(1, 201)]
+BUYERS = [f'Bench Buyer {n:02d}' for n in range(1, 41)]
+MILLS = [f'Bench Mill {n:02d}' for n in range(1, 31)]
+FABRICS = [
+    ('Single Jersey', '100% Cotton'),
+    ('Pique', '95% Cotton 5% Elastane'),
+    ('Fleece', '80% Cotton 20% Polyester'),
+    ('Interlock', '100% Cotton'),
+    ('Rib 1x1', '96% Cotton 4% Elastane'),
+    ('Twill', '98% Cotton 2% Elastane'),
+]
+COLORS = [(f'C{n:03d}', f'Bench Color {n:03d}') for n in range(1, 41)]
+
+
+def _spread(total, weights):
+    """Split `total` into integer parts proportional to `weights` (parts sum to `total`)"""
+    weight_sum = sum(weights)
+    if not weight_sum:
+        return [0] * len(weights)
+    quotas = [total * weight / weight_sum for weight in weights]
+    counts = [int(quota) for quota in quotas]
+    remainder = total - sum(counts)
+    by_fraction = sorted(range(len(weights)), key=lambda i: quotas[i] - counts[i], reverse=True)
+    for i in by_fraction[:remainder]:
+        counts[i] += 1
+    return counts
+
+
+@contextmanager
+def _explicit_timestamps(*models):
+    """Let bulk_create keep the created_at/updated_at values set on the objects"""
+    fields = [model._meta.get_field(name) for model in models for name in ('created_at', 'updated_at')]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = 'Generate a large reproducible dataset (orders, lines, approval history, deliveries, production) for benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=10000, help='Number of orders (default 10000)')
+        parser.add_argument('--lines', type=int, default=200000, help='Total order lines (default 200000)')
+        parser.add_argument('--history', type=int, default=1000000, help='Total approval history rows (default 1000000)')
+        parser.add_argument('--deliveries', type=int, default=None, help='Total supplier deliveries (default 2 per order)')
+        parser.add_argument('--production-entries', type=int, default=None, help='Total production entries (default 5 per order)')
+        parser.add_argument('--merchandisers', type=int, default=20, help='Number of merchandiser users (default 20)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default 42)')
+        parser.add_argument('--anchor-date', type=date.fromisoformat, default=None, help='Date the dataset is relative to, YYYY-MM-DD (default today)')
+        parser.add_argument('--chunk-size', type=int, default=250, help='Orders generated and written per transaction (default 250)')
+        parser.add_argument('--batch-size', type=int, default=2000, help='bulk_create batch size (default 2000)')
+        parser.add_argument('--clear', action='store_true', help='Delete previously generated benchmark orders first (slow for large datasets: deletes send signals)')
+
+    def handle(self, *args, **options):
+        n_orders = options['orders']
+        n_lines = options['lines']
+        if n_orders < 1:
+            raise CommandError('--orders must be at least 1')
+        if n_lines < n_orders:
+            raise CommandError('--lines must be at least --orders (every order gets one line or more)')
+
+        if options['clear']:
+            self.clear()
+        elif Order.objects.filter(order_number__startswith=ORDER_NUMBER_PREFIX).exists():
+            raise CommandError('Benchmark orders already exist; pass --clear to replace them')
+
+        self.rng = random.Random(options['seed'])
+        self.anchor = options['anchor_date'] or date.today()
+        self.batch_size = options['batch_size']
+        self.users = self.ensure_users(options['merchandisers'])
+
+        n_deliveries = options['deliveries'] if options['deliveries'] is not None else n_orders * 2
+        n_production = options['production_entries'] if options['production_entries'] is not None else n_orders * 5
+
+        # Per-order row counts, skewed so some orders are much larger than others
+        rng = self.rng
+        size_weights = [rng.lognormvariate(0, 0.75) for _ in range(n_orders)]
+        lines_per_order = [count + 1 for count in _spread(n_lines - n_orders, size_weights)]
+        history_per_order = _spread(options['history'], [count * rng.uniform(0.5, 1.5) for count in lines_per_order])
+        deliveries_per_order = _spread(n_deliveries, [rng.random() for _ in range(n_orders)])
+        production_per_order = _spread(n_production, [rng.random() for _ in range(n_orders)])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'=== Generating {n_orders} orders, {n_lines} lines, {options["history"]} approval history rows, '
+            f'{n_deliveries} deliveries, {n_production} production entries (seed {options["seed"]}, anchor {self.anchor}) ==='
+        ))
+
+        chunk_size = options['chunk_size']
+        for start in range(0, n_orders, chunk_size):
+            end = min(start + chunk_size, n_orders)
+            plan = [
+                (index, lines_per_order[index], history_per_order[index],
+                 deliveries_per_order[index], production_per_order[index])
+                for index in range(start, end)
+            ]
+            self.write_chunk(plan)
+            self.stdout.write(f'  [OK] Orders {start + 1}-{end}')
+
+        self.stdout.write(self.style.SUCCESS(f'\n=== Benchmark data ready - run benchmark_endpoints --user {ADMIN_EMAIL} ==='))
+
+    def clear(self):
+        order_ids = list(
+            Order.objects.filter(order_number__startswith=ORDER_NUMBER_PREFIX).values_list('id', flat=True)
+        )
+        for start in range(0, len(order_ids), 100):
+            Order.objects.filter(id__in=order_ids[start:start + 100]).delete()
+        if order_ids:
+            self.stdout.write(self.style.WARNING(f'Removed {len(order_ids)} benchmark orders'))
+
+    def ensure_users(self, count):
+        """Admin and merchandiser accounts owning the generated orders (created once, kept on --clear)"""
+        admin, _ = User.objects.get_or_create(
+            email=ADMIN_EMAIL,
+            defaults={'full_name': 'Benchmark Admin', 'role': 'admin', 'is_staff': True},
+        )
+        merchandisers = []
+        for number in range(1, count + 1):
+            user, created = User.objects.get_or_create(
+                email=MERCHANDISER_EMAIL.format(number),
+                defaults={'full_name': f'Benchmark Merchandiser {number:02d}', 'role': 'merchandiser'},
+            )
+            if created:
+                user.set_unusable_password()
+                user.save(update_fields=['password'])
+            merchandisers.append(user)
+        if not admin.has_usable_password():
+            admin.set_unusable_password()
+            admin.save(update_fields=['password'])
+        return merchandisers
+
+    # Row builders
+
+    def _uuid(self):
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def _moment(self, day):
+        """Timezone-aware datetime at a random time of `day`"""
+        naive = datetime.combine(day, time()) + timedelta(seconds=self.rng.randint(0, 86399))
+        return timezone.make_aware(naive, timezone.get_default_timezone())
+
+    def _money(self, low, high):
+        return Decimal(str(round(self.rng.uniform(low, high), 2)))
+
+    def write_chunk(self, plan):
+        rows = {model: [] for model in (
+            Order, OrderStyle, OrderLine, ApprovalHistory, SupplierDelivery,
+            ProductionEntry, OrderApprovalSummary, LineApprovalState, ProductionRollup,
+        )}
+        for index, n_lines, n_history, n_deliveries, n_production in plan:
+            self.build_order(rows, index, n_lines, n_history, n_deliveries, n_production)
+
+        with transaction.atomic(), _explicit_timestamps(*rows):
+            for model, objects in rows.items():
+                model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+            # Change feed entries for the new orders (replacing tombstones left by --clear)
+            order_ids = [order.id for order in rows[Order]]
+            OrderChange.objects.filter(order_id__in=order_ids).delete()
+            first = counters.allocate(order_changes.COUNTER, count=len(order_ids))
+            OrderChange.objects.bulk_create([
+                OrderChange(order_id=order.id, merchandiser_id=order.merchandiser_id, sequence=sequence)
+                for sequence, order in enumerate(rows[Order], start=first)
+            ], batch_size=self.batch_size)
+
+    def build_order(self, rows, index, n_lines, n_history, n_deliveries, n_production):
+        rng = self.rng
+        category = rng.choices(list(CATEGORY_PROFILES), weights=[p[0] for p in CATEGORY_PROFILES.values()])[0]
+        _, statuses, (min_age, max_age), stages = CATEGORY_PROFILES[category]
+        status = rng.choice(statuses)
+        order_date = self.anchor - timedelta(days=rng.randint(min_age, max_age))
+        etd = order_date + timedelta(days=rng.randint(30, 90))
+        eta = etd + timedelta(days=rng.randint(15, 35))
+        created_at = self._moment(order_date)
+        merchandiser = rng.choice(self.users)
+        fabric_type, composition = rng.choice(FABRICS)
+        order_type = OrderType.LOCAL if rng.random() < 0.2 else OrderType.FOREIGN
+
+        order = Order(
+            id=self._uuid(),
+            uid=self._uuid(),
+            order_number=f'{ORDER_NUMBER_PREFIX}{index + 1:06d}',
+            customer_name=rng.choice(CUSTOMERS),
+            buyer_name=rng.choice(BUYERS),
+            base_style_number=f'BS-{index + 1:06d}',
+            fabric_type=fabric_type,
+            fabric_composition=composition,
+            gsm=Decimal(rng.randrange(140, 320, 10)),
+            mill_name=rng.choice(MILLS),
+            currency='BDT' if order_type == OrderType.LOCAL else 'USD',
+            unit='yards',
+            order_date=order_date,
+            expected_delivery_date=eta,
+            etd=etd,
+            eta=eta,
+            actual_delivery_date=eta + timedelta(days=rng.randint(-5, 10)) if category == OrderCategory.ARCHIVED else None,
+            status=status,
+            category=category,
+            current_stage=rng.choice(stages),
+            order_type=order_type,
+            merchandiser=merchandiser,
+            created_by=merchandiser,
+            created_at=created_at,
+            updated_at=created_at,
+        )
+
+        n_styles = min(n_lines, rng.randint(1, 4))
+        styles = []
+        for number in range(1, n_styles + 1):
+            styles.append(OrderStyle(
+                id=self._uuid(),
+                order=order,
+                style_number=f'{order.base_style_number}-{number:02d}',
+                fabric_type=fabric_type,
+                fabric_composition=composition,
+                gsm=order.gsm,
+                etd=etd,
+                eta=eta,
+                submission_date=order_date,
+                sequence_number=number,
+                created_at=created_at,
+                updated_at=created_at,
+            ))
+
+        lines = []
+        for number in range(n_lines):
+            style = styles[number % n_styles]
+            combination = number // n_styles
+            color_code, color_name = COLORS[combination % len(COLORS)]
+            mill_price = self._money(1.0, 5.0)
+            quantity = Decimal(rng.randrange(500, 20000, 50))
+            if category == OrderCategory.ARCHIVED:
+                gate_statuses = {gate: 'approved' for gate in rng.sample(GATES, rng.randint(1, 4))}
+            else:
+                gate_statuses = {
+                    gate: rng.choices(['submission', 'resubmission', 'approved', 'rejected'], weights=[4, 2, 5, 1])[0]
+                    for gate in rng.sample(GATES, rng.randint(1, 4))
+                }
+            line = OrderLine(
+                id=self._uuid(),
+                style=style,
+                color_code=color_code,
+                color_name=color_name,
+                cad_code=f'CAD-{combination // len(COLORS)}' if combination >= len(COLORS) else None,
+                quantity=quantity,
+                unit='yards',
+                mill_name=order.mill_name,
+                mill_price=mill_price,
+                prova_price=mill_price + self._money(0.2, 1.0),
+                commission=self._money(0.05, 0.3),
+                currency=order.currency,
+                etd=etd,
+                eta=eta,
+                submission_date=order_date,
+                approval_status=gate_statuses,
+                status=status,
+                sequence_number=number + 1,
+                created_at=created_at,
+                updated_at=created_at,
+            )
+            if order_type == OrderType.LOCAL:
+                line.yarn_booked_date = order_date + timedelta(days=rng.randint(3, 10))
+                line.yarn_received_date = line.yarn_booked_date + timedelta(days=rng.randint(3, 10))
+                line.apply_local_order_calculations(order)
+            lines.append(line)
+
+        order.quantity = sum(line.quantity for line in lines)
+        order.mill_price = lines[0].mill_price
+        order.prova_price = lines[0].prova_price
+        line_count, gate_counts = compute_counts(line.approval_status for line in lines)
+        summary = OrderApprovalSummary(
+            id=self._uuid(), order=order, line_count=line_count, gate_counts=gate_counts,
+            created_at=created_at, updated_at=created_at,
+        )
+        order.approval_status = {
+            gate: derive_order_status(summary, gate) for gate in gate_counts
+        }
+
+        rows[Order].append(order)
+        rows[OrderStyle].extend(styles)
+        rows[OrderLine].extend(lines)
+        rows[OrderApprovalSummary].append(summary)
+        self.build_approval_history(rows, order, lines, n_history)
+        self.build_deliveries(rows, order, lines, n_deliveries)
+        self.build_production(rows, order, lines, n_production)
+
+    def build_approval_history(self, rows, order, lines, n_history):
+        """History rows per line ending in the line's current status, plus its LineApprovalState rows"""
+        rng = self.rng
+        days_since_order = max(1, (self.anchor - order.order_date).days)
+        # Every gate of every line needs one row (its current status); the rest is spread at random
+        minimums = [len(line.approval_status) for line in lines]
+        extra = _spread(max(0, n_history - sum(minimums)), [rng.random() + 0.2 for _ in lines])
+        for line, minimum, more in zip(lines, minimums, extra):
+            gates = list(line.approval_status)
+            count = minimum + more
+            moments = sorted(
+                self._moment(order.order_date + timedelta(days=rng.randint(0, days_since_order)))
+                for _ in range(count)
+            )
+            last_index = {gate: index for index, gate in enumerate(gates[i % len(gates)] for i in range(count))}
+            first_pending = {}
+            for index, moment in enumerate(moments):
+                gate = gates[index % len(gates)]
+                if last_index[gate] == index:
+                    status_value = line.approval_status[gate]
+                else:
+                    status_value = rng.choice(['submission', 'resubmission', 'rejected'])
+                if status_value in PENDING_STATUSES:
+                    first_pending.setdefault(gate, moment)
+                rows[ApprovalHistory].append(ApprovalHistory(
+                    id=self._uuid(),
+                    order=order,
+                    order_line=line,
+                    approval_type=gate,
+                    status=status_value,
+                    changed_by=order.merchandiser,
+                    created_at=moment,
+                    updated_at=moment,
+                ))
+            for gate, status_value in line.approval_status.items():
+                changed_at = moments[last_index[gate]]
+                rows[LineApprovalState].append(LineApprovalState(
+                    id=self._uuid(),
+                    order=order,
+                    order_line=line,
+                    approval_type=gate,
+                    status=status_value,
+                    first_submitted_at=first_pending.get(gate),
+                    last_changed_at=changed_at,
+                    created_at=changed_at,
+                    updated_at=changed_at,
+                ))
+
+    def build_deliveries(self, rows, order, lines, count):
+        rng = self.rng
+        for _ in range(count):
+            line = rng.choice(lines)
+            delivery_date = min(self.anchor, order.etd + timedelta(days=rng.randint(-10, 20)))
+            moment = self._moment(delivery_date)
+            rows[SupplierDelivery].append(SupplierDelivery(
+                id=self._uuid(),
+                order=order,
+                order_line=line,
+                style=line.style,
+                delivery_date=delivery_date,
+                delivered_quantity=(line.quantity * Decimal(str(round(rng.uniform(0.2, 0.6), 2)))).quantize(Decimal('0.01')),
+                unit=line.unit,
+                created_by=order.merchandiser,
+                created_at=moment,
+                updated_at=moment,
+            ))
+
+    def build_production(self, rows, order, lines, count):
+        """Production entries (10% without a line) and the rollups they add up to"""
+        rng = self.rng
+        rollups = {}
+        days_since_order = max(1, (self.anchor - order.order_date).days)
+        for _ in range(count):
+            line = rng.choice(lines) if rng.random() >= 0.1 else None
+            entry_type = rng.choice(ProductionEntryType.values)
+            entry_date = order.order_date + timedelta(days=rng.randint(0, days_since_order))
+            quantity = Decimal(rng.randrange(50, 2000, 10))
+            moment = self._moment(entry_date)
+            rows[ProductionEntry].append(ProductionEntry(
+                id=self._uuid(),
+                order=order,
+                order_line=line,
+                entry_type=entry_type,
+                entry_date=entry_date,
+                quantity=quantity,
+                created_by=order.merchandiser,
+                created_at=moment,
+                updated_at=moment,
+            ))
+            key = (line, entry_type)
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollup = rollups[key] = ProductionRollup(
+                    id=self._uuid(), order=order, order_line=line, entry_type=entry_type,
+                    total_quantity=Decimal('0'), entry_count=0,
+                    first_entry_date=entry_date, last_entry_date=entry_date,
+                    created_at=moment, updated_at=moment,
+                )
+            rollup.total_quantity += quantity
+            rollup.entry_count += 1
+            rollup.first_entry_date = min(rollup.first_entry_date, entry_date)
+            rollup.last_entry_date = max(rollup.last_entry_date, entry_date)
+            rollup.updated_at = max(rollup.updated_at, moment)
+        rows[ProductionRollup].extend(rollups.values())
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-18 23:44
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0034_add_produced_quantity_to_orderline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderApprovalSummary',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('line_count', models.PositiveIntegerField(default=0, help_text='Number of lines in the order')),
+                ('gate_counts', models.JSONField(blank=True, default=dict, help_text='Line status counts per approval gate')),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='approval_summary', to='orders.order')),
+            ],
+            options={
+                'verbose_name': 'Order Approval Summary',
+                'verbose_name_plural': 'Order Approval Summaries',
+                'db_table': 'order_approval_summaries',
+            },
+        ),
+    ]
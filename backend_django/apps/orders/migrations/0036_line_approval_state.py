@@ -0,0 +1,92 @@
+# Generated by Django 5.0.1 on 2026-10-18 23:45
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+PENDING_STATUSES = ('submission', 'resubmission')
+
+
+def backfill_line_approval_states(apps, schema_editor):
+    """Create state rows for existing line and custom gate statuses, timed from approval history"""
+    OrderLine = apps.get_model('orders', 'OrderLine')
+    CustomApprovalGate = apps.get_model('orders', 'CustomApprovalGate')
+    ApprovalHistory = apps.get_model('orders', 'ApprovalHistory')
+    LineApprovalState = apps.get_model('orders', 'LineApprovalState')
+
+    last_changed = {}
+    first_submitted = {}
+    history = (
+        ApprovalHistory.objects.filter(order_line__isnull=False)
+        .order_by('created_at')
+        .values_list('order_line_id', 'approval_type', 'status', 'created_at')
+    )
+    for line_id, approval_type, status_value, created_at in history.iterator():
+        key = (line_id, approval_type)
+        last_changed[key] = created_at
+        if status_value in PENDING_STATUSES:
+            first_submitted.setdefault(key, created_at)
+
+    def build(order_id, line_id, approval_type, status_value, fallback_time):
+        key = (line_id, approval_type)
+        changed_at = last_changed.get(key, fallback_time)
+        first_at = first_submitted.get(key)
+        if first_at is None and status_value in PENDING_STATUSES:
+            first_at = changed_at
+        return LineApprovalState(
+            order_id=order_id,
+            order_line_id=line_id,
+            approval_type=approval_type,
+            status=status_value,
+            first_submitted_at=first_at,
+            last_changed_at=changed_at,
+        )
+
+    states = []
+    lines = OrderLine.objects.values_list('id', 'style__order_id', 'approval_status', 'updated_at')
+    for line_id, order_id, approval_status, updated_at in lines.iterator():
+        for approval_type, status_value in (approval_status or {}).items():
+            if status_value and status_value != 'default':
+                states.append(build(order_id, line_id, approval_type, status_value, updated_at))
+
+    gates = (
+        CustomApprovalGate.objects.exclude(status='default')
+        .values_list('order_line_id', 'order_line__style__order_id', 'gate_key', 'status', 'updated_at')
+    )
+    for line_id, order_id, gate_key, status_value, updated_at in gates.iterator():
+        states.append(build(order_id, line_id, gate_key, status_value, updated_at))
+
+    LineApprovalState.objects.bulk_create(states, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0035_order_approval_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LineApprovalState',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('approval_type', models.CharField(help_text='Standard gate name or custom gate key', max_length=120)),
+                ('status', models.CharField(max_length=20)),
+                ('first_submitted_at', models.DateTimeField(blank=True, help_text='When the gate first entered submission/resubmission', null=True)),
+                ('last_changed_at', models.DateTimeField(help_text='When the current status was set')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='line_approval_states', to='orders.order')),
+                ('order_line', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='approval_states', to='orders.orderline')),
+            ],
+            options={
+                'verbose_name': 'Line Approval State',
+                'verbose_name_plural': 'Line Approval States',
+                'db_table': 'line_approval_states',
+                'indexes': [models.Index(fields=['status', 'last_changed_at'], name='line_approv_status_c28876_idx'), models.Index(fields=['order', 'status'], name='line_approv_order_i_6e6598_idx')],
+                'unique_together': {('order_line', 'approval_type')},
+            },
+        ),
+        migrations.RunPython(backfill_line_approval_states, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.0.1 on 2026-10-18 23:56
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+
+
+def backfill_production_rollups(apps, schema_editor):
+    """Build rollups from the existing production entries"""
+    ProductionEntry = apps.get_model('orders', 'ProductionEntry')
+    ProductionRollup = apps.get_model('orders', 'ProductionRollup')
+
+    rows = (
+        ProductionEntry.objects.values('order_id', 'order_line_id', 'entry_type')
+        .annotate(
+            total_quantity=Sum('quantity'),
+            entry_count=Count('id'),
+            first_entry_date=Min('entry_date'),
+            last_entry_date=Max('entry_date'),
+        )
+        .order_by()
+    )
+    ProductionRollup.objects.bulk_create(
+        [ProductionRollup(id=uuid.uuid4(), **row) for row in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0036_line_approval_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductionRollup',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('entry_type', models.CharField(help_text='Production entry type', max_length=20)),
+                ('total_quantity', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('first_entry_date', models.DateField(blank=True, null=True)),
+                ('last_entry_date', models.DateField(blank=True, null=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='production_rollups', to='orders.order')),
+                ('order_line', models.ForeignKey(blank=True, help_text='Order line of the entries (empty for order-level entries)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='production_rollups', to='orders.orderline')),
+            ],
+            options={
+                'verbose_name': 'Production Rollup',
+                'verbose_name_plural': 'Production Rollups',
+                'db_table': 'production_rollups',
+                'indexes': [models.Index(fields=['order', 'entry_type'], name='production__order_i_16d7cf_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='productionrollup',
+            constraint=models.UniqueConstraint(fields=('order_line', 'entry_type'), name='unique_production_rollup_line'),
+        ),
+        migrations.AddConstraint(
+            model_name='productionrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('order_line__isnull', True)), fields=('order', 'entry_type'), name='unique_production_rollup_order'),
+        ),
+        migrations.RunPython(backfill_production_rollups, reverse_code=migrations.RunPython.noop),
+    ]
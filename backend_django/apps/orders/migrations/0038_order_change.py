@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-19 00:10
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0037_production_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderChange',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('order_id', models.UUIDField(unique=True)),
+                ('merchandiser_id', models.UUIDField(blank=True, help_text='Merchandiser of the order when last changed (scopes tombstones)', null=True)),
+                ('sequence', models.BigIntegerField(db_index=True, help_text='Change cursor value of the latest change')),
+                ('deleted', models.BooleanField(default=False)),
+            ],
+            options={
+                'verbose_name': 'Order Change',
+                'verbose_name_plural': 'Order Changes',
+                'db_table': 'order_changes',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 01:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0038_order_change'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderchange',
+            name='former_merchandiser_ids',
+            field=models.JSONField(blank=True, default=list, help_text='Merchandisers the order was reassigned away from (tombstone in their feeds)'),
+        ),
+    ]
@@ -9,6 +9,10 @@ from .models_document import Document
 # Import related models to register their reverse relationships with Order
 from .models_production_entry import ProductionEntry, ProductionEntryType  # noqa: F401
 from .models_supplier_delivery import SupplierDelivery  # noqa: F401
+from .models_approval_summary import OrderApprovalSummary  # noqa: F401
+from .models_line_approval_state import LineApprovalState  # noqa: F401
+from .models_production_rollup import ProductionRollup  # noqa: F401
+from .models_order_change import OrderChange  # noqa: F401
 
 class OrderStatus(models.TextChoices):
     """Order status choices"""
@@ -232,6 +236,10 @@ class Order(TimestampedModel):
     @property
     def total_delivered_quantity(self):
         """Calculate total delivered quantity from all supplier deliveries"""
+        # Use prefetched deliveries when available (see OrderSerializer.setup_eager_loading)
+        prefetched = getattr(self, '_prefetched_objects_cache', {}).get('supplier_deliveries')
+        if prefetched is not None:
+            return float(sum(d.delivered_quantity or 0 for d in prefetched))
         from django.db.models import Sum
         result = self.supplier_deliveries.aggregate(total=Sum('delivered_quantity'))
         return float(result['total']) if result['total'] else 0.0
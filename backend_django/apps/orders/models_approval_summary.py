@@ -0,0 +1,37 @@
+"""
+OrderApprovalSummary model - Running per-gate approval status counts for an order
+"""
+from django.db import models
+from apps.core.models import TimestampedModel
+
+
+class OrderApprovalSummary(TimestampedModel):
+    """
+    Per-order, per-gate counts of line approval statuses.
+    
+    Maintained incrementally whenever a line's approval_status entry changes
+    (see apps.orders.utils.approval_counts), so the order-level approval_status
+    can be derived without scanning every line of the order.
+    
+    gate_counts example:
+        {"labDip": {"approved": 3, "submission": 1}, "price": {"rejected": 1}}
+    """
+    order = models.OneToOneField(
+        'orders.Order',
+        on_delete=models.CASCADE,
+        related_name='approval_summary'
+    )
+    line_count = models.PositiveIntegerField(default=0, help_text='Number of lines in the order')
+    gate_counts = models.JSONField(default=dict, blank=True, help_text='Line status counts per approval gate')
+    
+    class Meta:
+        db_table = 'order_approval_summaries'
+        verbose_name = 'Order Approval Summary'
+        verbose_name_plural = 'Order Approval Summaries'
+    
+    def __str__(self):
+        return f"Approval summary for order {self.order_id}"
+    
+    def count(self, approval_type, status_value):
+        """Number of lines with `status_value` for `approval_type`"""
+        return (self.gate_counts.get(approval_type) or {}).get(status_value, 0)
@@ -0,0 +1,51 @@
+"""
+LineApprovalState model - Current approval status of each gate on each order line
+"""
+from django.db import models
+from apps.core.models import TimestampedModel
+
+
+class LineApprovalState(TimestampedModel):
+    """
+    One row per (order line, approval gate) holding the gate's current status.
+
+    Normalized copy of OrderLine.approval_status plus custom gate statuses,
+    kept up to date by the approval endpoints (see
+    apps.orders.utils.approval_state). Lets alerts such as "stuck in
+    submission for more than N days" use an index instead of scanning JSON.
+    Gates in their default (unset) state have no row.
+    """
+
+    PENDING_STATUSES = ('submission', 'resubmission')
+
+    order = models.ForeignKey(
+        'orders.Order',
+        on_delete=models.CASCADE,
+        related_name='line_approval_states'
+    )
+    order_line = models.ForeignKey(
+        'orders.OrderLine',
+        on_delete=models.CASCADE,
+        related_name='approval_states'
+    )
+    approval_type = models.CharField(max_length=120, help_text='Standard gate name or custom gate key')
+    status = models.CharField(max_length=20)
+    first_submitted_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='When the gate first entered submission/resubmission'
+    )
+    last_changed_at = models.DateTimeField(help_text='When the current status was set')
+
+    class Meta:
+        db_table = 'line_approval_states'
+        verbose_name = 'Line Approval State'
+        verbose_name_plural = 'Line Approval States'
+        unique_together = [['order_line', 'approval_type']]
+        indexes = [
+            models.Index(fields=['status', 'last_changed_at']),
+            models.Index(fields=['order', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.order_line_id} - {self.approval_type} ({self.status})"
@@ -0,0 +1,40 @@
+"""
+OrderChange model - Change feed position of each order
+"""
+from django.db import models
+from apps.core.models import TimestampedModel
+
+
+class OrderChange(TimestampedModel):
+    """
+    Latest change of one order (its own row or any child row), stamped with a
+    sequence number from the `order_changes` counter.
+
+    One row per order, moved forward on every change (see
+    apps.orders.utils.order_changes), so the change feed reads the orders
+    changed after a client's cursor from one index range. Rows of deleted
+    orders stay as tombstones; order_id is therefore a plain column, not a
+    foreign key. An order reassigned to another merchandiser left the scope
+    of the previous ones, so it is a tombstone in their feeds.
+    """
+    order_id = models.UUIDField(unique=True)
+    merchandiser_id = models.UUIDField(
+        null=True,
+        blank=True,
+        help_text='Merchandiser of the order when last changed (scopes tombstones)'
+    )
+    former_merchandiser_ids = models.JSONField(
+        default=list,
+        blank=True,
+        help_text='Merchandisers the order was reassigned away from (tombstone in their feeds)'
+    )
+    sequence = models.BigIntegerField(db_index=True, help_text='Change cursor value of the latest change')
+    deleted = models.BooleanField(default=False)
+
+    class Meta:
+        db_table = 'order_changes'
+        verbose_name = 'Order Change'
+        verbose_name_plural = 'Order Changes'
+
+    def __str__(self):
+        return f"{self.order_id} @ {self.sequence}{' (deleted)' if self.deleted else ''}"
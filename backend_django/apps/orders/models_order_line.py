@@ -313,7 +313,7 @@ class OrderLine(TimestampedModel):
             models.Index(fields=['style', 'color_code', 'cad_code']),
         ]
     
-    def _calculate_greige_and_yarn(self):
+    def _calculate_greige_and_yarn(self, order=None):
         """
         Calculate greige_quantity and yarn_required based on finished fabric quantity,
         process loss percentage, and mixed fabric percentage.
@@ -328,9 +328,14 @@ class OrderLine(TimestampedModel):
         
         For local orders:
         - Uses finished_fabric_quantity if set, otherwise falls back to quantity
+        
+        `order` defaults to self.style.order; pass it to avoid re-reading the order.
         """
         from decimal import Decimal
         
+        if order is None:
+            order = self.style.order if self.style else None
+        
         # Use finished_fabric_quantity if available, otherwise use quantity
         base_qty = self.finished_fabric_quantity if self.finished_fabric_quantity else self.quantity
         
@@ -340,19 +345,46 @@ class OrderLine(TimestampedModel):
         finished = Decimal(str(base_qty))
         
         # Get process loss from Line (override) or Order (default)
-        loss_val = self.process_loss_percent if self.process_loss_percent is not None else (self.style.order.process_loss_percent if self.style and self.style.order else 0)
+        loss_val = self.process_loss_percent if self.process_loss_percent is not None else (order.process_loss_percent if order else 0)
         loss_percent = Decimal(str(loss_val or 0)) / Decimal('100')
         
         # Calculate greige: finished * (1 + loss)
         self.greige_quantity = finished * (Decimal('1') + loss_percent)
         
         # Get mixed fabric percent from Line (override) or Order (default)
-        mixed_val = self.mixed_fabric_percent if self.mixed_fabric_percent is not None else (self.style.order.mixed_fabric_percent if self.style and self.style.order else 0)
+        mixed_val = self.mixed_fabric_percent if self.mixed_fabric_percent is not None else (order.mixed_fabric_percent if order else 0)
         mixed_percent = Decimal(str(mixed_val or 0)) / Decimal('100')
         
         # Calculate yarn: greige * (1 - mixed)
         self.yarn_required = self.greige_quantity * (Decimal('1') - mixed_percent)
     
+    def apply_local_order_calculations(self, order):
+        """
+        Calculate greige/yarn and default production dates for local orders.
+        No-op for other order types. Does not save.
+        """
+        if not order or order.order_type != 'local':
+            return
+        
+        # Calculate greige and yarn requirements
+        self._calculate_greige_and_yarn(order)
+        
+        # Auto-calculate production dates based on yarn_received_date
+        if self.yarn_received_date:
+            from datetime import timedelta
+            
+            # Calculate Knitting Start (Yarn Received + 11 days) if not already set
+            if not self.knitting_start_date:
+                self.knitting_start_date = self.yarn_received_date + timedelta(days=11)
+            
+            # Calculate Knitting Complete (Knitting Start + 18 days) if not already set
+            if not self.knitting_complete_date and self.knitting_start_date:
+                self.knitting_complete_date = self.knitting_start_date + timedelta(days=18)
+            
+            # Calculate Dyeing Start (Knitting Start + 5 days) if not already set
+            if not self.dyeing_start_date and self.knitting_start_date:
+                self.dyeing_start_date = self.knitting_start_date + timedelta(days=5)
+    
     def save(self, *args, **kwargs):
         """Auto-calculate local order fields and assign sequence number"""
         # Auto-assign sequence_number for new lines - ORDER-WIDE (not style-wide)
@@ -366,25 +398,8 @@ class OrderLine(TimestampedModel):
             self.sequence_number = (max_seq or 0) + 1
         
         # Only auto-calculate for local orders
-        if self.style and self.style.order and self.style.order.order_type == 'local':
-            # Calculate greige and yarn requirements
-            self._calculate_greige_and_yarn()
-            
-            # Auto-calculate production dates based on yarn_received_date
-            if self.yarn_received_date:
-                from datetime import timedelta
-                
-                # Calculate Knitting Start (Yarn Received + 11 days) if not already set
-                if not self.knitting_start_date:
-                    self.knitting_start_date = self.yarn_received_date + timedelta(days=11)
-                
-                # Calculate Knitting Complete (Knitting Start + 18 days) if not already set
-                if not self.knitting_complete_date and self.knitting_start_date:
-                    self.knitting_complete_date = self.knitting_start_date + timedelta(days=18)
-                
-                # Calculate Dyeing Start (Knitting Start + 5 days) if not already set
-                if not self.dyeing_start_date and self.knitting_start_date:
-                    self.dyeing_start_date = self.knitting_start_date + timedelta(days=5)
+        if self.style:
+            self.apply_local_order_calculations(self.style.order)
         
         super().save(*args, **kwargs)
     
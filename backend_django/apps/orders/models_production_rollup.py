@@ -0,0 +1,60 @@
+"""
+ProductionRollup model - Running production totals per order line and entry type
+"""
+from django.db import models
+from django.db.models import Q
+from apps.core.models import TimestampedModel
+
+
+class ProductionRollup(TimestampedModel):
+    """
+    Total quantity, entry count and first/last entry date of the production
+    entries of one type for one order line (or for the order itself when the
+    entries have no line).
+
+    Maintained incrementally on every ProductionEntry write (see
+    apps.orders.utils.production_rollups), so production summaries, progress
+    percentages and line start/complete dates are read from one row instead of
+    aggregating over all entries.
+    """
+    order = models.ForeignKey(
+        'orders.Order',
+        on_delete=models.CASCADE,
+        related_name='production_rollups'
+    )
+    order_line = models.ForeignKey(
+        'orders.OrderLine',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='production_rollups',
+        help_text='Order line of the entries (empty for order-level entries)'
+    )
+    entry_type = models.CharField(max_length=20, help_text='Production entry type')
+    total_quantity = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    entry_count = models.PositiveIntegerField(default=0)
+    first_entry_date = models.DateField(null=True, blank=True)
+    last_entry_date = models.DateField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'production_rollups'
+        verbose_name = 'Production Rollup'
+        verbose_name_plural = 'Production Rollups'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['order_line', 'entry_type'],
+                name='unique_production_rollup_line',
+            ),
+            # NULL lines are distinct in a plain unique constraint
+            models.UniqueConstraint(
+                fields=['order', 'entry_type'],
+                condition=Q(order_line__isnull=True),
+                name='unique_production_rollup_order',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['order', 'entry_type']),
+        ]
+
+    def __str__(self):
+        return f"{self.order_id} / {self.order_line_id or '-'} - {self.entry_type}: {self.total_quantity} ({self.entry_count})"
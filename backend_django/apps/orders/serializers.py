@@ -1,12 +1,17 @@
 """
 Orders serializers
 """
-from rest_framework import serializers
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from django.conf import settings
 from django.utils import timezone
 from .models import Order, OrderStatus, OrderCategory, OrderType, Document, ApprovalHistory, CustomApprovalGate, OrderActivityLog
-from apps.authentication.serializers import UserSerializer
+from .models_line_approval_state import LineApprovalState
+from apps.authentication.user_details import embed
 from apps.core.utils import get_file_presigned_url
 from .serializers_style_color import OrderStyleSerializer, OrderStyleCreateUpdateSerializer
+from .serializers_order_line import OrderLineSerializer
+from .utils import production_rollups
 
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -14,8 +19,6 @@ class OrderSerializer(serializers.ModelSerializer):
     Complete Order serializer with all fields
     Returns camelCase for frontend
     """
-    merchandiser_details = UserSerializer(source='merchandiser', read_only=True)
-    created_by_details = UserSerializer(source='created_by', read_only=True)
     total_value = serializers.ReadOnlyField()
     total_delivered_quantity = serializers.ReadOnlyField()
     shortage_excess_quantity = serializers.ReadOnlyField()
@@ -41,7 +44,7 @@ class OrderSerializer(serializers.ModelSerializer):
             'order_type', 'finished_fabric_quantity', 'finished_fabric_unit',
             'process_loss_percent', 'mixed_fabric_type', 'mixed_fabric_percent',
             'greige_quantity', 'yarn_required',
-            'notes', 'metadata', 'merchandiser', 'merchandiser_details', 'created_by', 'created_by_details',
+            'notes', 'metadata', 'merchandiser', 'created_by',
             'total_value', 'total_delivered_quantity', 'shortage_excess_quantity',
             'potential_profit', 'realized_profit', 'realized_value',
             'created_at', 'updated_at', 'timeline_events', 'styles', 'approval_history_data',
@@ -51,36 +54,42 @@ class OrderSerializer(serializers.ModelSerializer):
                            'total_delivered_quantity', 'shortage_excess_quantity', 
                            'potential_profit', 'realized_profit', 'realized_value']
     
-    def _format_user_details(self, user_data):
-        """Format user details to camelCase"""
-        if not user_data:
-            return None
-        return {
-            'id': str(user_data['id']),
-            'email': user_data['email'],
-            'fullName': user_data['full_name'],
-            'role': user_data['role'],
-            'phone': user_data.get('phone'),
-            'department': user_data.get('department'),
-            'isActive': user_data['is_active'],
-        }
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Prefetch plan for this serializer. Every relation the serializer (and the
+        nested style/line serializers and Order money properties) reads is loaded
+        here, so rendering an order costs a fixed number of queries regardless of
+        how many styles, lines or history rows it has.
+        """
+        from django.db.models import Prefetch
+        return queryset.select_related('merchandiser', 'created_by').prefetch_related(
+            Prefetch(
+                'approval_history',
+                queryset=ApprovalHistory.objects.select_related('changed_by', 'order_line__style').order_by('created_at')
+            ),
+            'styles__colors',
+            'styles__lines__mill_offers',
+            'styles__lines__deliveries',
+            Prefetch(
+                'styles__lines__custom_approval_gates',
+                queryset=CustomApprovalGate.objects.select_related('created_by')
+            ),
+            'supplier_deliveries',
+            'production_rollups',
+            'shipments',
+        )
+    
+    @staticmethod
+    def _approval_history(obj):
+        """Order approval history, oldest first - uses the prefetch plan when applied"""
+        if 'approval_history' in getattr(obj, '_prefetched_objects_cache', {}):
+            return sorted(obj.approval_history.all(), key=lambda history: history.created_at)
+        return obj.approval_history.select_related('changed_by', 'order_line__style').order_by('created_at')
     
     def to_representation(self, instance):
         """Convert to camelCase for frontend"""
         data = super().to_representation(instance)
-        # Convert merchandiser_details to camelCase
-        merchandiser_details = data.get('merchandiser_details')
-        if merchandiser_details:
-            merchandiser_details = {
-                'id': str(merchandiser_details['id']),
-                'email': merchandiser_details['email'],
-                'fullName': merchandiser_details['full_name'],
-                'role': merchandiser_details['role'],
-                'phone': merchandiser_details.get('phone'),
-                'department': merchandiser_details.get('department'),
-                'isActive': merchandiser_details['is_active'],
-            }
-        
         return {
             'id': str(data['id']),
             'uid': str(data['uid']),
@@ -116,9 +125,9 @@ class OrderSerializer(serializers.ModelSerializer):
             'notes': data.get('notes'),
             'metadata': data.get('metadata'),
             'merchandiser': str(data['merchandiser']) if data.get('merchandiser') else None,
-            'merchandiserDetails': merchandiser_details,
+            'merchandiserDetails': embed(instance.merchandiser),
             'createdById': str(data['created_by']) if data.get('created_by') else None,
-            'createdByDetails': self._format_user_details(data.get('created_by_details')),
+            'createdByDetails': embed(instance.created_by),
             'totalValue': data.get('total_value'),
             'totalDeliveredQuantity': data.get('total_delivered_quantity'),
             'shortageExcessQuantity': data.get('shortage_excess_quantity'),
@@ -152,22 +161,12 @@ class OrderSerializer(serializers.ModelSerializer):
         the delivered quantity counts towards all progress bars (knitting, dyeing, finishing, yarn).
         Progress = max(production_entry_total, total_delivered_qty)
         """
-        from django.db.models import Sum, Count, Q
-        from .models_production_entry import ProductionEntryType
-        
         # Only calculate for local orders
         if obj.order_type != 'local':
             return None
         
-        # Get aggregated data from production_entries
-        summary = obj.production_entries.aggregate(
-            total_knitting=Sum('quantity', filter=Q(entry_type=ProductionEntryType.KNITTING)),
-            total_dyeing=Sum('quantity', filter=Q(entry_type=ProductionEntryType.DYEING)),
-            total_finishing=Sum('quantity', filter=Q(entry_type=ProductionEntryType.FINISHING)),
-            knitting_entries_count=Count('id', filter=Q(entry_type=ProductionEntryType.KNITTING)),
-            dyeing_entries_count=Count('id', filter=Q(entry_type=ProductionEntryType.DYEING)),
-            finishing_entries_count=Count('id', filter=Q(entry_type=ProductionEntryType.FINISHING)),
-        )
+        # Get totals from the (prefetched) production rollups
+        summary = production_rollups.summarize(obj.production_rollups.all())
         
         # Get order-level finished fabric quantity (for denominator if set)
         order_finished_fabric = float(obj.finished_fabric_quantity) if obj.finished_fabric_quantity else None
@@ -258,7 +257,7 @@ class OrderSerializer(serializers.ModelSerializer):
     
     def get_approval_history_data(self, obj):
         """Get approval history for this order"""
-        history = obj.approval_history.all().order_by('created_at')
+        history = self._approval_history(obj)
         serializer = ApprovalHistorySerializer(history, many=True)
         return serializer.data
     
@@ -301,7 +300,7 @@ class OrderSerializer(serializers.ModelSerializer):
         )
 
         # Approval History - show all approval events
-        approval_history = obj.approval_history.all().order_by('created_at')
+        approval_history = self._approval_history(obj)
         approval_type_names = {
             'labDip': 'Lab Dip',
             'strikeOff': 'Strike Off',
@@ -342,10 +341,9 @@ class OrderSerializer(serializers.ModelSerializer):
         if shipments_rel is not None and hasattr(shipments_rel, 'all'):
             first_shipment = None
             try:
-                shipments_qs = shipments_rel.all()
-                if hasattr(shipments_qs, 'order_by'):
-                    shipments_qs = shipments_qs.order_by('shipping_date')
-                first_shipment = shipments_qs.first() if hasattr(shipments_qs, 'first') else None
+                # Earliest dated shipment, picked in Python so the prefetch is used
+                dated_shipments = [s for s in shipments_rel.all() if getattr(s, 'shipping_date', None)]
+                first_shipment = min(dated_shipments, key=lambda s: s.shipping_date) if dated_shipments else None
             except Exception:
                 first_shipment = None
 
@@ -502,20 +500,24 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         """
         Create order with nested styles and lines.
         If order_number is provided and already exists, add new styles/lines to existing order.
+        
+        Styles and lines are built in memory (sequence numbers and style
+        suffixes pre-assigned, local-order calculations applied) and inserted
+        with one bulk_create per level (see OrderTreeWriter).
         """
-        from .models_style_color import OrderStyle
-        from .models_order_line import OrderLine
+        from .utils.order_tree import OrderTreeWriter
         
         styles_data = validated_data.pop('styles')
         order_number = validated_data.get('order_number')
         merchandiser = validated_data.get('merchandiser')  # Get merchandiser from validated_data
         
+        writer = None
+        
         # Check if order with this PO number already exists
         if order_number:
-            try:
-                # Find existing order with this PO number
-                order = Order.objects.get(order_number=order_number)
-                
+            # Find existing order with this PO number
+            order = Order.objects.filter(order_number=order_number).first()
+            if order is not None:
                 # Update quantity to include new lines
                 new_quantity = sum(
                     sum(float(line.get('quantity', 0)) for line in style_data.get('lines', []))
@@ -530,29 +532,28 @@ class OrderCreateSerializer(serializers.ModelSerializer):
                 else:
                     order.save(update_fields=['quantity', 'updated_at'])
                 
-            except Order.DoesNotExist:
+                # Existing order: diff against its current styles and lines
+                writer = OrderTreeWriter(order)
+            else:
                 # PO number provided but doesn't exist yet, create new order
                 order = Order.objects.create(**validated_data)
         else:
             # No PO number provided, create new order (will auto-generate)
             order = Order.objects.create(**validated_data)
         
+        if writer is None:
+            # Brand new order - nothing to look up
+            writer = OrderTreeWriter(order, styles=[], lines=[])
+        
         # Add new styles and lines to the order
         for style_data in styles_data:
             lines_data = style_data.pop('lines', [])
             
-            # Check if style already exists in this order
+            # Reuse the style if one with this style_number already exists in this order
             style_number = style_data.get('style_number')
-            if style_number:
-                try:
-                    style = OrderStyle.objects.get(order=order, style_number=style_number)
-                    # Style exists, just add new lines to it
-                except OrderStyle.DoesNotExist:
-                    # Style doesn't exist, create it
-                    style = OrderStyle.objects.create(order=order, **style_data)
-            else:
-                # No style_number provided, create new style
-                style = OrderStyle.objects.create(order=order, **style_data)
+            style = writer.find_style(style_number) if style_number else None
+            if style is None:
+                style = writer.new_style(style_data)
             
             # Add lines to the style
             for line_data in lines_data:
@@ -560,20 +561,17 @@ class OrderCreateSerializer(serializers.ModelSerializer):
                 color_code = line_data.get('color_code')
                 cad_code = line_data.get('cad_code')
                 
-                try:
-                    # Try to find existing line with same style+color+cad
-                    existing_line = OrderLine.objects.get(
-                        style=style,
-                        color_code=color_code or '',
-                        cad_code=cad_code or ''
-                    )
+                existing_line = writer.find_line(style, color_code or '', cad_code or '')
+                if existing_line is not None:
                     # Line exists, update quantity
-                    existing_line.quantity = float(existing_line.quantity) + float(line_data.get('quantity', 0))
-                    existing_line.save(update_fields=['quantity', 'updated_at'])
-                except OrderLine.DoesNotExist:
+                    writer.update_line(existing_line, {
+                        'quantity': float(existing_line.quantity) + float(line_data.get('quantity', 0))
+                    })
+                else:
                     # Line doesn't exist, create it
-                    OrderLine.objects.create(style=style, **line_data)
+                    writer.new_line(style, line_data)
         
+        writer.flush()
         return order
 
 
@@ -715,6 +713,76 @@ class OrderUpdateSerializer(serializers.ModelSerializer):
             converted[new_key] = value
         return converted
     
+    def _apply_styles_diff(self, instance, styles_data):
+        """
+        Apply submitted styles/lines as a diff against one snapshot of the order.
+        
+        Existing styles and lines are matched by ID in memory, only changed
+        fields are written, and each level is persisted with bulk_create /
+        bulk_update plus a single delete (see OrderTreeWriter).
+        """
+        import uuid
+        from .utils.order_tree import OrderTreeWriter
+        
+        def as_uuid(value):
+            try:
+                return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+            except (TypeError, ValueError):
+                return None
+        
+        writer = OrderTreeWriter(instance)
+        
+        # Track ALL processed line IDs across all styles for proper deletion
+        all_processed_line_ids = set()
+        
+        for style_data in styles_data:
+            style_id = style_data.get('id')
+            lines_data = style_data.pop('lines', [])
+            colors_data = style_data.pop('colors', [])  # Support colors for backward compatibility
+            
+            # If colors are provided instead of lines, convert them
+            if colors_data and not lines_data:
+                lines_data = colors_data
+            
+            # Resolve the style (existing or new)
+            # No ID provided - ALWAYS create a new style so each line can have
+            # its own independent style data even if styleNumbers repeat
+            style = writer.get_style(as_uuid(style_id)) if style_id else None
+            if style is not None:
+                writer.update_style(style, style_data)
+            else:
+                style = writer.new_style(style_data)
+            
+            # Process lines for this style
+            for line_data in lines_data:
+                # Convert camelCase to snake_case
+                line_data = self._convert_line_data_to_snake_case(line_data)
+                line_id = line_data.pop('id', None)
+                
+                # CRITICAL FIX: Always remove approval_status and status from line_data
+                # These fields should NEVER be updated through the Edit Order page
+                # They can only be changed via the dedicated approval/status endpoints
+                line_data.pop('approval_status', None)
+                line_data.pop('status', None)
+                
+                # CRITICAL FIX: Look up line by ID only (any style of this order);
+                # move it to this style if the user regrouped it
+                line = writer.get_line(as_uuid(line_id)) if line_id else None
+                if line is not None:
+                    writer.update_line(line, line_data, style=style)
+                else:
+                    # New line, or ID that doesn't exist in this order
+                    line = writer.new_line(style, line_data)
+                all_processed_line_ids.add(line.id)
+        
+        # Delete lines that weren't in the update (user removed them)
+        # This is done at order level to handle lines that may have moved between styles
+        # ApprovalHistory.order_line uses SET_NULL so history rows are preserved
+        # NOTE: We intentionally do NOT delete styles that aren't in the update
+        # to preserve approval history and other linked data
+        writer.delete_lines_except(all_processed_line_ids)
+        writer.flush()
+    
     def update(self, instance, validated_data):
         """
         Update order with nested styles and lines/colors.
@@ -727,9 +795,10 @@ class OrderUpdateSerializer(serializers.ModelSerializer):
         1. Look up lines by ID only, verify they belong to this order
         2. Update the line's style FK if it changed
         3. Track all processed line IDs globally for proper deletion
+        
+        Nested styles/lines are diffed in memory and written in bulk
+        (see _apply_styles_diff).
         """
-        from .models_style_color import OrderStyle
-        from .models_order_line import OrderLine
         import logging
         logger = logging.getLogger(__name__)
         
@@ -753,98 +822,42 @@ class OrderUpdateSerializer(serializers.ModelSerializer):
         
         # Update styles if provided
         if styles_data is not None:
-            # Track ALL processed line IDs across all styles for proper deletion
-            all_processed_line_ids = set()
-            existing_style_ids = set()
-            
-            for style_data in styles_data:
-                style_id = style_data.get('id')
-                lines_data = style_data.pop('lines', [])
-                colors_data = style_data.pop('colors', [])  # Support colors for backward compatibility
-                
-                # If colors are provided instead of lines, convert them
-                if colors_data and not lines_data:
-                    lines_data = colors_data
-                
-                # Resolve the style (get existing or create new)
-                style = None
-                if style_id:
-                    try:
-                        style = OrderStyle.objects.get(id=style_id, order=instance)
-                        existing_style_ids.add(str(style_id))
-                        
-                        # Update style fields
-                        for attr, value in style_data.items():
-                            setattr(style, attr, value)
-                        style.save()
-                    except OrderStyle.DoesNotExist:
-                        # Style ID provided but doesn't exist, create new one
-                        style = OrderStyle.objects.create(order=instance, **style_data)
-                        existing_style_ids.add(str(style.id))
-                else:
-                    # No ID provided - ALWAYS create a new style
-                    # This ensures each line can have its own independent style data
-                    # even if multiple lines have the same styleNumber
-                    style = OrderStyle.objects.create(order=instance, **style_data)
-                    existing_style_ids.add(str(style.id))
-                
-                # Process lines for this style
-                for line_data in lines_data:
-                    # Convert camelCase to snake_case
-                    line_data = self._convert_line_data_to_snake_case(line_data)
-                    line_id = line_data.pop('id', None)
-                    
-                    # CRITICAL FIX: Always remove approval_status and status from line_data
-                    # These fields should NEVER be updated through the Edit Order page
-                    # They can only be changed via the dedicated approval/status endpoints
-                    line_data.pop('approval_status', None)
-                    line_data.pop('status', None)
-                    
-                    if line_id:
-                        # CRITICAL FIX: Look up line by ID only, verify it belongs to this order
-                        try:
-                            line = OrderLine.objects.get(id=line_id, style__order=instance)
-                            all_processed_line_ids.add(str(line_id))
-                            
-                            # DEBUG: Log line finished fabric before update
-                            logger.info(f"Line {line_id} - Before: finished_fabric_quantity={line.finished_fabric_quantity}")
-                            logger.info(f"Line {line_id} - line_data has: {line_data.get('finished_fabric_quantity')}")
-                            
-                            # Update the line's style if it changed (user moved line to different style)
-                            if line.style_id != style.id:
-                                line.style = style
-                            
-                            # Update other fields (approval_status and status already removed above)
-                            for attr, value in line_data.items():
-                                setattr(line, attr, value)
-                            
-                            line.save()
-                            
-                            # DEBUG: Verify line data after save
-                            line.refresh_from_db()
-                            logger.info(f"Line {line_id} - After save: finished_fabric_quantity={line.finished_fabric_quantity}, greige={line.greige_quantity}, yarn={line.yarn_required}")
-                        except OrderLine.DoesNotExist:
-                            # Line ID provided but doesn't exist in this order, create new one
-                            new_line = OrderLine.objects.create(style=style, **line_data)
-                            all_processed_line_ids.add(str(new_line.id))
-                    else:
-                        # No ID - this is a NEW line, create it
-                        new_line = OrderLine.objects.create(style=style, **line_data)
-                        all_processed_line_ids.add(str(new_line.id))
-            
-            # Delete lines that weren't in the update (user removed them)
-            # This is done at order level to handle lines that may have moved between styles
-            # ApprovalHistory.order_line uses SET_NULL so history rows are preserved
-            for order_style in instance.styles.all():
-                order_style.lines.exclude(id__in=all_processed_line_ids).delete()
-            
-            # NOTE: We intentionally do NOT delete styles that aren't in the update
-            # to preserve approval history and other linked data
-            # Styles should be deleted through explicit delete actions
+            self._apply_styles_diff(instance, styles_data)
         
         return instance
 
 
+def _prefetched(obj, name):
+    """Prefetched related objects, read from the prefetch cache without building a related manager"""
+    cache = getattr(obj, '_prefetched_objects_cache', {})
+    if name in cache:
+        return cache[name]
+    return getattr(obj, name).all()
+
+
+def _date_representation(value):
+    """A date as serializers.DateField renders it"""
+    if not value:
+        return None
+    output_format = api_settings.DATE_FORMAT
+    if output_format is None or output_format.lower() == ISO_8601:
+        return value.isoformat()
+    return value.strftime(output_format)
+
+
+def _datetime_representation(value):
+    """An aware datetime as serializers.DateTimeField renders it (in the current time zone)"""
+    if not value:
+        return None
+    if settings.USE_TZ and timezone.is_aware(value):
+        value = value.astimezone(timezone.get_current_timezone())
+    output_format = api_settings.DATETIME_FORMAT
+    if output_format is None or output_format.lower() == ISO_8601:
+        value = value.isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return value.strftime(output_format)
+
+
 class OrderListSerializer(serializers.ModelSerializer):
     """
     Lightweight serializer for listing orders
@@ -881,8 +894,8 @@ class OrderListSerializer(serializers.ModelSerializer):
         """Get the earliest ETD from prefetched order lines - no extra query"""
         # Use prefetched data instead of making a new query
         earliest = None
-        for style in obj.styles.all():
-            for line in style.lines.all():
+        for style in _prefetched(obj, 'styles'):
+            for line in _prefetched(style, 'lines'):
                 if line.etd:
                     if earliest is None or line.etd < earliest:
                         earliest = line.etd
@@ -892,8 +905,8 @@ class OrderListSerializer(serializers.ModelSerializer):
         """Get counts of each status from prefetched order lines - no extra query"""
         # Use prefetched data instead of making a new query
         status_counts = {}
-        for style in obj.styles.all():
-            for line in style.lines.all():
+        for style in _prefetched(obj, 'styles'):
+            for line in _prefetched(style, 'lines'):
                 status = line.status
                 status_counts[status] = status_counts.get(status, 0) + 1
         return status_counts
@@ -906,8 +919,8 @@ class OrderListSerializer(serializers.ModelSerializer):
         # Collect ALL lines from ALL styles, then sort globally by sequence_number
         # This ensures lines maintain insertion order regardless of which style they belong to
         all_lines_with_style = []
-        for style in obj.styles.all():
-            for line in style.lines.all():
+        for style in _prefetched(obj, 'styles'):
+            for line in _prefetched(style, 'lines'):
                 all_lines_with_style.append((line, style))
         
         # Sort all lines globally by sequence_number, then created_at
@@ -921,7 +934,7 @@ class OrderListSerializer(serializers.ModelSerializer):
             
             # Use prefetched approval_history - already ordered by created_at
             history_by_type = {}
-            for record in line.approval_history.all():
+            for record in _prefetched(line, 'approval_history'):
                 atype = record.approval_type
                 if atype not in history_by_type:
                     history_by_type[atype] = []
@@ -949,21 +962,14 @@ class OrderListSerializer(serializers.ModelSerializer):
             
             # Calculate delivery summary for this line using prefetched deliveries
             delivered_qty = sum(
-                float(d.delivered_quantity) for d in line.deliveries.all()
+                float(d.delivered_quantity) for d in _prefetched(line, 'deliveries')
             )
             
-            # Calculate line-level production entry summary using prefetched production_entries
-            line_knitting = 0
-            line_dyeing = 0
-            line_finishing = 0
-            for entry in line.production_entries.all():
-                qty = float(entry.quantity) if entry.quantity else 0
-                if entry.entry_type == 'knitting':
-                    line_knitting += qty
-                elif entry.entry_type == 'dyeing':
-                    line_dyeing += qty
-                elif entry.entry_type == 'finishing':
-                    line_finishing += qty
+            # Calculate line-level production entry summary using prefetched production_rollups
+            line_production = production_rollups.summarize(_prefetched(line, 'production_rollups'))
+            line_knitting = float(line_production['total_knitting'] or 0)
+            line_dyeing = float(line_production['total_dyeing'] or 0)
+            line_finishing = float(line_production['total_finishing'] or 0)
             
             line_qty = float(line.quantity) if line.quantity else 0
             # For local orders, use greige quantity as denominator for production percentages
@@ -976,7 +982,7 @@ class OrderListSerializer(serializers.ModelSerializer):
             # Get mill offers from prefetched data
             mill_offers_data = []
             try:
-                for offer in line.mill_offers.all():
+                for offer in _prefetched(line, 'mill_offers'):
                     mill_offers_data.append({
                         'id': str(offer.id),
                         'millName': offer.mill_name,
@@ -988,7 +994,7 @@ class OrderListSerializer(serializers.ModelSerializer):
             
             sample_photo = None
             try:
-                line_sample_docs = [d for d in line.documents.all() if getattr(d, 'category', None) == 'sample']
+                line_sample_docs = [d for d in _prefetched(line, 'documents') if getattr(d, 'category', None) == 'sample']
                 if line_sample_docs:
                     sample_doc = max(line_sample_docs, key=lambda d: d.created_at)
                     # Use presigned URL for R2 storage, direct URL for local storage
@@ -1005,7 +1011,7 @@ class OrderListSerializer(serializers.ModelSerializer):
             # Get custom approval gates from prefetched data
             custom_gates_data = []
             try:
-                for gate in line.custom_approval_gates.all():
+                for gate in _prefetched(line, 'custom_approval_gates'):
                     custom_gates_data.append({
                         'id': str(gate.id),
                         'orderLineId': str(gate.order_line_id),
@@ -1089,7 +1095,7 @@ class OrderListSerializer(serializers.ModelSerializer):
         Uses document_date if set, otherwise falls back to created_at
         """
         # Use prefetched documents
-        lc_docs = [d for d in obj.documents.all() if d.category == 'lc']
+        lc_docs = [d for d in _prefetched(obj, 'documents') if d.category == 'lc']
         if lc_docs:
             # Sort by document_date if available, else created_at
             lc_docs.sort(key=lambda d: d.document_date or d.created_at.date())
@@ -1103,7 +1109,7 @@ class OrderListSerializer(serializers.ModelSerializer):
         Uses document_date if set, otherwise falls back to created_at
         """
         # Use prefetched documents
-        pi_docs = [d for d in obj.documents.all() if d.category == 'pi']
+        pi_docs = [d for d in _prefetched(obj, 'documents') if d.category == 'pi']
         if pi_docs:
             # Sort by document_date if available, else created_at
             pi_docs.sort(key=lambda d: d.document_date or d.created_at.date())
@@ -1123,30 +1129,14 @@ class OrderListSerializer(serializers.ModelSerializer):
         if obj.order_type != 'local':
             return None
         
-        # Use prefetched production_entries if available
-        entries = getattr(obj, '_prefetched_objects_cache', {}).get('production_entries')
-        if entries is None:
-            # Fallback to queryset if not prefetched
-            entries = obj.production_entries.all()
-        
-        total_knitting = 0
-        total_dyeing = 0
-        total_finishing = 0
-        knitting_count = 0
-        dyeing_count = 0
-        finishing_count = 0
-        
-        for entry in entries:
-            qty = float(entry.quantity) if entry.quantity else 0
-            if entry.entry_type == 'knitting':
-                total_knitting += qty
-                knitting_count += 1
-            elif entry.entry_type == 'dyeing':
-                total_dyeing += qty
-                dyeing_count += 1
-            elif entry.entry_type == 'finishing':
-                total_finishing += qty
-                finishing_count += 1
+        # Totals from the production rollups (prefetched when available)
+        summary = production_rollups.summarize(_prefetched(obj, 'production_rollups'))
+        total_knitting = float(summary['total_knitting'] or 0)
+        total_dyeing = float(summary['total_dyeing'] or 0)
+        total_finishing = float(summary['total_finishing'] or 0)
+        knitting_count = summary['knitting_entries_count']
+        dyeing_count = summary['dyeing_entries_count']
+        finishing_count = summary['finishing_entries_count']
         
         # Calculate total greige, yarn quantities from all lines
         # Also sum line-level deliveries
@@ -1156,8 +1146,8 @@ class OrderListSerializer(serializers.ModelSerializer):
         ordered_qty = float(obj.quantity) if obj.quantity else 0
         
         # Iterate through styles and their lines to sum greige, yarn, and line-level deliveries
-        for style in obj.styles.all():
-            for line in style.lines.all():
+        for style in _prefetched(obj, 'styles'):
+            for line in _prefetched(style, 'lines'):
                 # Greige quantity (for knitting/dyeing/finishing denominator)
                 if line.greige_quantity:
                     total_greige += float(line.greige_quantity)
@@ -1176,13 +1166,13 @@ class OrderListSerializer(serializers.ModelSerializer):
                     total_yarn += float(line.quantity)
                 
                 # Sum line-level deliveries (prefetched via styles__lines__deliveries)
-                for delivery in line.deliveries.all():
+                for delivery in _prefetched(line, 'deliveries'):
                     if delivery.delivered_quantity:
                         line_level_delivered += float(delivery.delivered_quantity)
         
         # Get total delivered quantity from order-level supplier_deliveries
         order_level_delivered = 0.0
-        for delivery in obj.supplier_deliveries.all():
+        for delivery in _prefetched(obj, 'supplier_deliveries'):
             if delivery.delivered_quantity:
                 order_level_delivered += float(delivery.delivered_quantity)
         
@@ -1225,34 +1215,42 @@ class OrderListSerializer(serializers.ModelSerializer):
         }
     
     def to_representation(self, instance):
-        """Convert to camelCase for frontend"""
-        data = super().to_representation(instance)
+        """
+        Convert to camelCase for frontend
+
+        Built straight from the instance instead of DRF's field-by-field pass,
+        which dominated list response time. The output must stay identical to
+        the declared fields' - check with `manage.py check_order_list_json`.
+        """
+        quantity = instance.quantity
+        merchandiser = embed(instance.merchandiser)
+        created_by = embed(instance.created_by)
         return {
-            'id': str(data['id']),
-            'poNumber': data['order_number'],
-            'customerName': data['customer_name'],
-            'buyerName': data.get('buyer_name'),
-            'fabricType': data['fabric_type'],
-            'quantity': float(data['quantity']) if data['quantity'] else 0,
-            'unit': data['unit'],
-            'currency': data.get('currency'),
-            'status': data['status'],
-            'category': data['category'],
-            'orderDate': data['order_date'],
-            'expectedDeliveryDate': data['expected_delivery_date'],
-            'merchandiser': str(data['merchandiser']) if data['merchandiser'] else None,
-            'merchandiserName': data.get('merchandiser_name'),
-            'createdAt': data['created_at'],
-            'earliestEtd': data.get('earliest_etd'),
-            'lineStatusCounts': data.get('line_status_counts') or {},
-            'lines': data.get('lines') or [],
-            'lcIssueDate': data.get('lc_issue_date'),
-            'piSentDate': data.get('pi_sent_date'),
-            'orderType': data.get('order_type'),
-            'productionSummary': data.get('production_summary'),
-            'createdById': str(data['created_by']) if data.get('created_by') else None,
-            'createdByDetails': self._get_created_by_details(instance),
-            'notes': data.get('notes'),
+            'id': str(instance.id),
+            'poNumber': instance.order_number,
+            'customerName': instance.customer_name,
+            'buyerName': instance.buyer_name,
+            'fabricType': instance.fabric_type,
+            'quantity': float(quantity) if quantity is not None else 0,
+            'unit': instance.unit,
+            'currency': instance.currency,
+            'status': instance.status,
+            'category': instance.category,
+            'orderDate': _date_representation(instance.order_date),
+            'expectedDeliveryDate': _date_representation(instance.expected_delivery_date),
+            'merchandiser': str(instance.merchandiser_id) if instance.merchandiser_id else None,
+            'merchandiserName': merchandiser['fullName'] if merchandiser else None,
+            'createdAt': _datetime_representation(instance.created_at),
+            'earliestEtd': self.get_earliest_etd(instance),
+            'lineStatusCounts': self.get_line_status_counts(instance) or {},
+            'lines': self.get_lines(instance) or [],
+            'lcIssueDate': self.get_lc_issue_date(instance),
+            'piSentDate': self.get_pi_sent_date(instance),
+            'orderType': instance.order_type,
+            'productionSummary': self.get_production_summary(instance),
+            'createdById': str(instance.created_by_id) if instance.created_by_id else None,
+            'createdByDetails': {'id': created_by['id'], 'fullName': created_by['fullName']} if created_by else None,
+            'notes': instance.notes,
         }
     
     def _get_created_by_details(self, obj):
@@ -1265,6 +1263,52 @@ class OrderListSerializer(serializers.ModelSerializer):
         return None
 
 
+class OrderDeltaSerializer(serializers.ModelSerializer):
+    """
+    Compact response for line-level mutations (opt-in, see
+    OrderViewSet._order_response)
+
+    Returns the order-level state a line mutation can change plus the cards of
+    the changed lines, in the same shapes as OrderSerializer, so the frontend
+    can patch its copy of the order instead of replacing it.
+
+    Context:
+    - lines: the changed OrderLine objects (see OrderLineSerializer.setup_eager_loading)
+    - include_history: also return approvalHistoryData and timelineEvents
+      (prefetch approval_history and shipments to keep this at one query each)
+    """
+
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'status', 'category', 'approval_status', 'current_stage',
+            'actual_delivery_date', 'updated_at',
+        ]
+
+    def to_representation(self, instance):
+        """Convert to camelCase for frontend"""
+        data = super().to_representation(instance)
+        order = {
+            'status': data['status'],
+            'category': data['category'],
+            'approvalStatus': data.get('approval_status'),
+            'currentStage': data.get('current_stage'),
+            'actualDeliveryDate': data.get('actual_delivery_date'),
+            'updatedAt': data['updated_at'],
+        }
+        if self.context.get('include_history'):
+            full = OrderSerializer(instance)
+            order['approvalHistoryData'] = full.get_approval_history_data(instance)
+            order['timelineEvents'] = full.get_timeline_events(instance)
+
+        return {
+            'id': str(data['id']),
+            'responseMode': 'delta',
+            'order': order,
+            'lines': OrderLineSerializer(self.context.get('lines', []), many=True).data,
+        }
+
+
 class OrderAlertSerializer(serializers.ModelSerializer):
     style_name = serializers.CharField(source='style_number', read_only=True)
 
@@ -1293,6 +1337,32 @@ class OrderAlertSerializer(serializers.ModelSerializer):
         }
 
 
+class LineApprovalStateSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the current state of one approval gate on an order line
+    """
+
+    class Meta:
+        model = LineApprovalState
+        fields = [
+            'order_line',
+            'approval_type',
+            'status',
+            'first_submitted_at',
+            'last_changed_at',
+        ]
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        return {
+            'orderLineId': str(data['order_line']),
+            'approvalType': data['approval_type'],
+            'status': data['status'],
+            'firstSubmittedAt': data.get('first_submitted_at'),
+            'lastChangedAt': data.get('last_changed_at'),
+        }
+
+
 class OrderStatsSerializer(serializers.Serializer):
     """
     Serializer for order statistics
@@ -1338,6 +1408,36 @@ class ApprovalUpdateSerializer(serializers.Serializer):
         return super().to_internal_value(converted_data)
 
 
+class BulkApprovalItemSerializer(ApprovalUpdateSerializer):
+    """
+    One line-level approval change inside a bulk approval update
+    """
+    order_line_id = serializers.UUIDField()
+
+
+class BulkApprovalUpdateSerializer(serializers.Serializer):
+    """
+    Serializer for applying many line-level approval changes at once
+    
+    Request body:
+    {
+        "updates": [
+            {"orderLineId": "uuid", "approvalType": "labDip", "status": "approved",
+             "customTimestamp": "2024-01-15T10:30:00Z" (optional)},
+            ...
+        ]
+    }
+    """
+    MAX_UPDATES = 500
+    
+    updates = BulkApprovalItemSerializer(many=True, allow_empty=False)
+    
+    def validate_updates(self, value):
+        if len(value) > self.MAX_UPDATES:
+            raise serializers.ValidationError(f'At most {self.MAX_UPDATES} updates per request')
+        return value
+
+
 class StageChangeSerializer(serializers.Serializer):
     """
     Serializer for changing order stage
@@ -1400,9 +1500,6 @@ class ApprovalHistorySerializer(serializers.ModelSerializer):
     Returns camelCase for frontend
     Now includes order_line information for line-level approvals
     """
-    changed_by_name = serializers.CharField(source='changed_by.full_name', read_only=True)
-    changed_by_email = serializers.CharField(source='changed_by.email', read_only=True)
-    
     # Line-level details
     line_label = serializers.CharField(source='order_line.line_label', read_only=True)
     style_number = serializers.CharField(source='order_line.style.style_number', read_only=True)
@@ -1413,7 +1510,7 @@ class ApprovalHistorySerializer(serializers.ModelSerializer):
         model = ApprovalHistory
         fields = [
             'id', 'order', 'order_line', 'approval_type', 'status', 
-            'changed_by', 'changed_by_name', 'changed_by_email',
+            'changed_by',
             'line_label', 'style_number', 'color_code', 'cad_code',
             'notes', 'created_at', 'updated_at'
         ]
@@ -1422,6 +1519,7 @@ class ApprovalHistorySerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         """Convert to camelCase for frontend"""
         data = super().to_representation(instance)
+        changed_by = embed(instance.changed_by)
         return {
             'id': str(data['id']),
             'orderId': str(data['order']),
@@ -1429,8 +1527,8 @@ class ApprovalHistorySerializer(serializers.ModelSerializer):
             'approvalType': data['approval_type'],
             'status': data['status'],
             'changedBy': str(data['changed_by']) if data.get('changed_by') else None,
-            'changedByName': data.get('changed_by_name'),
-            'changedByEmail': data.get('changed_by_email'),
+            'changedByName': changed_by['fullName'] if changed_by else None,
+            'changedByEmail': changed_by['email'] if changed_by else None,
             'lineLabel': data.get('line_label'),
             'styleNumber': data.get('style_number'),
             'colorCode': data.get('color_code'),
@@ -1545,15 +1643,13 @@ class OrderActivityLogSerializer(serializers.ModelSerializer):
     Serializer for OrderActivityLog model
     Returns camelCase for frontend
     """
-    created_by_name = serializers.CharField(source='created_by.full_name', read_only=True)
-    created_by_email = serializers.CharField(source='created_by.email', read_only=True)
     line_label = serializers.CharField(source='order_line.line_label', read_only=True)
     
     class Meta:
         model = OrderActivityLog
         fields = [
             'id', 'order', 'order_line', 'category', 'content',
-            'created_by', 'created_by_name', 'created_by_email',
+            'created_by',
             'line_label', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
@@ -1563,6 +1659,7 @@ class OrderActivityLogSerializer(serializers.ModelSerializer):
         data = super().to_representation(instance)
         
         category_display = dict(OrderActivityLog.CATEGORY_CHOICES).get(data['category'], data['category'])
+        created_by = embed(instance.created_by)
         
         return {
             'id': str(data['id']),
@@ -1572,8 +1669,8 @@ class OrderActivityLogSerializer(serializers.ModelSerializer):
             'categoryDisplay': category_display,
             'content': data['content'],
             'createdBy': str(data['created_by']) if data.get('created_by') else None,
-            'createdByName': data.get('created_by_name'),
-            'createdByEmail': data.get('created_by_email'),
+            'createdByName': created_by['fullName'] if created_by else None,
+            'createdByEmail': created_by['email'] if created_by else None,
             'lineLabel': data.get('line_label'),
             'createdAt': data['created_at'],
             'updatedAt': data['updated_at'],
@@ -2,8 +2,8 @@
 Serializers for OrderLine - handles style+color+CAD combinations
 """
 from rest_framework import serializers
+from apps.authentication.user_details import embed
 from .models_order_line import OrderLine, MillOffer
-from .models import CustomApprovalGate
 
 
 class MillOfferSerializer(serializers.ModelSerializer):
@@ -91,23 +91,42 @@ class OrderLineSerializer(serializers.ModelSerializer):
             'id', 'style_number', 'order_id', 'created_at', 'updated_at',
             'total_value', 'total_cost', 'total_commission', 'profit', 'line_label'
         ]
-    
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Prefetch plan for rendering lines on their own (outside an order's
+        styles), with a fixed number of queries however many lines are given.
+        """
+        from django.db.models import Prefetch
+        from .models import CustomApprovalGate
+        return queryset.select_related('style__order').prefetch_related(
+            'mill_offers',
+            'deliveries',
+            Prefetch(
+                'custom_approval_gates',
+                queryset=CustomApprovalGate.objects.select_related('created_by')
+            ),
+        )
+
     def get_total_delivered_quantity(self, obj):
         """Calculate total delivered quantity from supplier deliveries"""
-        from .models_supplier_delivery import SupplierDelivery
-        deliveries = SupplierDelivery.objects.filter(order_line=obj)
-        return sum(d.delivered_quantity for d in deliveries) if deliveries.exists() else 0
+        deliveries = obj.deliveries.all()
+        return sum(d.delivered_quantity for d in deliveries) if deliveries else 0
+    
+    def _latest_delivery(self, obj):
+        """Most recent supplier delivery (uses prefetched deliveries when available)"""
+        deliveries = obj.deliveries.all()
+        return max(deliveries, key=lambda d: d.delivery_date) if deliveries else None
     
     def get_actual_delivery_date(self, obj):
         """Get the latest delivery date from supplier deliveries"""
-        from .models_supplier_delivery import SupplierDelivery
-        latest = SupplierDelivery.objects.filter(order_line=obj).order_by('-delivery_date').first()
+        latest = self._latest_delivery(obj)
         return str(latest.delivery_date) if latest else None
     
     def get_days_overdue_at_delivery(self, obj):
         """Calculate days overdue when delivery was made"""
-        from .models_supplier_delivery import SupplierDelivery
-        latest = SupplierDelivery.objects.filter(order_line=obj).order_by('-delivery_date').first()
+        latest = self._latest_delivery(obj)
         if latest and obj.etd:
             delta = (latest.delivery_date - obj.etd).days
             return delta if delta > 0 else 0
@@ -125,7 +144,7 @@ class OrderLineSerializer(serializers.ModelSerializer):
     def get_custom_gates(self, obj):
         """Get custom approval gates for this order line"""
         try:
-            gates = CustomApprovalGate.objects.filter(order_line=obj)
+            gates = obj.custom_approval_gates.all()
             return [
                 {
                     'id': str(gate.id),
@@ -134,7 +153,7 @@ class OrderLineSerializer(serializers.ModelSerializer):
                     'gateKey': gate.gate_key,
                     'status': gate.status,
                     'createdBy': str(gate.created_by_id) if gate.created_by_id else None,
-                    'createdByName': gate.created_by.full_name if gate.created_by else None,
+                    'createdByName': (embed(gate.created_by) or {}).get('fullName'),
                     'createdAt': gate.created_at.isoformat() if gate.created_at else None,
                     'updatedAt': gate.updated_at.isoformat() if gate.updated_at else None,
                 }
@@ -1,6 +1,7 @@
 """
 Serializers for OrderStyle and OrderColor
 """
+from django.db import transaction
 from rest_framework import serializers
 from .models_style_color import OrderStyle, OrderColor
 from .serializers_order_line import OrderLineSerializer, OrderLineCreateUpdateSerializer
@@ -309,18 +310,21 @@ class OrderStyleCreateUpdateSerializer(serializers.ModelSerializer):
                 if line_id:
                     # CRITICAL FIX: Look up line by ID only, verify it belongs to this order
                     try:
-                        line = OrderLine.objects.get(id=line_id, style__order=order)
-                        existing_line_ids.add(str(line_id))
-                        
-                        # Update the line's style if it changed
-                        if line.style_id != instance.id:
-                            line.style = instance
-                        
-                        # Update other fields (approval_status and status already removed above)
-                        for attr, value in line_data.items():
-                            setattr(line, attr, value)
-                        
-                        line.save()
+                        # line.save() writes the stored approval_status back: locked so
+                        # an approval change can't land in between (see apps.orders.signals)
+                        with transaction.atomic():
+                            line = OrderLine.objects.select_for_update().get(id=line_id, style__order=order)
+                            existing_line_ids.add(str(line_id))
+                            
+                            # Update the line's style if it changed
+                            if line.style_id != instance.id:
+                                line.style = instance
+                            
+                            # Update other fields (approval_status and status already removed above)
+                            for attr, value in line_data.items():
+                                setattr(line, attr, value)
+                            
+                            line.save()
                     except OrderLine.DoesNotExist:
                         # Line ID provided but doesn't exist in this order, create new one
                         new_line = OrderLine.objects.create(style=instance, **line_data)
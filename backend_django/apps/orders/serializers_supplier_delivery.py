@@ -3,7 +3,7 @@ Serializers for SupplierDelivery model
 """
 from rest_framework import serializers
 from .models_supplier_delivery import SupplierDelivery
-from apps.authentication.serializers import UserSerializer
+from apps.authentication.user_details import embed
 
 
 class SupplierDeliverySerializer(serializers.ModelSerializer):
@@ -11,7 +11,6 @@ class SupplierDeliverySerializer(serializers.ModelSerializer):
     Complete SupplierDelivery serializer with all fields
     Returns camelCase for frontend
     """
-    created_by_details = UserSerializer(source='created_by', read_only=True)
     order_number = serializers.CharField(source='order.order_number', read_only=True)
     order_line_label = serializers.CharField(source='order_line.line_label', read_only=True, allow_null=True)
     style_number = serializers.CharField(source='style.style_number', read_only=True, allow_null=True)
@@ -25,7 +24,7 @@ class SupplierDeliverySerializer(serializers.ModelSerializer):
             'style', 'style_number',
             'color', 'color_code', 'color_name',
             'delivery_date', 'delivered_quantity',
-            'unit', 'notes', 'created_by', 'created_by_details',
+            'unit', 'notes', 'created_by',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'order_number', 'style_number', 'color_code', 'color_name']
@@ -34,19 +33,6 @@ class SupplierDeliverySerializer(serializers.ModelSerializer):
         """Convert to camelCase for frontend"""
         data = super().to_representation(instance)
         
-        # Convert created_by_details to camelCase if present
-        created_by_details = data.get('created_by_details')
-        if created_by_details:
-            created_by_details = {
-                'id': str(created_by_details['id']),
-                'email': created_by_details['email'],
-                'fullName': created_by_details['full_name'],
-                'role': created_by_details['role'],
-                'phone': created_by_details.get('phone'),
-                'department': created_by_details.get('department'),
-                'isActive': created_by_details['is_active'],
-            }
-        
         return {
             'id': str(data['id']),
             'order': str(data['order']),
@@ -63,7 +49,7 @@ class SupplierDeliverySerializer(serializers.ModelSerializer):
             'unit': data['unit'],
             'notes': data.get('notes'),
             'createdBy': str(data['created_by']) if data.get('created_by') else None,
-            'createdByDetails': created_by_details,
+            'createdByDetails': embed(instance.created_by),
             'createdAt': data['created_at'],
             'updatedAt': data['updated_at'],
         }
@@ -0,0 +1,277 @@
+"""
+Orders signal handlers
+
+Keep OrderApprovalSummary counts in step with OrderLine.approval_status,
+ProductionRollup totals in step with ProductionEntry writes, and the order
+change feed in step with writes to orders and their children.
+Bulk queryset operations (bulk_create, bulk_update, QuerySet.update) do not
+send these signals; callers using them must record the changes through
+apps.orders.utils.approval_counts / production_rollups / order_changes directly.
+
+Rows deleted in the cascade of an order delete skip their bookkeeping: the
+summaries and rollups they would adjust go with the order, and the order's
+own delete marks the change feed once. ApprovalHistory has no delete handler
+at all, so an order delete removes its history in one statement instead of
+loading it (delete_approval_history marks the change feed itself).
+"""
+from django.core.signals import request_finished, request_started
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+
+from apps.authentication.models import User
+from .models import ApprovalHistory, CustomApprovalGate, Document, Order
+from .models_order_line import MillOffer, OrderLine
+from .models_production_entry import ProductionEntry
+from .models_style_color import OrderColor, OrderStyle
+from .models_supplier_delivery import SupplierDelivery
+from .utils import approval_counts, order_changes, production_rollups, production_throughput
+
+# ProductionEntry fields that make up its rollup key and contribution
+ROLLUP_FIELDS = ('order_id', 'order_line_id', 'entry_type', 'quantity', 'entry_date')
+
+
+def _order_id_for(line):
+    """Resolve the order id of a line, using the cached style when available"""
+    if OrderLine.style.is_cached(line):
+        return line.style.order_id
+    return OrderStyle.objects.filter(pk=line.style_id).values_list('order_id', flat=True).first()
+
+
+def _deleted_with(origin, *models):
+    """Whether a delete started from a row (or queryset) of one of `models`, i.e. is part of its cascade"""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, models)
+
+
+def _snapshot(line):
+    # Skip when approval_status was deferred (e.g. .only()/.defer() querysets)
+    if 'approval_status' in line.__dict__:
+        line._approval_snapshot = dict(line.approval_status or {})
+
+
+@receiver(post_init, sender=OrderLine)
+def snapshot_line_approval_status(sender, instance, **kwargs):
+    _snapshot(instance)
+
+
+@receiver(post_save, sender=OrderLine)
+def record_line_approval_status(sender, instance, created, update_fields=None, **kwargs):
+    if kwargs.get('raw'):
+        return
+
+    if created:
+        order_id = _order_id_for(instance)
+        if order_id:
+            approval_counts.record_lines_added(order_id, [instance.approval_status])
+        _snapshot(instance)
+        return
+
+    if update_fields is not None and 'approval_status' not in update_fields:
+        return
+    previous = getattr(instance, '_approval_snapshot', None)
+    if previous is None:
+        return
+
+    current = instance.approval_status or {}
+    changes = [
+        (approval_type, previous.get(approval_type), current.get(approval_type))
+        for approval_type in set(previous) | set(current)
+        if previous.get(approval_type) != current.get(approval_type)
+    ]
+    if changes:
+        order_id = _order_id_for(instance)
+        if order_id:
+            approval_counts.record_approval_changes(order_id, changes)
+    _snapshot(instance)
+
+
+@receiver(pre_delete, sender=OrderLine)
+def capture_deleted_line(sender, instance, origin=None, **kwargs):
+    if _deleted_with(origin, Order):
+        # Summary and rollups go with the order; the order marks the change feed
+        return
+    # Read the stored status: the instance being deleted may be stale
+    instance._approval_delete_state = (
+        OrderLine.objects.filter(pk=instance.pk)
+        .values_list('style__order_id', 'approval_status')
+        .first()
+    )
+    # The line's entries become order-level entries (order_line SET_NULL),
+    # leaving the line's group_by=line throughput series
+    production_rollups.detach_line(instance.pk)
+    production_throughput.invalidate_dates(
+        ProductionEntry.objects.filter(order_line_id=instance.pk).dates('entry_date', 'month')
+    )
+
+
+@receiver(post_delete, sender=OrderLine)
+def record_line_removed(sender, instance, **kwargs):
+    state = getattr(instance, '_approval_delete_state', None)
+    if state:
+        order_id, approval_status = state
+        approval_counts.record_lines_removed(order_id, [approval_status])
+
+
+def _rollup_snapshot(entry):
+    # Skip when a rollup field was deferred (e.g. .only()/.defer() querysets)
+    if all(field in entry.__dict__ for field in ROLLUP_FIELDS):
+        entry._rollup_snapshot = tuple(getattr(entry, field) for field in ROLLUP_FIELDS)
+
+
+@receiver(post_init, sender=ProductionEntry)
+def snapshot_production_entry(sender, instance, **kwargs):
+    _rollup_snapshot(instance)
+
+
+@receiver(post_save, sender=ProductionEntry)
+def record_production_entry(sender, instance, created, update_fields=None, **kwargs):
+    if kwargs.get('raw'):
+        return
+
+    current = tuple(getattr(instance, field) for field in ROLLUP_FIELDS)
+    if created:
+        production_rollups.record_entry_added(*current)
+        production_throughput.invalidate_dates([instance.entry_date])
+    else:
+        if update_fields is not None and not {
+            field.removesuffix('_id') for field in ROLLUP_FIELDS
+        } & set(update_fields):
+            return
+        previous = getattr(instance, '_rollup_snapshot', None)
+        if previous is not None and previous != current:
+            production_rollups.record_entry_changed(previous, current)
+            production_throughput.invalidate_dates([previous[-1], instance.entry_date])
+    instance._rollup_snapshot = current
+
+
+@receiver(pre_delete, sender=ProductionEntry)
+def capture_deleted_production_entry(sender, instance, origin=None, **kwargs):
+    if _deleted_with(origin, Order):
+        # Rollups go with the order; see invalidate_order_throughput
+        return
+    # Read the stored values: the instance being deleted may be stale
+    instance._rollup_delete_state = (
+        ProductionEntry.objects.filter(pk=instance.pk).values_list(*ROLLUP_FIELDS).first()
+    )
+
+
+@receiver(post_delete, sender=ProductionEntry)
+def record_production_entry_removed(sender, instance, **kwargs):
+    state = getattr(instance, '_rollup_delete_state', None)
+    if state:
+        production_rollups.record_entry_removed(*state)
+        production_throughput.invalidate_dates([state[-1]])
+
+
+def _invalidate_order_throughput(order_id):
+    production_throughput.invalidate_dates(
+        ProductionEntry.objects.filter(order_id=order_id).dates('entry_date', 'month')
+    )
+
+
+@receiver(pre_delete, sender=Order)
+def invalidate_order_throughput(sender, instance, **kwargs):
+    # Once per order instead of once per cascaded production entry
+    _invalidate_order_throughput(instance.pk)
+
+
+def _merchandiser_snapshot(order):
+    # Skip when merchandiser was deferred (e.g. .only()/.defer() querysets)
+    if 'merchandiser_id' in order.__dict__:
+        order._merchandiser_snapshot = order.merchandiser_id
+
+
+@receiver(post_init, sender=Order)
+def snapshot_order_merchandiser(sender, instance, **kwargs):
+    _merchandiser_snapshot(instance)
+
+
+@receiver(post_save, sender=Order)
+def record_order_reassignment(sender, instance, created, **kwargs):
+    if kwargs.get('raw'):
+        return
+    previous = getattr(instance, '_merchandiser_snapshot', instance.merchandiser_id)
+    if not created and previous != instance.merchandiser_id:
+        # The order's entries move to another group_by=merchandiser series and merchandiser scope
+        _invalidate_order_throughput(instance.pk)
+        # The order leaves the previous merchandiser's change feed scope
+        order_changes.reassigned(instance.pk, previous)
+    _merchandiser_snapshot(instance)
+
+
+@receiver(pre_delete, sender=User)
+def invalidate_merchandiser_throughput(sender, instance, **kwargs):
+    # Their orders lose the merchandiser through a queryset update (SET_NULL, no signals)
+    production_throughput.invalidate_dates(
+        ProductionEntry.objects.filter(order__merchandiser_id=instance.pk).dates('entry_date', 'month')
+    )
+
+
+# Order change feed: mark the order of every written row (see utils.order_changes)
+
+request_started.connect(order_changes.request_started, dispatch_uid='order_changes_request_started')
+request_finished.connect(order_changes.request_finished, dispatch_uid='order_changes_request_finished')
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def record_order_change(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    order_changes.touch(instance.pk, instance.merchandiser_id)
+
+
+@receiver(post_save, sender=OrderStyle)
+@receiver(post_delete, sender=OrderStyle)
+@receiver(post_save, sender=ApprovalHistory)
+@receiver(post_save, sender=SupplierDelivery)
+@receiver(post_delete, sender=SupplierDelivery)
+@receiver(post_save, sender=ProductionEntry)
+@receiver(post_delete, sender=ProductionEntry)
+@receiver(post_save, sender=Document)
+@receiver(post_delete, sender=Document)
+def record_order_child_change(sender, instance, origin=None, **kwargs):
+    if kwargs.get('raw') or _deleted_with(origin, Order):
+        return
+    order_changes.touch(instance.order_id)
+
+
+@receiver(post_save, sender=OrderColor)
+@receiver(post_delete, sender=OrderColor)
+def record_color_change(sender, instance, origin=None, **kwargs):
+    # Gone with its style when the style is deleted (the style marks the order)
+    if kwargs.get('raw') or _deleted_with(origin, Order, OrderStyle):
+        return
+    order_changes.touch(
+        OrderStyle.objects.filter(pk=instance.style_id).values_list('order_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=OrderLine)
+def record_line_change(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    order_changes.touch(_order_id_for(instance))
+
+
+@receiver(post_delete, sender=OrderLine)
+def record_line_deleted(sender, instance, **kwargs):
+    # Order id captured before the delete (see capture_deleted_line)
+    state = getattr(instance, '_approval_delete_state', None)
+    if state:
+        order_changes.touch(state[0])
+
+
+@receiver(post_save, sender=CustomApprovalGate)
+@receiver(post_delete, sender=CustomApprovalGate)
+@receiver(post_save, sender=MillOffer)
+@receiver(post_delete, sender=MillOffer)
+def record_line_child_change(sender, instance, origin=None, **kwargs):
+    # Gone with its line when the line is deleted (the line marks the order)
+    if kwargs.get('raw') or _deleted_with(origin, Order, OrderStyle, OrderLine):
+        return
+    order_changes.touch(
+        OrderLine.objects.filter(pk=instance.order_line_id).values_list('style__order_id', flat=True).first()
+    )
@@ -0,0 +1,153 @@
+"""
+Incremental approval aggregation
+
+Keeps OrderApprovalSummary in step with line-level approval_status changes so
+the order-level approval_status for a gate can be derived from running counts
+(O(1) per approval click) instead of re-reading every line of the order.
+
+Summaries are built lazily: the first change recorded for an order without a
+summary row computes it from the order's lines once.
+"""
+from django.db import IntegrityError, transaction
+
+from ..models_approval_summary import OrderApprovalSummary
+
+# Statuses that take part in order-level aggregation
+COUNTED_STATUSES = ('submission', 'resubmission', 'approved', 'rejected')
+
+
+def _adjust(gate_counts, approval_type, status_value, delta):
+    """Add `delta` to the count for (approval_type, status_value)"""
+    if status_value not in COUNTED_STATUSES:
+        return
+    gate = gate_counts.setdefault(approval_type, {})
+    gate[status_value] = max(0, gate.get(status_value, 0) + delta)
+    if not gate[status_value]:
+        del gate[status_value]
+    if not gate:
+        del gate_counts[approval_type]
+
+
+def compute_counts(approval_statuses):
+    """Build (line_count, gate_counts) from an iterable of line approval_status dicts"""
+    line_count = 0
+    gate_counts = {}
+    for approval_status in approval_statuses:
+        line_count += 1
+        for approval_type, status_value in (approval_status or {}).items():
+            _adjust(gate_counts, approval_type, status_value, 1)
+    return line_count, gate_counts
+
+
+def _line_statuses(order_id):
+    from ..models_order_line import OrderLine
+    return OrderLine.objects.filter(style__order_id=order_id).values_list('approval_status', flat=True)
+
+
+def rebuild_summary(order_id):
+    """Recompute an order's summary from its lines (full scan - for backfill and repair)"""
+    line_count, gate_counts = compute_counts(_line_statuses(order_id))
+    summary, _ = OrderApprovalSummary.objects.update_or_create(
+        order_id=order_id,
+        defaults={'line_count': line_count, 'gate_counts': gate_counts},
+    )
+    return summary
+
+
+def _locked_summary(order_id):
+    """
+    Return (summary, created) with the summary row locked for update.
+    Must be called inside transaction.atomic(). When the row is created here it
+    is computed from the current lines, so callers must not apply their delta.
+    """
+    summary = OrderApprovalSummary.objects.select_for_update().filter(order_id=order_id).first()
+    if summary is not None:
+        return summary, False
+
+    line_count, gate_counts = compute_counts(_line_statuses(order_id))
+    try:
+        with transaction.atomic():
+            summary = OrderApprovalSummary.objects.create(
+                order_id=order_id, line_count=line_count, gate_counts=gate_counts
+            )
+        return summary, True
+    except IntegrityError:
+        # Another request created it first
+        return OrderApprovalSummary.objects.select_for_update().get(order_id=order_id), False
+
+
+def record_approval_changes(order_id, changes):
+    """
+    Record line approval changes for one order.
+    `changes` is an iterable of (approval_type, old_status, new_status); call after
+    the lines have been saved. Returns the updated summary.
+    """
+    # No savepoint when nested (approval endpoints lock the line first): a
+    # failure here must roll back the caller's line save too
+    with transaction.atomic(savepoint=False):
+        summary, created = _locked_summary(order_id)
+        if not created:
+            for approval_type, old_status, new_status in changes:
+                if old_status == new_status:
+                    continue
+                _adjust(summary.gate_counts, approval_type, old_status, -1)
+                _adjust(summary.gate_counts, approval_type, new_status, 1)
+            summary.save(update_fields=['gate_counts', 'updated_at'])
+    return summary
+
+
+def record_approval_change(order_id, approval_type, old_status, new_status):
+    """Record a single line's approval change. Returns the updated summary."""
+    return record_approval_changes(order_id, [(approval_type, old_status, new_status)])
+
+
+def _record_lines(order_id, approval_statuses, sign):
+    """Apply added (+1) or removed (-1) lines to an existing summary only"""
+    with transaction.atomic(savepoint=False):
+        summary = OrderApprovalSummary.objects.select_for_update().filter(order_id=order_id).first()
+        if summary is None:
+            # Built lazily from the lines on the next approval change
+            return None
+        for approval_status in approval_statuses:
+            summary.line_count = max(0, summary.line_count + sign)
+            for approval_type, status_value in (approval_status or {}).items():
+                _adjust(summary.gate_counts, approval_type, status_value, sign)
+        summary.save(update_fields=['line_count', 'gate_counts', 'updated_at'])
+    return summary
+
+
+def record_lines_added(order_id, approval_statuses):
+    """Record new lines (one approval_status dict per line)"""
+    return _record_lines(order_id, approval_statuses, 1)
+
+
+def record_lines_removed(order_id, approval_statuses):
+    """Record deleted lines (one approval_status dict per line)"""
+    return _record_lines(order_id, approval_statuses, -1)
+
+
+def derive_order_status(summary, approval_type):
+    """
+    Order-level status for a gate:
+    all lines approved -> approved, else any rejected -> rejected,
+    else resubmission, else submission. None if no line has a status.
+    """
+    if summary.line_count and summary.count(approval_type, 'approved') == summary.line_count:
+        return 'approved'
+    for status_value in ('rejected', 'resubmission', 'submission'):
+        if summary.count(approval_type, status_value) > 0:
+            return status_value
+    return None
+
+
+def apply_order_approval_status(order, approval_types, summary):
+    """Set order.approval_status for the given gates from `summary` and save once"""
+    if not summary.line_count:
+        return
+    if not order.approval_status:
+        order.approval_status = {}
+    for approval_type in approval_types:
+        derived = derive_order_status(summary, approval_type)
+        if derived:
+            order.approval_status[approval_type] = derived
+    order.save(update_fields=['approval_status', 'updated_at'])
@@ -0,0 +1,146 @@
+"""
+Line approval state
+
+Keeps LineApprovalState (one row per order line and gate) in step with the
+approval endpoints, and answers "stuck approval" queries from it.
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models_line_approval_state import LineApprovalState
+
+
+def set_line_status(order_id, order_line_id, approval_type, status_value, changed_at=None):
+    """
+    Record the current status of one gate on one line.
+
+    `changed_at` is when the status took effect (defaults to now); pass it for
+    backdated changes. An empty or 'default' status removes the row. Setting
+    the status a line already has without an explicit `changed_at` is a no-op,
+    so repeated clicks do not reset the stuck timer.
+    """
+    if not status_value or status_value == 'default':
+        clear_line_status(order_line_id, approval_type)
+        return None
+
+    explicit_time = changed_at is not None
+    changed_at = changed_at or timezone.now()
+    is_pending = status_value in LineApprovalState.PENDING_STATUSES
+
+    with transaction.atomic(savepoint=False):
+        state = (
+            LineApprovalState.objects.select_for_update()
+            .filter(order_line_id=order_line_id, approval_type=approval_type)
+            .first()
+        )
+        if state is None:
+            try:
+                with transaction.atomic():
+                    return LineApprovalState.objects.create(
+                        order_id=order_id,
+                        order_line_id=order_line_id,
+                        approval_type=approval_type,
+                        status=status_value,
+                        first_submitted_at=changed_at if is_pending else None,
+                        last_changed_at=changed_at,
+                    )
+            except IntegrityError:
+                # Created concurrently - fall through and update it
+                state = LineApprovalState.objects.select_for_update().get(
+                    order_line_id=order_line_id, approval_type=approval_type
+                )
+
+        if state.status == status_value and not explicit_time:
+            return state
+
+        state.status = status_value
+        state.last_changed_at = changed_at
+        if is_pending and (state.first_submitted_at is None or changed_at < state.first_submitted_at):
+            state.first_submitted_at = changed_at
+        state.save(update_fields=['status', 'last_changed_at', 'first_submitted_at', 'updated_at'])
+    return state
+
+
+def set_line_statuses(changes):
+    """
+    Bulk form of set_line_status for many gates at once.
+
+    `changes` is an iterable of (order_id, order_line_id, approval_type,
+    status_value, changed_at) applied in order. Uses one locking read, one
+    bulk insert, one bulk update and one delete regardless of batch size.
+    """
+    changes = list(changes)
+    if not changes:
+        return
+
+    now = timezone.now()
+    line_ids = {change[1] for change in changes}
+    with transaction.atomic(savepoint=False):
+        states = {
+            (state.order_line_id, state.approval_type): state
+            for state in LineApprovalState.objects.select_for_update().filter(order_line_id__in=line_ids)
+        }
+        dirty = set()
+        cleared = set()
+        for order_id, order_line_id, approval_type, status_value, changed_at in changes:
+            key = (order_line_id, approval_type)
+            if not status_value or status_value == 'default':
+                cleared.add(key)
+                dirty.discard(key)
+                if key in states and states[key]._state.adding:
+                    del states[key]
+                continue
+
+            explicit_time = changed_at is not None
+            changed_at = changed_at or now
+            is_pending = status_value in LineApprovalState.PENDING_STATUSES
+            state = states.get(key)
+            if state is None:
+                state = states[key] = LineApprovalState(
+                    order_id=order_id,
+                    order_line_id=order_line_id,
+                    approval_type=approval_type,
+                )
+            elif key not in cleared and state.status == status_value and not explicit_time:
+                continue
+            if key in cleared:
+                # Set again after going back to default in this batch
+                cleared.discard(key)
+                state.first_submitted_at = None
+            state.status = status_value
+            state.last_changed_at = changed_at
+            if is_pending and (state.first_submitted_at is None or changed_at < state.first_submitted_at):
+                state.first_submitted_at = changed_at
+            dirty.add(key)
+
+        if cleared:
+            query = Q()
+            for order_line_id, approval_type in cleared:
+                query |= Q(order_line_id=order_line_id, approval_type=approval_type)
+            LineApprovalState.objects.filter(query).delete()
+
+        to_create = [states[key] for key in dirty if states[key]._state.adding]
+        to_update = [states[key] for key in dirty if not states[key]._state.adding]
+        for state in to_update:
+            state.updated_at = now
+        LineApprovalState.objects.bulk_create(to_create)
+        LineApprovalState.objects.bulk_update(
+            to_update, ['status', 'last_changed_at', 'first_submitted_at', 'updated_at']
+        )
+
+
+def clear_line_status(order_line_id, approval_type):
+    """Remove the state row of a gate that went back to default"""
+    LineApprovalState.objects.filter(order_line_id=order_line_id, approval_type=approval_type).delete()
+
+
+def stuck_states(days, now=None):
+    """Gates waiting on a decision (submission/resubmission) for at least `days` days"""
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    return LineApprovalState.objects.filter(
+        status__in=LineApprovalState.PENDING_STATUSES,
+        last_changed_at__lte=cutoff,
+    )
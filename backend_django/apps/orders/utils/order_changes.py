@@ -0,0 +1,135 @@
+"""
+Order change feed
+
+Every write to an order or to one of its children (styles, colors, lines,
+approval history, deliveries, production entries, documents, custom gates,
+mill offers) marks the order as changed: the signal handlers in
+apps.orders.signals call touch(), and bulk writers (which send no signals)
+call it themselves.
+
+Marks are collected per transaction and written once it commits (marks made
+outside a transaction during a request are written when the request
+finishes), moving the order's OrderChange row to the next value of the
+`order_changes` counter (apps.core.counters). The counter row stays locked
+until the marks are written, so marks become visible in sequence order: a
+client that has read everything up to cursor N never later finds a new mark
+at or below N. Marks are written after the data they describe, so a change
+may be delivered twice but is never missed.
+
+An order reassigned to another merchandiser leaves the previous one's scope:
+reassigned() adds them to the row's former_merchandiser_ids, and their feed
+reports the order as deleted (on this and any later change of the order,
+until it is assigned back to them).
+"""
+from django.db import connection, transaction
+
+from apps.core import counters
+from apps.core.models import Counter
+from ..models import Order
+from ..models_order_change import OrderChange
+
+COUNTER = 'order_changes'
+FEED_LIMIT = 500
+
+
+def _pending():
+    """Order id -> merchandiser id (or None) of orders changed by this connection and not yet marked"""
+    pending = getattr(connection, '_order_changes_pending', None)
+    if pending is None:
+        pending = connection._order_changes_pending = {}
+    return pending
+
+
+def touch(order_id, merchandiser_id=None):
+    """
+    Mark an order as changed once the current transaction commits (outside a
+    transaction: when the request finishes, or right away outside requests).
+    Pass `merchandiser_id` when the order is being deleted, so its tombstone
+    can be scoped.
+    """
+    if not order_id:
+        return
+    pending = _pending()
+    pending[order_id] = merchandiser_id or pending.get(order_id)
+    if not connection.in_atomic_block and getattr(connection, '_order_changes_in_request', False):
+        # Autocommit writes in a request: mark once, when the request finishes
+        return
+    # Every touch registers a flush: callbacks of a rolled-back transaction
+    # are dropped, and a flush with nothing pending is a no-op
+    transaction.on_commit(_flush)
+
+
+def _pending_former():
+    """Order id -> merchandiser ids the order was reassigned away from, not yet marked"""
+    former = getattr(connection, '_order_changes_former', None)
+    if former is None:
+        former = connection._order_changes_former = {}
+    return former
+
+
+def reassigned(order_id, previous_merchandiser_id):
+    """Mark an order moved away from `previous_merchandiser_id` (a tombstone in their feed)"""
+    if order_id and previous_merchandiser_id:
+        _pending_former().setdefault(order_id, set()).add(str(previous_merchandiser_id))
+    touch(order_id)
+
+
+def touch_many(order_ids):
+    for order_id in set(order_ids):
+        touch(order_id)
+
+
+def request_started(**kwargs):
+    connection._order_changes_in_request = True
+
+
+def request_finished(**kwargs):
+    connection._order_changes_in_request = False
+    _flush()
+
+
+def _flush():
+    pending = _pending()
+    if not pending:
+        return
+    changes = dict(pending)
+    pending.clear()
+    pending_former = _pending_former()
+    reassignments = {order_id: pending_former.pop(order_id) for order_id in changes if order_id in pending_former}
+
+    live = dict(Order.objects.filter(id__in=list(changes)).values_list('id', 'merchandiser_id'))
+    with transaction.atomic():
+        # Holds the counter row lock until the marks are committed (see module docstring)
+        first = counters.allocate(COUNTER, count=len(changes))
+        former = dict(
+            OrderChange.objects.filter(order_id__in=list(reassignments)).values_list('order_id', 'former_merchandiser_ids')
+        ) if reassignments else {}
+        for sequence, order_id in enumerate(sorted(changes, key=str), start=first):
+            defaults = {'sequence': sequence, 'deleted': order_id not in live}
+            merchandiser_id = live.get(order_id) or changes[order_id]
+            if merchandiser_id:
+                defaults['merchandiser_id'] = merchandiser_id
+            if order_id in reassignments:
+                # Assigned back to a former merchandiser: back in their scope
+                defaults['former_merchandiser_ids'] = sorted(
+                    (set(former.get(order_id) or ()) | reassignments[order_id]) - {str(merchandiser_id)}
+                )
+            if not OrderChange.objects.filter(order_id=order_id).update(**defaults):
+                # First change of this order (concurrent creators are serialized by the counter lock)
+                OrderChange.objects.create(order_id=order_id, **defaults)
+
+
+def current_cursor():
+    """Sequence of the latest recorded change (0 before the first one)"""
+    return Counter.objects.filter(name=COUNTER).values_list('value', flat=True).first() or 0
+
+
+def changes_since(cursor, limit=FEED_LIMIT):
+    """
+    OrderChange rows after `cursor`, oldest first, at most `limit`.
+    Returns (changes, next cursor, has_more).
+    """
+    changes = list(OrderChange.objects.filter(sequence__gt=cursor).order_by('sequence')[:limit + 1])
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    return changes, (changes[-1].sequence if changes else cursor), has_more
@@ -0,0 +1,205 @@
+"""
+Single-query order tree loader (PostgreSQL)
+
+Loads orders together with everything OrderSerializer reads - the relations
+of OrderSerializer.setup_eager_loading - in one statement instead of one
+query per prefetch. Each relation is a correlated subquery aggregating its
+rows with jsonb_agg, nested down the tree:
+
+    SELECT to_jsonb(o) || jsonb_build_object(
+        'styles', (SELECT coalesce(jsonb_agg(to_jsonb(s) || jsonb_build_object(
+            'lines', (SELECT coalesce(jsonb_agg(...), '[]') FROM order_lines l WHERE l.style_id = s.id)
+        ) ORDER BY s.sequence_number, s.created_at), '[]') FROM order_styles s WHERE s.order_id = o.id),
+        ...)
+    FROM orders o WHERE o.id IN (<queryset>)
+
+The JSON is hydrated into model instances with the prefetch and foreign key
+caches filled as prefetch_related()/select_related() would, so serializers
+and model properties read the tree without further queries.
+
+Used for the OrderViewSet actions in `json_tree_actions`; on other databases
+they keep the prefetch plan (see supported()). Compare the two paths with
+`manage.py benchmark_order_tree`.
+"""
+import json
+import uuid
+from datetime import date
+from decimal import Decimal
+from functools import lru_cache
+
+from django.db import connections, models, router
+from django.utils.dateparse import parse_datetime
+
+from ..models import Order
+
+# Relations loaded with each model, mirroring OrderSerializer.setup_eager_loading:
+# 'select' are foreign keys (select_related), 'prefetch' reverse relations,
+# 'order_by' replaces the related model's Meta.ordering.
+TREE = {
+    'select': ('merchandiser', 'created_by'),
+    'prefetch': {
+        # order_line (and its style) are linked to the lines of the tree
+        'approval_history': {'select': ('changed_by',), 'order_by': ('created_at',)},
+        'styles': {'prefetch': {
+            'colors': {},
+            'lines': {'prefetch': {
+                'mill_offers': {},
+                'deliveries': {},
+                'custom_approval_gates': {'select': ('created_by',)},
+            }},
+        }},
+        'supplier_deliveries': {},
+        'production_rollups': {},
+        'shipments': {},
+    },
+}
+
+
+def supported(model=Order):
+    """Whether the database holding `model` can run the loader (PostgreSQL)"""
+    return connections[router.db_for_read(model)].vendor == 'postgresql'
+
+
+class _Compiler:
+    def __init__(self, connection):
+        self.quote = connection.ops.quote_name
+        self.aliases = 0
+
+    def alias(self):
+        self.aliases += 1
+        return f't{self.aliases}'
+
+    def row(self, model, alias, spec):
+        """jsonb expression for one row of `model` (as `alias`) with its relations"""
+        relations = []
+        for name in spec.get('select', ()):
+            field = model._meta.get_field(name)
+            related = self.alias()
+            relations.append(
+                f"'{name}', (SELECT to_jsonb({related}) FROM {self.quote(field.related_model._meta.db_table)} {related} "
+                f"WHERE {related}.{self.quote(field.target_field.column)} = {alias}.{self.quote(field.column)})"
+            )
+        for name, child_spec in spec.get('prefetch', {}).items():
+            rel = model._meta.get_field(name)
+            child = self.alias()
+            ordering = self.ordering(rel.related_model, child, child_spec.get('order_by'))
+            relations.append(
+                f"'{name}', (SELECT coalesce(jsonb_agg({self.row(rel.related_model, child, child_spec)}{ordering}), '[]'::jsonb) "
+                f"FROM {self.quote(rel.related_model._meta.db_table)} {child} "
+                f"WHERE {child}.{self.quote(rel.field.column)} = {alias}.{self.quote(rel.field.target_field.column)})"
+            )
+        if not relations:
+            return f'to_jsonb({alias})'
+        return f"to_jsonb({alias}) || jsonb_build_object({', '.join(relations)})"
+
+    def ordering(self, model, alias, order_by=None):
+        """ORDER BY for jsonb_agg from `order_by` or the model's Meta.ordering (own fields only)"""
+        terms = []
+        for name in order_by or model._meta.ordering:
+            descending = name.startswith('-')
+            column = model._meta.get_field(name.lstrip('-')).column
+            terms.append(f"{alias}.{self.quote(column)}{' DESC' if descending else ''}")
+        return f" ORDER BY {', '.join(terms)}" if terms else ''
+
+
+def _floats(value):
+    """JSON field content with the Decimals of the parse turned back into floats"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, list):
+        return [_floats(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _floats(item) for key, item in value.items()}
+    return value
+
+
+def _converter(field):
+    """Function turning a column's JSON value into what from_db would give"""
+    target = field.target_field if field.is_relation else field
+    if isinstance(target, models.UUIDField):
+        return uuid.UUID
+    if isinstance(target, models.DateTimeField):
+        return parse_datetime
+    if isinstance(target, models.DateField):
+        return date.fromisoformat
+    if isinstance(target, models.DecimalField):
+        return Decimal
+    if isinstance(target, models.JSONField):
+        return _floats
+    return target.to_python
+
+
+@lru_cache(maxsize=None)
+def _columns(model):
+    """(column, converter) per concrete field, and the attnames for from_db"""
+    fields = model._meta.concrete_fields
+    return [(field.column, _converter(field)) for field in fields], [field.attname for field in fields]
+
+
+def _hydrate(model, data, spec, using):
+    """Model instance from its row JSON, with the relations of `spec` cached"""
+    columns, attnames = _columns(model)
+    values = []
+    for column, convert in columns:
+        value = data.get(column)
+        values.append(None if value is None else convert(value))
+    obj = model.from_db(using, attnames, values)
+
+    for name in spec.get('select', ()):
+        field = model._meta.get_field(name)
+        related = data.get(name)
+        field.set_cached_value(obj, None if related is None else _hydrate(field.related_model, related, {}, using))
+
+    obj._prefetched_objects_cache = {}
+    for name, child_spec in spec.get('prefetch', {}).items():
+        rel = model._meta.get_field(name)
+        children = [_hydrate(rel.related_model, row, child_spec, using) for row in data.get(name) or ()]
+        for child in children:
+            rel.field.set_cached_value(child, obj)
+        # Same as prefetch_related: a queryset with its result cache filled
+        queryset = getattr(obj, rel.get_accessor_name()).get_queryset()
+        queryset._result_cache = children
+        queryset._prefetch_done = True
+        obj._prefetched_objects_cache[rel.get_cache_name()] = queryset
+    return obj
+
+
+def _link_history_lines(order):
+    """Point approval history rows at the tree's lines (with their style cached)"""
+    lines = {
+        line.pk: line
+        for style in order._prefetched_objects_cache['styles']
+        for line in style._prefetched_objects_cache['lines']
+    }
+    for history in order._prefetched_objects_cache['approval_history']:
+        line = lines.get(history.order_line_id)
+        if line is not None:
+            history.order_line = line
+
+
+def load_orders(queryset):
+    """
+    The orders of `queryset` with their full tree, in one query. Only the
+    queryset's filters apply (not its select/prefetch_related); the orders
+    come back in no particular order.
+    """
+    using = queryset.db
+    connection = connections[using]
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    alias = 't0'
+    compiler = _Compiler(connection)
+    statement = (
+        f"SELECT ({compiler.row(Order, alias, TREE)})::text FROM {compiler.quote(Order._meta.db_table)} {alias} "
+        f"WHERE {alias}.{compiler.quote(Order._meta.pk.column)} IN ({sql})"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(statement, params)
+        rows = cursor.fetchall()
+
+    orders = []
+    for (content,) in rows:
+        # Decimal keeps numeric columns exact, with their scale (see _floats for JSON fields)
+        order = _hydrate(Order, json.loads(content, parse_float=Decimal), TREE, using)
+        _link_history_lines(order)
+        orders.append(order)
+    return orders
@@ -0,0 +1,208 @@
+"""
+Bulk writes for an order's styles and lines
+
+Nested order edits are applied against one in-memory snapshot of the order
+instead of saving rows one at a time: sequence numbers and style suffixes are
+assigned in memory, local-order calculations run in the same pass, and each
+level is written with a single bulk_create / bulk_update / delete.
+
+Bulk writes send no model signals, so line additions are recorded in the
+approval counts and the order is marked in the change feed here (deletions go
+through QuerySet.delete(), which does send them).
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from ..models_order_line import OrderLine
+from ..models_style_color import OrderStyle
+from . import approval_counts, order_changes
+
+# Line fields derived by OrderLine.apply_local_order_calculations
+LOCAL_CALCULATED_FIELDS = (
+    'greige_quantity', 'yarn_required',
+    'knitting_start_date', 'knitting_complete_date', 'dyeing_start_date',
+)
+
+
+def _set_changed(obj, data, changed):
+    """setattr each value that differs, adding the field name to `changed`"""
+    for attr, value in data.items():
+        if attr == 'id':
+            continue
+        if getattr(obj, attr) != value:
+            setattr(obj, attr, value)
+            changed.add(attr)
+
+
+class OrderTreeWriter:
+    """
+    Collects style and line changes for one order and writes them in bulk.
+
+    Usage:
+        writer = OrderTreeWriter(order)
+        style = writer.new_style({'description': '...'})
+        writer.new_line(style, {'color_code': 'RED', 'quantity': 100})
+        writer.flush()
+
+    Pass `styles=[]` and `lines=[]` for a freshly created order to skip the
+    snapshot queries.
+    """
+
+    def __init__(self, order, styles=None, lines=None):
+        self.order = order
+        if styles is None:
+            styles = OrderStyle.objects.filter(order=order)
+        if lines is None:
+            lines = OrderLine.objects.filter(style__order=order)
+        self.styles = {style.id: style for style in styles}
+        self.lines = {line.id: line for line in lines}
+
+        self._style_numbers = {style.style_number for style in self.styles.values()}
+        self._next_style_sequence = max((s.sequence_number for s in self.styles.values()), default=0) + 1
+        self._next_line_sequence = max((l.sequence_number for l in self.lines.values()), default=0) + 1
+
+        self._new_styles = []
+        self._new_lines = []
+        self._changed_styles = {}
+        self._changed_lines = {}
+        self._touched_line_ids = set()
+        self._deleted_line_ids = set()
+
+    # Lookups against the snapshot
+
+    def get_style(self, style_id):
+        return self.styles.get(style_id)
+
+    def get_line(self, line_id):
+        return self.lines.get(line_id)
+
+    def find_style(self, style_number):
+        """First style of the order with this style_number (snapshot and new styles)"""
+        for style in self.styles.values():
+            if style.style_number == style_number:
+                return style
+        return None
+
+    def find_line(self, style, color_code, cad_code):
+        """Line of `style` with exactly this color/CAD combination"""
+        for line in self.lines.values():
+            if line.style_id == style.id and line.color_code == color_code and line.cad_code == cad_code:
+                return line
+        return None
+
+    # Changes
+
+    def new_style(self, data):
+        """Create a style in memory, assigning sequence number and style suffix like OrderStyle.save()"""
+        style = OrderStyle(order=self.order, **data)
+        style.sequence_number = self._next_style_sequence
+        self._next_style_sequence += 1
+
+        if not style.style_number:
+            base_style = self.order.base_style_number or self.order.style_number or 'STYLE'
+            suffix = 1
+            while f"{base_style}-{str(suffix).zfill(2)}" in self._style_numbers:
+                suffix += 1
+            style.style_number = f"{base_style}-{str(suffix).zfill(2)}"
+        self._style_numbers.add(style.style_number)
+
+        self.styles[style.id] = style
+        self._new_styles.append(style)
+        return style
+
+    def update_style(self, style, data):
+        """Apply `data` to an existing style; only differing fields are written"""
+        changed = self._changed_styles.setdefault(style.id, set())
+        _set_changed(style, data, changed)
+        if 'style_number' in changed:
+            self._style_numbers.add(style.style_number)
+        return style
+
+    def new_line(self, style, data):
+        """Create a line in memory with the next order-wide sequence number"""
+        line = OrderLine(style=style, **data)
+        line.sequence_number = self._next_line_sequence
+        self._next_line_sequence += 1
+        self.lines[line.id] = line
+        self._new_lines.append(line)
+        self._touched_line_ids.add(line.id)
+        return line
+
+    def update_line(self, line, data, style=None):
+        """Apply `data` (and optionally move to `style`) on an existing line"""
+        if line._state.adding:
+            # Not written yet - the pending bulk_create picks the values up
+            changed = set()
+        else:
+            changed = self._changed_lines.setdefault(line.id, set())
+        if style is not None and line.style_id != style.id:
+            line.style = style
+            changed.add('style')
+        _set_changed(line, data, changed)
+        self._touched_line_ids.add(line.id)
+        return line
+
+    def delete_lines_except(self, keep_ids):
+        """Mark every snapshot line not in `keep_ids` (and not new) for deletion"""
+        new_ids = {line.id for line in self._new_lines}
+        for line_id in self.lines:
+            if line_id not in keep_ids and line_id not in new_ids:
+                self._deleted_line_ids.add(line_id)
+
+    # Writing
+
+    def _apply_local_calculations(self):
+        if self.order.order_type != 'local':
+            return
+        for line_id in self._touched_line_ids:
+            line = self.lines[line_id]
+            before = [getattr(line, field) for field in LOCAL_CALCULATED_FIELDS]
+            line.apply_local_order_calculations(self.order)
+            if not line._state.adding:
+                changed = self._changed_lines.setdefault(line.id, set())
+                for field, old_value in zip(LOCAL_CALCULATED_FIELDS, before):
+                    if getattr(line, field) != old_value:
+                        changed.add(field)
+
+    def flush(self):
+        """Write all collected changes in one transaction: delete, then styles, then lines"""
+        now = timezone.now()
+        self._apply_local_calculations()
+
+        with transaction.atomic():
+            if self._deleted_line_ids:
+                # Deleted first so re-added color/CAD combinations don't hit the unique constraint
+                OrderLine.objects.filter(id__in=self._deleted_line_ids).delete()
+                for line_id in self._deleted_line_ids:
+                    self.lines.pop(line_id, None)
+
+            if self._new_styles:
+                OrderStyle.objects.bulk_create(self._new_styles)
+            self._bulk_update(OrderStyle, self.styles, self._changed_styles, now)
+
+            self._bulk_update(OrderLine, self.lines, self._changed_lines, now)
+            if self._new_lines:
+                OrderLine.objects.bulk_create(self._new_lines)
+                approval_counts.record_lines_added(
+                    self.order.id, [line.approval_status for line in self._new_lines]
+                )
+            order_changes.touch(self.order.id)
+
+        self._new_styles = []
+        self._new_lines = []
+        self._changed_styles = {}
+        self._changed_lines = {}
+        self._touched_line_ids = set()
+        self._deleted_line_ids = set()
+
+    @staticmethod
+    def _bulk_update(model, objects, changed_fields, now):
+        """bulk_update the objects with changes, stamping updated_at (bulk_update skips auto_now)"""
+        changed = {obj_id: fields for obj_id, fields in changed_fields.items() if fields and obj_id in objects}
+        if not changed:
+            return
+        fields = set().union(*changed.values())
+        rows = [objects[obj_id] for obj_id in changed]
+        for row in rows:
+            row.updated_at = now
+        model.objects.bulk_update(rows, sorted(fields) + ['updated_at'])
@@ -0,0 +1,279 @@
+"""
+Production entry import from factory spreadsheets (XLSX or CSV)
+
+The sheet needs a header row; columns are matched by name (case and spacing
+ignored):
+
+    PO (or Order Number) | Style | Color | CAD | Type | Date | Quantity | Unit | Notes
+
+PO, Type, Date and Quantity are required. Style and Color resolve the row to
+an order line (CAD narrows it further when a color has several CADs); rows
+without Style and Color are recorded against the order itself.
+
+Rows are streamed (openpyxl read-only mode / csv reader), resolved against
+one query of candidate order lines, validated together and inserted with a
+single bulk_create. Invalid rows are reported back and skipped.
+"""
+import csv
+import io
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Q
+
+from ..models_order_line import OrderLine
+from ..models_production_entry import ProductionEntry, ProductionEntryType
+from . import order_changes, production_rollups, production_throughput
+
+MAX_ROWS = 5000
+
+# Normalized header -> ProductionEntry import field
+HEADER_ALIASES = {
+    'po': 'po', 'po number': 'po', 'po no': 'po', 'order': 'po', 'order number': 'po',
+    'style': 'style', 'style number': 'style', 'style no': 'style',
+    'color': 'color', 'colour': 'color', 'color code': 'color', 'color name': 'color',
+    'cad': 'cad', 'cad code': 'cad',
+    'type': 'entry_type', 'entry type': 'entry_type', 'process': 'entry_type',
+    'date': 'entry_date', 'entry date': 'entry_date',
+    'quantity': 'quantity', 'qty': 'quantity',
+    'unit': 'unit',
+    'notes': 'notes', 'remarks': 'notes',
+}
+# Required import field -> column name shown in errors
+REQUIRED_COLUMNS = {'po': 'PO', 'entry_type': 'Type', 'entry_date': 'Date', 'quantity': 'Quantity'}
+
+ENTRY_TYPE_ALIASES = {
+    'knit': ProductionEntryType.KNITTING,
+    'dye': ProductionEntryType.DYEING,
+    'finish': ProductionEntryType.FINISHING,
+}
+for _value, _label in ProductionEntryType.choices:
+    ENTRY_TYPE_ALIASES[_value] = _value
+    ENTRY_TYPE_ALIASES[_label.lower()] = _value
+
+# Day-first, as written on the factory sheets
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%d/%m/%y')
+
+
+class ProductionImportError(Exception):
+    """The file as a whole cannot be imported (unreadable, missing columns, too large)"""
+
+
+def _normalize_header(value):
+    return ' '.join(str(value or '').replace('_', ' ').replace('.', ' ').lower().split())
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def read_rows(uploaded_file):
+    """
+    Yield (row_number, {field: value}) for each non-empty data row.
+    Row numbers are the spreadsheet's own (header is row 1 if it is the first row).
+    """
+    name = (getattr(uploaded_file, 'name', '') or '').lower()
+    if name.endswith('.csv'):
+        rows = _csv_rows(uploaded_file)
+    elif name.endswith(('.xlsx', '.xlsm')):
+        rows = _xlsx_rows(uploaded_file)
+    else:
+        raise ProductionImportError('Unsupported file type. Upload an .xlsx or .csv file.')
+
+    columns = None
+    for row_number, values in rows:
+        if not any(_text(value) for value in values):
+            continue
+        if columns is None:
+            columns = [HEADER_ALIASES.get(_normalize_header(value)) for value in values]
+            missing = [label for column, label in REQUIRED_COLUMNS.items() if column not in columns]
+            if missing:
+                raise ProductionImportError(f"Missing required column(s): {', '.join(missing)}")
+            continue
+        yield row_number, {
+            column: value for column, value in zip(columns, values) if column is not None
+        }
+
+
+def _csv_rows(uploaded_file):
+    text = io.TextIOWrapper(uploaded_file.file, encoding='utf-8-sig', newline='')
+    try:
+        for row_number, values in enumerate(csv.reader(text), start=1):
+            yield row_number, values
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise ProductionImportError(f'Could not read CSV file: {exc}')
+    finally:
+        text.detach()
+
+
+def _xlsx_rows(uploaded_file):
+    from openpyxl import load_workbook
+
+    try:
+        workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+    except Exception as exc:
+        raise ProductionImportError(f'Could not read Excel file: {exc}')
+    try:
+        worksheet = workbook.worksheets[0]
+        for row_number, values in enumerate(worksheet.iter_rows(values_only=True), start=1):
+            yield row_number, values
+    finally:
+        workbook.close()
+
+
+def _parse_entry_type(value):
+    entry_type = ENTRY_TYPE_ALIASES.get(_text(value).lower())
+    if entry_type is None:
+        raise ValueError(f"Invalid type '{_text(value)}'. Must be knitting, dyeing or finishing")
+    return entry_type
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    raw = _text(value)
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(raw, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid date '{raw}'. Use YYYY-MM-DD or DD/MM/YYYY")
+
+
+def _parse_quantity(value):
+    try:
+        quantity = Decimal(_text(value).replace(',', ''))
+    except InvalidOperation:
+        raise ValueError(f"Invalid quantity '{_text(value)}'")
+    if not quantity.is_finite() or quantity <= 0:
+        raise ValueError('Quantity must be greater than 0')
+    if quantity.as_tuple().exponent < -2 or quantity >= Decimal('100000000'):
+        raise ValueError(f"Invalid quantity '{_text(value)}'")
+    return quantity
+
+
+class LineResolver:
+    """
+    Resolves (PO, style, color, CAD) to order lines among `orders`, loading
+    every candidate line of the sheet's POs in one query.
+    """
+
+    def __init__(self, orders, po_numbers):
+        self.orders_by_po = {}
+        self.lines_by_key = {}
+        if not po_numbers:
+            return
+        # PO numbers on the sheets do not always match the stored case
+        po_query = Q()
+        for po in po_numbers:
+            po_query |= Q(order_number__iexact=po)
+        matched_orders = list(orders.filter(po_query))
+        for order in matched_orders:
+            self.orders_by_po.setdefault(order.order_number.lower(), []).append(order)
+
+        lines = OrderLine.objects.filter(
+            style__order__in=[order.id for order in matched_orders]
+        ).select_related('style')
+        orders_by_id = {order.id: order for order in matched_orders}
+        for line in lines:
+            po = orders_by_id[line.style.order_id].order_number.lower()
+            style = (line.style.style_number or '').lower()
+            for color in {(line.color_code or '').lower(), (line.color_name or '').lower()}:
+                if color:
+                    self.lines_by_key.setdefault((po, style, color), []).append(line)
+
+    def resolve(self, po, style, color, cad):
+        """Return (order, line) for a row; raises ValueError when it cannot be matched"""
+        orders = self.orders_by_po.get(po.lower())
+        if not orders:
+            raise ValueError(f"PO '{po}' not found")
+
+        if not style and not color:
+            if len(orders) > 1:
+                raise ValueError(f"PO '{po}' matches {len(orders)} orders; add Style and Color")
+            return orders[0], None
+        if not style or not color:
+            raise ValueError('Style and Color must be given together')
+
+        candidates = self.lines_by_key.get((po.lower(), style.lower(), color.lower()), [])
+        if cad:
+            candidates = [
+                line for line in candidates
+                if cad.lower() in ((line.cad_code or '').lower(), (line.cad_name or '').lower())
+            ]
+        if not candidates:
+            raise ValueError(f"No order line for PO '{po}', style '{style}', color '{color}'" + (f", CAD '{cad}'" if cad else ''))
+        if len(candidates) > 1:
+            raise ValueError(f"PO '{po}', style '{style}', color '{color}' matches {len(candidates)} lines; add CAD")
+        line = candidates[0]
+        return next(order for order in orders if order.id == line.style.order_id), line
+
+
+def import_production_entries(uploaded_file, orders, user):
+    """
+    Import the rows of `uploaded_file` as production entries for `orders`
+    (a queryset limiting which orders may be written).
+
+    Returns (entries, errors): the created ProductionEntry objects and a list
+    of {'row': n, 'errors': [...]} for skipped rows. Raises
+    ProductionImportError when the file itself cannot be imported.
+    """
+    rows = []
+    for row_number, row in read_rows(uploaded_file):
+        rows.append((row_number, row))
+        if len(rows) > MAX_ROWS:
+            raise ProductionImportError(f'Too many rows. Import at most {MAX_ROWS} rows per file.')
+    if not rows:
+        raise ProductionImportError('The file has no data rows.')
+
+    resolver = LineResolver(orders, {_text(row.get('po')) for _, row in rows if _text(row.get('po'))})
+
+    entries = []
+    errors = []
+    for row_number, row in rows:
+        row_errors = []
+        values = {}
+        po = _text(row.get('po'))
+        if not po:
+            row_errors.append('PO is required')
+        else:
+            try:
+                values['order'], values['order_line'] = resolver.resolve(
+                    po, _text(row.get('style')), _text(row.get('color')), _text(row.get('cad'))
+                )
+            except ValueError as exc:
+                row_errors.append(str(exc))
+        for field, parse in (
+            ('entry_type', _parse_entry_type),
+            ('entry_date', _parse_date),
+            ('quantity', _parse_quantity),
+        ):
+            try:
+                values[field] = parse(row.get(field))
+            except ValueError as exc:
+                row_errors.append(str(exc))
+
+        if row_errors:
+            errors.append({'row': row_number, 'errors': row_errors})
+            continue
+        entries.append(ProductionEntry(
+            unit=_text(row.get('unit'))[:20] or 'kg',
+            notes=_text(row.get('notes')) or None,
+            created_by=user,
+            **values,
+        ))
+
+    if entries:
+        with transaction.atomic():
+            ProductionEntry.objects.bulk_create(entries, batch_size=500)
+            production_rollups.record_entries_added(entries)
+            production_throughput.invalidate_dates([entry.entry_date for entry in entries])
+            order_changes.touch_many(entry.order_id for entry in entries)
+    return entries, errors
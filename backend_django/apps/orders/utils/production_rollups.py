@@ -0,0 +1,282 @@
+"""
+Incremental production rollups
+
+Keeps ProductionRollup (one row per order line and entry type, plus one per
+order and entry type for entries without a line) in step with ProductionEntry
+writes, so totals, entry counts and first/last entry dates are read from one
+row instead of aggregating over every entry.
+
+Each write adjusts the affected row under a row lock. The only query against
+production_entries is the min/max refresh needed when an entry on the first or
+last date of its rollup is removed or moved.
+"""
+import operator
+from decimal import Decimal
+from functools import reduce
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.utils import timezone
+
+from ..models_production_entry import ProductionEntry, ProductionEntryType
+from ..models_production_rollup import ProductionRollup
+
+
+def _scope(order_id, order_line_id, entry_type):
+    """Filter kwargs selecting the rollup (and entries) for one key"""
+    if order_line_id:
+        return {'order_line_id': order_line_id, 'entry_type': entry_type}
+    return {'order_id': order_id, 'order_line__isnull': True, 'entry_type': entry_type}
+
+
+def _identity(order_id, order_line_id, entry_type):
+    """Key identifying a rollup row (line rollups are selected by line alone, see _scope)"""
+    return (None if order_line_id else order_id, order_line_id, entry_type)
+
+
+def _scopes(keys):
+    """Q selecting the rollups (and entries) of several keys"""
+    return reduce(operator.or_, (Q(**_scope(*key)) for key in keys))
+
+
+TOTALS = {
+    'total_quantity': Sum('quantity'),
+    'entry_count': Count('id'),
+    'first_entry_date': Min('entry_date'),
+    'last_entry_date': Max('entry_date'),
+}
+
+
+def _aggregate_entries(order_id, order_line_id, entry_type):
+    return ProductionEntry.objects.filter(**_scope(order_id, order_line_id, entry_type)).aggregate(**TOTALS)
+
+
+def _refresh_dates(rollup):
+    """Re-read first/last entry date after a boundary entry was removed"""
+    dates = ProductionEntry.objects.filter(
+        **_scope(rollup.order_id, rollup.order_line_id, rollup.entry_type)
+    ).aggregate(first=Min('entry_date'), last=Max('entry_date'))
+    rollup.first_entry_date = dates['first']
+    rollup.last_entry_date = dates['last']
+
+
+def _locked_rollup(order_id, order_line_id, entry_type):
+    return ProductionRollup.objects.select_for_update().filter(
+        **_scope(order_id, order_line_id, entry_type)
+    ).first()
+
+
+def _add(order_id, order_line_id, entry_type, quantity, entry_date):
+    """Add one stored entry to its rollup, creating the row from the entries if missing"""
+    return _add_totals(order_id, order_line_id, entry_type, quantity, 1, entry_date, entry_date)
+
+
+def _add_totals(order_id, order_line_id, entry_type, quantity, count, first_date, last_date):
+    """Add `count` stored entries (summed) to their rollup, creating the row from the entries if missing"""
+    rollup = _locked_rollup(order_id, order_line_id, entry_type)
+    if rollup is None:
+        # Computed from the entries, which already include the new ones
+        values = _aggregate_entries(order_id, order_line_id, entry_type)
+        try:
+            with transaction.atomic():
+                return ProductionRollup.objects.create(
+                    order_id=order_id,
+                    order_line_id=order_line_id,
+                    entry_type=entry_type,
+                    total_quantity=values['total_quantity'] or 0,
+                    entry_count=values['entry_count'],
+                    first_entry_date=values['first_entry_date'],
+                    last_entry_date=values['last_entry_date'],
+                )
+        except IntegrityError:
+            # Created concurrently - fall through and apply the delta
+            rollup = _locked_rollup(order_id, order_line_id, entry_type)
+
+    _apply_totals(rollup, quantity, count, first_date, last_date)
+    rollup.save()
+    return rollup
+
+
+def _apply_totals(rollup, quantity, count, first_date, last_date):
+    rollup.total_quantity = Decimal(rollup.total_quantity) + Decimal(str(quantity or 0))
+    rollup.entry_count += count
+    if rollup.first_entry_date is None or first_date < rollup.first_entry_date:
+        rollup.first_entry_date = first_date
+    if rollup.last_entry_date is None or last_date > rollup.last_entry_date:
+        rollup.last_entry_date = last_date
+
+
+def _remove(order_id, order_line_id, entry_type, quantity, entry_date):
+    """Remove one entry (no longer stored under this key) from its rollup"""
+    rollup = _locked_rollup(order_id, order_line_id, entry_type)
+    if rollup is None:
+        # Nothing recorded, or the rollup went with its order
+        return None
+
+    rollup.entry_count = max(0, rollup.entry_count - 1)
+    if not rollup.entry_count:
+        rollup.delete()
+        return None
+
+    rollup.total_quantity = Decimal(rollup.total_quantity) - Decimal(str(quantity or 0))
+    if entry_date in (rollup.first_entry_date, rollup.last_entry_date):
+        _refresh_dates(rollup)
+    rollup.save()
+    return rollup
+
+
+def record_entry_added(order_id, order_line_id, entry_type, quantity, entry_date):
+    """Record a newly saved entry"""
+    with transaction.atomic():
+        return _add(order_id, order_line_id, entry_type, quantity, entry_date)
+
+
+def record_entries_added(entries):
+    """
+    Record entries inserted with bulk_create (which sends no signals).
+    Entries are grouped by rollup key, and the affected rollups are locked,
+    created and updated in one statement each, whatever the number of keys.
+    """
+    groups = {}
+    for entry in entries:
+        key = (entry.order_id, entry.order_line_id, entry.entry_type)
+        quantity = Decimal(str(entry.quantity or 0))
+        if key not in groups:
+            groups[key] = [quantity, 1, entry.entry_date, entry.entry_date]
+            continue
+        group = groups[key]
+        group[0] += quantity
+        group[1] += 1
+        group[2] = min(group[2], entry.entry_date)
+        group[3] = max(group[3], entry.entry_date)
+
+    if not groups:
+        return
+
+    with transaction.atomic():
+        # Fixed lock order (by id) so concurrent imports do not deadlock
+        rollups = {
+            _identity(rollup.order_id, rollup.order_line_id, rollup.entry_type): rollup
+            for rollup in ProductionRollup.objects.select_for_update().filter(_scopes(groups)).order_by('pk')
+        }
+        missing = [key for key in groups if _identity(*key) not in rollups]
+        if missing:
+            # Computed from the entries, which already include the new ones
+            rows = (
+                ProductionEntry.objects.filter(_scopes(missing))
+                .values('order_id', 'order_line_id', 'entry_type')
+                .annotate(**TOTALS)
+                .order_by()
+            )
+            created = [
+                ProductionRollup(**{**row, 'total_quantity': row['total_quantity'] or 0})
+                for row in rows
+            ]
+            try:
+                with transaction.atomic():
+                    ProductionRollup.objects.bulk_create(created)
+            except IntegrityError:
+                # Some created concurrently - apply those keys one at a time
+                for key in sorted(missing, key=lambda k: (str(k[0]), str(k[1] or ''), k[2])):
+                    _add_totals(*key, *groups[key])
+
+        updated_at = timezone.now()
+        for key, totals in groups.items():
+            rollup = rollups.get(_identity(*key))
+            if rollup is not None:
+                _apply_totals(rollup, *totals)
+                rollup.updated_at = updated_at
+        if rollups:
+            ProductionRollup.objects.bulk_update(
+                list(rollups.values()),
+                ['total_quantity', 'entry_count', 'first_entry_date', 'last_entry_date', 'updated_at'],
+            )
+
+
+def record_entry_removed(order_id, order_line_id, entry_type, quantity, entry_date):
+    """Record a deleted entry"""
+    with transaction.atomic():
+        return _remove(order_id, order_line_id, entry_type, quantity, entry_date)
+
+
+def record_entry_changed(old, new):
+    """
+    Record an edited entry. `old` and `new` are (order_id, order_line_id,
+    entry_type, quantity, entry_date) tuples; call after the entry was saved.
+    """
+    if old == new:
+        return
+    with transaction.atomic():
+        _remove(*old)
+        _add(*new)
+
+
+def detach_line(order_line_id):
+    """
+    Fold a line's rollups into the order-level rollups before the line is
+    deleted (its entries keep their order but lose the line, see
+    ProductionEntry.order_line SET_NULL). Only updates or deletes existing rows,
+    so it is safe while the whole order is being deleted.
+    """
+    with transaction.atomic():
+        for rollup in ProductionRollup.objects.select_for_update().filter(order_line_id=order_line_id):
+            target = _locked_rollup(rollup.order_id, None, rollup.entry_type)
+            if target is None:
+                rollup.order_line_id = None
+                rollup.save(update_fields=['order_line', 'updated_at'])
+                continue
+            target.total_quantity = Decimal(target.total_quantity) + Decimal(rollup.total_quantity)
+            target.entry_count += rollup.entry_count
+            target.first_entry_date = min(d for d in (target.first_entry_date, rollup.first_entry_date) if d)
+            target.last_entry_date = max(d for d in (target.last_entry_date, rollup.last_entry_date) if d)
+            target.save()
+            rollup.delete()
+
+
+def rebuild_rollups(order_id):
+    """Recompute an order's rollups from its entries (full scan - for backfill and repair)"""
+    rows = (
+        ProductionEntry.objects.filter(order_id=order_id)
+        .values('order_line_id', 'entry_type')
+        .annotate(
+            total_quantity=Sum('quantity'),
+            entry_count=Count('id'),
+            first_entry_date=Min('entry_date'),
+            last_entry_date=Max('entry_date'),
+        )
+        .order_by()
+    )
+    with transaction.atomic():
+        ProductionRollup.objects.filter(order_id=order_id).delete()
+        ProductionRollup.objects.bulk_create([
+            ProductionRollup(order_id=order_id, **row) for row in rows
+        ])
+
+
+def summarize(rollups):
+    """
+    Combine rollups (e.g. all of an order's, or one line's) into per-type
+    totals: {'total_knitting', 'knitting_entries_count', 'knitting_first_date',
+    'knitting_last_date', ...} for every entry type. As with Sum() over the
+    entries, a type without entries has a None total and a 0 count.
+    """
+    summary = {}
+    for entry_type in ProductionEntryType.values:
+        summary[f'total_{entry_type}'] = None
+        summary[f'{entry_type}_entries_count'] = 0
+        summary[f'{entry_type}_first_date'] = None
+        summary[f'{entry_type}_last_date'] = None
+
+    for rollup in rollups:
+        entry_type = rollup.entry_type
+        if f'total_{entry_type}' not in summary:
+            continue
+        summary[f'total_{entry_type}'] = (summary[f'total_{entry_type}'] or Decimal('0')) + Decimal(rollup.total_quantity)
+        summary[f'{entry_type}_entries_count'] += rollup.entry_count
+        first = summary[f'{entry_type}_first_date']
+        last = summary[f'{entry_type}_last_date']
+        if rollup.first_entry_date and (first is None or rollup.first_entry_date < first):
+            summary[f'{entry_type}_first_date'] = rollup.first_entry_date
+        if rollup.last_entry_date and (last is None or rollup.last_entry_date > last):
+            summary[f'{entry_type}_last_date'] = rollup.last_entry_date
+    return summary
@@ -0,0 +1,229 @@
+"""
+Production throughput time series
+
+Quantity per day/week/month per entry type, optionally split by order, order
+line or merchandiser. Bucketing is done in SQL (Trunc over entry_date, filtered
+on the (entry_type, entry_date) index); empty buckets are zero-filled here.
+
+Buckets that ended before today are closed and cached (for
+PRODUCTION_THROUGHPUT_CACHE_SECONDS; only with a cache shared by all workers,
+see CACHE_SHARED). Every write that can move a quantity between buckets or
+groups - production entry writes, deleting an order or a line, reassigning an
+order's merchandiser - gives the month(s) of the entry dates involved a new
+version stamp (see invalidate_dates), and cached buckets are keyed on the
+stamps of the months they cover, so a backdated or edited entry retires
+exactly the buckets it falls in. Stamps are random tokens, never reused: a
+stamp that was evicted from the cache is replaced by a new one, so buckets
+cached under it cannot come back.
+"""
+import hashlib
+import uuid
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from ..models_production_entry import ProductionEntryType
+
+INTERVALS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+# group_by -> ProductionEntry field holding the group key (None = whole factory)
+GROUP_FIELDS = {
+    'factory': None,
+    'order': 'order_id',
+    'line': 'order_line_id',
+    'merchandiser': 'order__merchandiser_id',
+}
+
+MAX_BUCKETS = 400
+CACHE_PREFIX = 'production_throughput'
+
+
+def bucket_start(value, interval):
+    """First day of the bucket containing `value`"""
+    if interval == 'week':
+        return value - timedelta(days=value.weekday())
+    if interval == 'month':
+        return value.replace(day=1)
+    return value
+
+
+def next_bucket(start, interval):
+    if interval == 'week':
+        return start + timedelta(days=7)
+    if interval == 'month':
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start + timedelta(days=1)
+
+
+def bucket_range(date_from, date_to, interval):
+    """Bucket start dates covering date_from..date_to (inclusive)"""
+    buckets = []
+    current = bucket_start(date_from, interval)
+    while current <= date_to:
+        buckets.append(current)
+        if len(buckets) > MAX_BUCKETS:
+            raise ValueError(f'Too many {interval} buckets. Request at most {MAX_BUCKETS}.')
+        current = next_bucket(current, interval)
+    return buckets
+
+
+def _months(start, end):
+    """First days of the months touched by start..end (end exclusive)"""
+    months = []
+    current = start.replace(day=1)
+    while current < end:
+        months.append(current)
+        current = next_bucket(current, 'month')
+    return months
+
+
+def _version_key(month):
+    return f'{CACHE_PREFIX}:version:{month:%Y-%m}'
+
+
+def invalidate_dates(dates):
+    """
+    Retire cached buckets covering any of `dates` (entry dates written or
+    removed). Runs once the surrounding transaction commits, so a bucket cannot
+    be re-cached from data read before the write became visible.
+    """
+    months = {value.replace(day=1) for value in dates if value}
+    if months:
+        transaction.on_commit(lambda: _bump_versions(months))
+
+
+def _new_stamp():
+    return uuid.uuid4().hex
+
+
+def _bump_versions(months):
+    cache.set_many({_version_key(month): _new_stamp() for month in months}, None)
+
+
+def _versions(months):
+    """Version stamp key -> stamp for `months`, giving months without one a new stamp"""
+    keys = [_version_key(month) for month in months]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            # add() keeps a stamp set concurrently (by another reader or a write)
+            cache.add(key, _new_stamp(), None)
+        versions.update(cache.get_many(missing))
+    return versions
+
+
+def _query(entries, interval, group_field, date_from, date_to):
+    """Rows of (bucket, group key, entry_type, quantity, count) for the entries between the dates"""
+    fields = ['bucket', 'entry_type'] + ([group_field] if group_field else [])
+    rows = (
+        entries.filter(entry_date__gte=date_from, entry_date__lte=date_to)
+        .annotate(bucket=INTERVALS[interval]('entry_date'))
+        .values(*fields)
+        .annotate(quantity=Sum('quantity'), entries=Count('id'))
+        .order_by()
+    )
+    for row in rows:
+        bucket = row['bucket']
+        if hasattr(bucket, 'date'):
+            bucket = bucket.date()
+        group_key = row[group_field] if group_field else None
+        yield bucket, str(group_key) if group_key is not None else None, row['entry_type'], row['quantity'], row['entries']
+
+
+def throughput(entries, interval, group_by, date_from, date_to, cache_scope, today=None):
+    """
+    Aggregate `entries` (a ProductionEntry queryset already limited to what the
+    caller may see) into buckets.
+
+    `cache_scope` must identify that limitation (user scope and filters) - it
+    is part of the cache key of closed buckets.
+
+    Returns (buckets, {(group_key, entry_type): {bucket: (quantity, count)}}).
+    """
+    today = today or timezone.localdate()
+    group_field = GROUP_FIELDS[group_by]
+    buckets = bucket_range(date_from, date_to, interval)
+    bucket_ends = {bucket: next_bucket(bucket, interval) for bucket in buckets}
+
+    closed = [bucket for bucket in buckets if bucket_ends[bucket] <= today]
+    open_buckets = [bucket for bucket in buckets if bucket_ends[bucket] > today]
+
+    timeout = settings.PRODUCTION_THROUGHPUT_CACHE_SECONDS
+    scope_hash = hashlib.md5(f'{cache_scope}|{interval}|{group_by}'.encode()).hexdigest()
+    months = sorted({month for bucket in closed for month in _months(bucket, bucket_ends[bucket])})
+    versions = _versions(months) if timeout and months else {}
+
+    def cache_key(bucket):
+        stamps = [versions.get(_version_key(month)) for month in _months(bucket, bucket_ends[bucket])]
+        if None in stamps:
+            # No stamp to retire the entry with (cache unavailable): do not cache
+            return None
+        return f"{CACHE_PREFIX}:{scope_hash}:{bucket.isoformat()}:{'.'.join(stamps)}"
+
+    keys = {}
+    if timeout:
+        for bucket in closed:
+            key = cache_key(bucket)
+            if key:
+                keys[bucket] = key
+    cached = cache.get_many(list(keys.values())) if keys else {}
+
+    rows_by_bucket = {}
+    missing = [bucket for bucket in closed if keys.get(bucket) not in cached]
+    for bucket in closed:
+        if keys.get(bucket) in cached:
+            rows_by_bucket[bucket] = cached[keys[bucket]]
+
+    # One query for the missing closed buckets and one for the open ones;
+    # the query range is widened to whole buckets so partial edges are not cached
+    fetched = {}
+    for group in (missing, open_buckets):
+        if not group:
+            continue
+        query_to = bucket_ends[group[-1]] - timedelta(days=1)
+        for bucket, group_key, entry_type, quantity, count in _query(entries, interval, group_field, group[0], query_to):
+            if bucket in bucket_ends:
+                fetched.setdefault(bucket, []).append((group_key, entry_type, str(quantity or 0), count))
+    for bucket in missing + open_buckets:
+        rows_by_bucket[bucket] = fetched.get(bucket, [])
+    if keys and missing:
+        cache.set_many({keys[bucket]: rows_by_bucket[bucket] for bucket in missing if bucket in keys}, timeout)
+
+    series = {}
+    for bucket, rows in rows_by_bucket.items():
+        for group_key, entry_type, quantity, count in rows:
+            series.setdefault((group_key, entry_type), {})[bucket] = (float(quantity), count)
+    return buckets, series
+
+
+def zero_filled(buckets, series, group_by, entry_types=None):
+    """
+    One list per (group key, entry type) with a value for every bucket.
+    Every group that has data gets a series for each of `entry_types`
+    (default: all types); the factory-wide view always has one per type.
+    """
+    entry_types = entry_types or ProductionEntryType.values
+    group_keys = {group_key for group_key, _ in series}
+    if not group_keys and GROUP_FIELDS[group_by] is None:
+        group_keys = {None}
+    filled = []
+    for group_key in group_keys:
+        for entry_type in entry_types:
+            values = series.get((group_key, entry_type), {})
+            filled.append({
+                'key': group_key,
+                'entryType': entry_type,
+                'quantities': [values.get(bucket, (0.0, 0))[0] for bucket in buckets],
+                'entryCounts': [values.get(bucket, (0.0, 0))[1] for bucket in buckets],
+            })
+    return filled
@@ -9,35 +9,54 @@ from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from django.db import transaction
 from django.db.models import Sum, Count, Q, Prefetch
 from django.utils import timezone
-from django.http import HttpResponse, FileResponse
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404, HttpResponse, FileResponse
 from .models import Order, OrderStatus, OrderCategory, Document, ApprovalHistory, CustomApprovalGate, OrderActivityLog
 from .serializers import (
     OrderSerializer, OrderCreateSerializer, OrderUpdateSerializer,
-    OrderListSerializer, OrderAlertSerializer, OrderStatsSerializer, ApprovalUpdateSerializer,
+    OrderListSerializer, OrderDeltaSerializer, OrderAlertSerializer, LineApprovalStateSerializer, OrderStatsSerializer, ApprovalUpdateSerializer,
+    BulkApprovalUpdateSerializer,
     StageChangeSerializer, DocumentSerializer, ApprovalHistorySerializer, ApprovalHistoryUpdateSerializer,
     CustomApprovalGateSerializer, CustomApprovalGateCreateSerializer, CustomApprovalGateUpdateSerializer,
     OrderActivityLogSerializer, OrderActivityLogCreateSerializer, OrderActivityLogUpdateSerializer
 )
+from .serializers_order_line import OrderLineSerializer
 from .filters import OrderFilter
 from .utils.export import generate_orders_excel, generate_purchase_order_pdf, generate_tna_excel
+from .utils import approval_counts, approval_state, order_changes, order_json_tree
+from .models_approval_summary import OrderApprovalSummary
+from apps.authentication.user_details import UserDetailsMixin
+from apps.core.db_routing import ReplicaReadsMixin
 from apps.core.permissions import IsMerchandiser, IsAdminOrManager
+from apps.core.renderers import ColumnarJSONRenderer
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(ReplicaReadsMixin, UserDetailsMixin, viewsets.ModelViewSet):
     """
     ViewSet for Order CRUD operations
     
     Endpoints:
     - GET /orders/ - List all orders (filtered by role)
+    - GET /orders/?format=columnar - Same list as column header + row arrays, lines as a second table
     - POST /orders/ - Create new order
     - GET /orders/{id}/ - Get order details
     - PATCH /orders/{id}/ - Update order
     - DELETE /orders/{id}/ - Delete order
     - GET /orders/stats/ - Get order statistics
+    - GET /orders/changes/?since=<cursor> - Orders changed since a cursor, plus deleted ids
     - PATCH /orders/{id}/approvals/ - Update approval status
+    - POST /orders/approvals/bulk/ - Update many line approvals at once
     - POST /orders/{id}/change_stage/ - Change order stage
+
+    Approval, stage and line mutations respond with the full order, or with a
+    compact delta (changed lines + order-level state) when called with
+    ?response=delta or an X-Response-Mode: delta header.
+
+    With ?users=ref, user details are sent once in a `users` table instead of
+    embedded per order/row (see apps.authentication.user_details).
     """
     queryset = Order.objects.select_related('merchandiser', 'created_by').prefetch_related(
         # Prefetch approval history with explicit ascending order by created_at
@@ -50,10 +69,10 @@ class OrderViewSet(viewsets.ModelViewSet):
         'styles__lines__mill_offers',  # Prefetch mill offers per line for development stage
         'styles__lines__documents',
         'styles__lines__deliveries',  # Prefetch line-level deliveries for production progress
-        'styles__lines__production_entries',  # Prefetch line-level production entries
+        'styles__lines__production_rollups',  # Prefetch line-level production totals
         'styles__lines__custom_approval_gates',  # Prefetch custom approval gates per line
         'documents',  # Prefetch documents for LC/PI dates
-        'production_entries',  # Prefetch production entries for local orders (order-level)
+        'production_rollups',  # Prefetch production totals for local orders (order-level)
         'supplier_deliveries',  # Prefetch supplier deliveries for production summary
     ).all()
     permission_classes = [permissions.IsAuthenticated, IsMerchandiser]
@@ -72,7 +91,40 @@ class OrderViewSet(viewsets.ModelViewSet):
     ordering_fields = ['created_at', 'order_date', 'expected_delivery_date', 'order_number']
     ordering = ['-created_at']
     pagination_class = None  # Disable pagination - frontend expects array directly
-    
+    # Read-only reporting actions served from the read replica when configured (apps.core.db_routing)
+    replica_actions = {'list', 'stats', 'export_excel', 'export_tna', 'alerts_upcoming_etd', 'alerts_stuck_approvals'}
+    # Nested lists flattened into their own table by ?format=columnar on the list
+    columnar_tables = ('lines',)
+    # Actions loading the full order with one JSON aggregation query instead of
+    # the prefetch plan (apps.orders.utils.order_json_tree; PostgreSQL only).
+    # Covers retrieve and the full-order responses of mutations (_load_for_detail).
+    json_tree_actions = {'retrieve'}
+
+    # Queryset profile per action (see get_queryset). Actions not listed here
+    # (list, stats, exports) use the list prefetches above.
+    # - retrieve renders the full order through OrderSerializer's prefetch plan
+    # - creator actions check the order's creator
+    # - row actions only need the order row (scope check, id, own fields);
+    #   those responding with the full order re-load it via _load_for_detail
+    CREATOR_ACTIONS = {'destroy', 'request_deletion'}
+    ROW_ACTIONS = {
+        'update', 'partial_update',
+        'alerts_upcoming_etd', 'alerts_stuck_approvals', 'bulk_update_approvals',
+        'update_approval', 'change_stage',
+        'update_line_status', 'bulk_update_line_status', 'update_swatch_dates', 'update_produced_quantity',
+        'get_documents', 'upload_document', 'download_document', 'download_po',
+        'get_line_approval_history', 'update_approval_history', 'delete_approval_history',
+        'custom_approval_gates', 'update_custom_gate',
+        'activity_logs', 'update_activity_log', 'get_line_activity_logs',
+    }
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if self.action == 'list':
+            # ?format=columnar for the orders grid
+            renderers.append(ColumnarJSONRenderer())
+        return renderers
+
     def get_serializer_class(self):
         """Return appropriate serializer based on action"""
         if self.action == 'list':
@@ -110,7 +162,14 @@ class OrderViewSet(viewsets.ModelViewSet):
         """
         if self.action in ['list', 'stats', 'export_excel']:
             self._validate_date_params()
-        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            queryset = OrderSerializer.setup_eager_loading(Order.objects.all())
+        elif self.action in self.CREATOR_ACTIONS:
+            queryset = Order.objects.select_related('created_by')
+        elif self.action in self.ROW_ACTIONS:
+            queryset = Order.objects.all()
+        else:
+            queryset = super().get_queryset()
         user = self.request.user
         
         # Merchandisers only see their own orders
@@ -130,6 +189,67 @@ class OrderViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    def _use_json_tree(self):
+        return self.action in self.json_tree_actions and order_json_tree.supported()
+
+    def get_object(self):
+        """For retrieve in json_tree_actions: the scoped order with its whole tree, in one query"""
+        if self.action != 'retrieve' or not self._use_json_tree():
+            return super().get_object()
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            orders = order_json_tree.load_orders(queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]}))
+        except (TypeError, ValueError, DjangoValidationError):
+            raise Http404
+        if not orders:
+            raise Http404
+        self.check_object_permissions(self.request, orders[0])
+        return orders[0]
+
+    def _load_for_detail(self, order):
+        """
+        Re-load `order` with OrderSerializer's prefetch plan (or the JSON tree
+        loader), so responses built after a change reflect it and render with
+        a fixed number of queries.
+        """
+        if self._use_json_tree():
+            return order_json_tree.load_orders(Order.objects.filter(pk=order.pk))[0]
+        return OrderSerializer.setup_eager_loading(Order.objects.filter(pk=order.pk)).get()
+
+    def _wants_delta(self):
+        """Client asked for compact responses (?response=delta or X-Response-Mode: delta)"""
+        mode = self.request.query_params.get('response') or self.request.headers.get('X-Response-Mode')
+        return (mode or '').strip().lower() == 'delta'
+
+    def _order_response(self, order, lines=(), include_history=False):
+        """
+        Response data for a line-level mutation: the full order by default, or
+        an OrderDeltaSerializer payload (changed lines and order-level state)
+        when the client opted in. `include_history` is for mutations that add
+        approval history or change timeline events.
+        """
+        from .models_order_line import OrderLine
+
+        if not self._wants_delta():
+            return OrderSerializer(self._load_for_detail(order)).data
+
+        queryset = Order.objects.filter(pk=order.pk)
+        if include_history:
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    'approval_history',
+                    queryset=ApprovalHistory.objects.select_related('changed_by', 'order_line__style')
+                ),
+                'shipments',
+            )
+        lines = OrderLineSerializer.setup_eager_loading(
+            OrderLine.objects.filter(id__in=[line.id for line in lines])
+        ).order_by('style__sequence_number', 'style__created_at', 'sequence_number', 'created_at')
+        return OrderDeltaSerializer(
+            queryset.get(), context={'lines': list(lines), 'include_history': include_history}
+        ).data
+
     def perform_create(self, serializer):
         """Set merchandiser and created_by to current user when creating order"""
         serializer.save(merchandiser=self.request.user, created_by=self.request.user)
@@ -141,7 +261,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         order = serializer.save(merchandiser=request.user, created_by=request.user)
         
         # Return full order data
-        response_serializer = OrderSerializer(order)
+        response_serializer = OrderSerializer(self._load_for_detail(order))
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
     
     def update(self, request, *args, **kwargs):
@@ -153,7 +273,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         self.perform_update(serializer)
         
         # Return full order data
-        response_serializer = OrderSerializer(instance)
+        response_serializer = OrderSerializer(self._load_for_detail(instance))
         return Response(response_serializer.data)
     
     def destroy(self, request, *args, **kwargs):
@@ -269,6 +389,70 @@ class OrderViewSet(viewsets.ModelViewSet):
         serializer = OrderStatsSerializer(stats)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'], url_path='changes')
+    def changes(self, request):
+        """
+        GET /orders/changes/?since=<cursor>
+        Orders changed (own row or any style, line, approval, delivery,
+        production entry or document) after `cursor`, serialized like the list,
+        plus the ids of deleted orders and of orders reassigned away from the
+        merchandiser in scope. See apps.orders.utils.order_changes.
+
+        since=0 returns every order (initial sync). Pass the returned cursor as
+        `since` on the next call; when hasMore is true, call again right away.
+
+        Response:
+        {
+            "cursor": 1234,
+            "hasMore": false,
+            "orders": [...],
+            "deleted": ["uuid", ...]
+        }
+        """
+        try:
+            since = int(request.query_params.get('since', ''))
+            if since < 0:
+                raise ValueError
+        except ValueError:
+            raise ValidationError('Invalid since parameter. Use 0 or the cursor of the previous response')
+
+        # Read before the orders, so changes made meanwhile come with the next call
+        latest = order_changes.current_cursor()
+        if since > latest:
+            raise ValidationError('Cursor is ahead of the change feed. Resync with since=0')
+
+        queryset = self.get_queryset()
+        if since == 0:
+            changed, cursor, has_more = [], latest, False
+        else:
+            changed, cursor, has_more = order_changes.changes_since(since)
+            queryset = queryset.filter(id__in=[change.order_id for change in changed if not change.deleted])
+
+        # Tombstones follow the same merchandiser scoping as get_queryset; an
+        # order reassigned to someone else is gone from the merchandiser's scope
+        user = request.user
+        merchandiser_id = None
+        if user.role == 'merchandiser':
+            merchandiser_id = user.id
+        elif user.role in ['admin', 'manager']:
+            merchandiser_id = request.query_params.get('merchandiserId')
+        deleted = [
+            str(change.order_id) for change in changed
+            if (change.deleted and (not merchandiser_id or str(change.merchandiser_id) == str(merchandiser_id)))
+            or (merchandiser_id and str(merchandiser_id) in change.former_merchandiser_ids
+                and str(change.merchandiser_id) != str(merchandiser_id))
+        ]
+
+        serializer = OrderListSerializer(
+            queryset.order_by('-created_at'), many=True, context=self.get_serializer_context()
+        )
+        return Response({
+            'cursor': cursor,
+            'hasMore': has_more,
+            'orders': serializer.data,
+            'deleted': deleted,
+        })
+
     @action(detail=False, methods=['get'], url_path='alerts/upcoming-etd')
     def alerts_upcoming_etd(self, request):
         """Return orders with ETD between today and today + days (default 7).
@@ -297,32 +481,38 @@ class OrderViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], url_path='alerts/stuck-approvals')
     def alerts_stuck_approvals(self, request):
-        """Return orders with pending approvals, ideally stuck for more than 3 days.
-        Uses updated_at <= now - 3 days as the heuristic.
+        """Return orders with line approvals stuck in submission/resubmission
+        for at least `days` days (default 3).
+        Uses LineApprovalState.last_changed_at, so unrelated edits to the order
+        do not reset the timer. Each order lists its stuck gates.
         """
-        base_queryset = self.get_queryset()
-
-        pending_filter = (
-            Q(approval_status__contains={'labDip': 'pending'}) |
-            Q(approval_status__contains={'strikeOff': 'pending'}) |
-            Q(approval_status__contains={'qualityTest': 'pending'}) |
-            Q(approval_status__contains={'bulkSwatch': 'pending'}) |
-            Q(approval_status__contains={'ppSample': 'pending'})
-        )
+        days_param = request.query_params.get('days')
+        try:
+            days = int(days_param) if days_param is not None else 3
+            if days < 0:
+                raise ValueError
+        except ValueError:
+            raise ValidationError('Invalid days parameter. Must be a non-negative integer')
 
-        three_days_ago = timezone.now() - timedelta(days=3)
+        stuck = approval_state.stuck_states(days)
 
         queryset = (
-            base_queryset
-            .filter(pending_filter)
-            .filter(updated_at__lte=three_days_ago)
+            self.get_queryset()
+            .filter(id__in=stuck.values('order_id'))
             .exclude(status__in=[OrderStatus.COMPLETED, OrderStatus.ARCHIVED])
             .order_by('etd')
         )
+        orders = list(queryset)
+
+        stuck_by_order = {}
+        for state in stuck.filter(order_id__in=[order.id for order in orders]).order_by('last_changed_at'):
+            stuck_by_order.setdefault(state.order_id, []).append(LineApprovalStateSerializer(state).data)
+
+        data = OrderAlertSerializer(orders, many=True).data
+        for order, item in zip(orders, data):
+            item['stuckApprovals'] = stuck_by_order.get(order.id, [])
+        return Response(data)
 
-        serializer = OrderAlertSerializer(queryset, many=True)
-        return Response(serializer.data)
-    
     @action(detail=True, methods=['patch'], url_path='approvals')
     def update_approval(self, request, pk=None):
         """
@@ -350,115 +540,223 @@ class OrderViewSet(viewsets.ModelViewSet):
         
         order_line = None
         
-        if order_line_id:
-            # Line-level approval
-            try:
-                order_line = OrderLine.objects.get(id=order_line_id, style__order=order)
-            except OrderLine.DoesNotExist:
-                return Response(
-                    {'error': 'Order line not found'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
+        # One transaction with the line locked: the approval count diff (apps.orders.signals)
+        # is taken against the current row, and the line and its history commit together
+        with transaction.atomic():
+            if order_line_id:
+                # Line-level approval
+                try:
+                    order_line = (
+                        OrderLine.objects.select_for_update(of=('self',))
+                        .select_related('style')
+                        .get(id=order_line_id, style__order=order)
+                    )
+                except OrderLine.DoesNotExist:
+                    return Response(
+                        {'error': 'Order line not found'},
+                        status=status.HTTP_404_NOT_FOUND
+                    )
+            
+                # Store previous status for history tracking
+                if not order_line.approval_status:
+                    order_line.approval_status = {}
+                previous_status = order_line.approval_status.get(approval_type, '')
             
-            # Store previous status for history tracking
-            if not order_line.approval_status:
-                order_line.approval_status = {}
-            previous_status = order_line.approval_status.get(approval_type, '')
+                # Update line approval status
+                if approval_status:  # Only set if not empty (not "Default")
+                    order_line.approval_status[approval_type] = approval_status
+                elif approval_type in order_line.approval_status:
+                    # If setting to empty/default, remove the key
+                    del order_line.approval_status[approval_type]
             
-            # Update line approval status
-            if approval_status:  # Only set if not empty (not "Default")
-                order_line.approval_status[approval_type] = approval_status
-            elif approval_type in order_line.approval_status:
-                # If setting to empty/default, remove the key
-                del order_line.approval_status[approval_type]
+                order_line.save(update_fields=['approval_status', 'updated_at'])
             
-            order_line.save(update_fields=['approval_status', 'updated_at'])
+                # Update approval_date if status is approved
+                if approval_status == 'approved' and not order_line.approval_date:
+                    # Use custom timestamp date if provided, otherwise use current date
+                    if custom_timestamp:
+                        order_line.approval_date = custom_timestamp.date()
+                    else:
+                        order_line.approval_date = timezone.now().date()
+                    order_line.save(update_fields=['approval_date', 'updated_at'])
             
-            # Update approval_date if status is approved
-            if approval_status == 'approved' and not order_line.approval_date:
-                # Use custom timestamp date if provided, otherwise use current date
-                if custom_timestamp:
-                    order_line.approval_date = custom_timestamp.date()
-                else:
-                    order_line.approval_date = timezone.now().date()
-                order_line.save(update_fields=['approval_date', 'updated_at'])
+                approval_state.set_line_status(
+                    order.id, order_line.id, approval_type, approval_status, changed_at=custom_timestamp
+                )
             
-            # Aggregate line approvals to order level
-            self._aggregate_line_approvals_to_order(order, approval_type)
-        else:
-            # Order-level approval (backwards compatible)
-            previous_status = (order.approval_status or {}).get(approval_type, '') if order.approval_status else ''
-            order.update_approval_status(approval_type, approval_status)
+                # Aggregate line approvals to order level
+                self._aggregate_line_approvals_to_order(order, approval_type)
+            else:
+                # Order-level approval (backwards compatible)
+                previous_status = (order.approval_status or {}).get(approval_type, '') if order.approval_status else ''
+                order.update_approval_status(approval_type, approval_status)
         
-        # Create approval history record only if status actually changed AND it's not empty/default
-        # This ensures "Default" doesn't create timeline events, but changing from "Default" to "Submission" does
-        should_create_history = approval_status and (not previous_status or previous_status != approval_status)
+            # Create approval history record only if status actually changed AND it's not empty/default
+            # This ensures "Default" doesn't create timeline events, but changing from "Default" to "Submission" does
+            should_create_history = approval_status and (not previous_status or previous_status != approval_status)
         
-        if should_create_history:
-            history_entry = ApprovalHistory.objects.create(
-                order=order,
-                order_line=order_line,
-                approval_type=approval_type,
-                status=approval_status,
-                changed_by=request.user if request.user.is_authenticated else None
-            )
+            if should_create_history:
+                history_entry = ApprovalHistory.objects.create(
+                    order=order,
+                    order_line=order_line,
+                    approval_type=approval_type,
+                    status=approval_status,
+                    changed_by=request.user if request.user.is_authenticated else None
+                )
             
-            # If custom timestamp provided, update the created_at field
-            # Using QuerySet.update() bypasses auto_now_add behavior
-            if custom_timestamp:
-                ApprovalHistory.objects.filter(pk=history_entry.pk).update(created_at=custom_timestamp)
+                # If custom timestamp provided, update the created_at field
+                # Using QuerySet.update() bypasses auto_now_add behavior
+                if custom_timestamp:
+                    ApprovalHistory.objects.filter(pk=history_entry.pk).update(created_at=custom_timestamp)
+                    order_changes.touch(order.id)
 
         # Stage changes are now manual - no auto-progress based on approval status
         # Users must use the "Go to Next Stage" button or status dropdown to change stages
         
         # Return updated order
-        response_serializer = OrderSerializer(order)
-        return Response(response_serializer.data)
+        return Response(self._order_response(order, [order_line] if order_line else [], include_history=True))
     
-    def _aggregate_line_approvals_to_order(self, order, approval_type):
+    @action(detail=False, methods=['post'], url_path='approvals/bulk')
+    def bulk_update_approvals(self, request):
         """
-        Aggregate line-level approvals to order-level approval_status
+        POST /orders/approvals/bulk/
+        Apply many line-level approval changes (across lines and orders) in one transaction
+        
+        Request body:
+        {
+            "updates": [
+                {"orderLineId": "uuid", "approvalType": "labDip", "status": "approved",
+                 "customTimestamp": "2024-01-15T10:30:00Z" (optional)},
+                ...
+            ]
+        }
+        
+        Lines are saved with one bulk update, history rows with one bulk insert,
+        and each affected order is re-aggregated once. Returns a compact result
+        per update plus the new approval_status of each affected order.
         """
         from .models_order_line import OrderLine
         
-        # Get all lines for this order
-        all_lines = OrderLine.objects.filter(style__order=order)
+        serializer = BulkApprovalUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updates = serializer.validated_data['updates']
+        
+        now = timezone.now()
+        changed_by = request.user if request.user.is_authenticated else None
+        line_ids = {item['order_line_id'] for item in updates}
+        
+        with transaction.atomic():
+            # Only lines of orders this user can see
+            lines = {
+                line.id: line
+                for line in OrderLine.objects.select_for_update(of=('self',))
+                .select_related('style')
+                .filter(id__in=line_ids, style__order__in=self.get_queryset().values('id'))
+            }
+            
+            results = []
+            changed_lines = {}
+            history_entries = []
+            count_changes = {}
+            state_changes = []
+            touched_gates = {}
+            
+            for item in updates:
+                line = lines.get(item['order_line_id'])
+                approval_type = item['approval_type']
+                if line is None:
+                    results.append({
+                        'orderLineId': str(item['order_line_id']),
+                        'approvalType': approval_type,
+                        'error': 'Order line not found',
+                    })
+                    continue
+                
+                approval_status = item['status']
+                custom_timestamp = item.get('custom_timestamp')
+                order_id = line.style.order_id
+                
+                if not line.approval_status:
+                    line.approval_status = {}
+                previous_status = line.approval_status.get(approval_type, '')
+                line.approval_status[approval_type] = approval_status
+                
+                # Update approval_date if status is approved
+                if approval_status == 'approved' and not line.approval_date:
+                    line.approval_date = custom_timestamp.date() if custom_timestamp else now.date()
+                
+                if previous_status != approval_status:
+                    count_changes.setdefault(order_id, []).append(
+                        (approval_type, previous_status, approval_status)
+                    )
+                    history_entries.append((
+                        ApprovalHistory(
+                            order_id=order_id,
+                            order_line=line,
+                            approval_type=approval_type,
+                            status=approval_status,
+                            changed_by=changed_by,
+                        ),
+                        custom_timestamp,
+                    ))
+                
+                state_changes.append((order_id, line.id, approval_type, approval_status, custom_timestamp))
+                touched_gates.setdefault(order_id, set()).add(approval_type)
+                changed_lines[line.id] = line
+                results.append({
+                    'orderLineId': str(line.id),
+                    'orderId': str(order_id),
+                    'approvalType': approval_type,
+                    'status': approval_status,
+                    'previousStatus': previous_status or None,
+                    'approvalDate': line.approval_date,
+                })
+            
+            # bulk_update skips auto_now, so stamp updated_at explicitly
+            for line in changed_lines.values():
+                line.updated_at = now
+            OrderLine.objects.bulk_update(
+                changed_lines.values(), ['approval_status', 'approval_date', 'updated_at']
+            )
+            
+            ApprovalHistory.objects.bulk_create([entry for entry, _ in history_entries])
+            # created_at is auto_now_add, so backdate with an UPDATE per distinct timestamp
+            backdated = {}
+            for entry, custom_timestamp in history_entries:
+                if custom_timestamp:
+                    backdated.setdefault(custom_timestamp, []).append(entry.pk)
+            for custom_timestamp, entry_ids in backdated.items():
+                ApprovalHistory.objects.filter(pk__in=entry_ids).update(created_at=custom_timestamp)
+            
+            approval_state.set_line_statuses(state_changes)
+            
+            # Bulk updates send no signals: record count changes and re-aggregate once per order
+            orders = Order.objects.in_bulk(list(touched_gates))
+            for order_id, approval_types in touched_gates.items():
+                summary = approval_counts.record_approval_changes(order_id, count_changes.get(order_id, []))
+                approval_counts.apply_order_approval_status(orders[order_id], sorted(approval_types), summary)
         
-        if not all_lines.exists():
-            return
+        return Response({
+            'results': results,
+            'orders': [
+                {'id': str(order.id), 'approvalStatus': order.approval_status}
+                for order in orders.values()
+            ],
+        })
+    
+    def _aggregate_line_approvals_to_order(self, order, approval_type):
+        """
+        Aggregate line-level approvals to order-level approval_status
         
-        # Count approval statuses for this approval type across all lines
-        approved_count = 0
-        rejected_count = 0
-        resubmission_count = 0
-        submission_count = 0
-        total_count = all_lines.count()
-        
-        for line in all_lines:
-            line_status = (line.approval_status or {}).get(approval_type)
-            if line_status == 'approved':
-                approved_count += 1
-            elif line_status == 'rejected':
-                rejected_count += 1
-            elif line_status == 'resubmission':
-                resubmission_count += 1
-            elif line_status == 'submission':
-                submission_count += 1
+        Reads the running per-gate counts kept in OrderApprovalSummary (see
+        apps.orders.signals) instead of scanning every line of the order.
+        """
+        summary = OrderApprovalSummary.objects.filter(order=order).first()
+        if summary is None:
+            summary = approval_counts.rebuild_summary(order.id)
         
         # Aggregate logic: if all approved → approved, else if any rejected → rejected, else highest priority status
-        if not order.approval_status:
-            order.approval_status = {}
-        
-        if approved_count == total_count:
-            order.approval_status[approval_type] = 'approved'
-        elif rejected_count > 0:
-            order.approval_status[approval_type] = 'rejected'
-        elif resubmission_count > 0:
-            order.approval_status[approval_type] = 'resubmission'
-        elif submission_count > 0:
-            order.approval_status[approval_type] = 'submission'
-        
-        order.save(update_fields=['approval_status', 'updated_at'])
+        approval_counts.apply_order_approval_status(order, [approval_type], summary)
     
     @action(detail=True, methods=['post'], url_path='change-stage')
     def change_stage(self, request, pk=None):
@@ -481,8 +779,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         order.change_stage(new_stage)
         
         # Return updated order
-        response_serializer = OrderSerializer(order)
-        return Response(response_serializer.data)
+        return Response(self._order_response(order, include_history=True))
     
     @action(detail=True, methods=['patch'], url_path='lines/(?P<line_id>[^/.]+)/status')
     def update_line_status(self, request, pk=None, line_id=None):
@@ -528,8 +825,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         line.save(update_fields=['status', 'updated_at'])
         
         # Return updated order
-        response_serializer = OrderSerializer(order)
-        return Response(response_serializer.data)
+        return Response(self._order_response(order, [line]))
     
     @action(detail=True, methods=['patch'], url_path='lines/bulk-status')
     def bulk_update_line_status(self, request, pk=None):
@@ -564,11 +860,11 @@ class OrderViewSet(viewsets.ModelViewSet):
         # Get all lines for this order
         lines = OrderLine.objects.filter(style__order=order)
         updated_count = lines.update(status=new_status)
+        order_changes.touch(order.id)
         
         # Return updated order
-        response_serializer = OrderSerializer(order)
         return Response({
-            'order': response_serializer.data,
+            'order': self._order_response(order, lines),
             'updatedCount': updated_count
         })
     
@@ -633,8 +929,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         line.save(update_fields=update_fields)
         
         # Return updated order
-        response_serializer = OrderSerializer(order)
-        return Response(response_serializer.data)
+        return Response(self._order_response(order, [line]))
     
     @action(detail=True, methods=['patch'], url_path='lines/(?P<line_id>[^/.]+)/produced-quantity')
     def update_produced_quantity(self, request, pk=None, line_id=None):
@@ -703,8 +998,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         )
         
         # Return updated order
-        response_serializer = OrderSerializer(order)
-        return Response(response_serializer.data)
+        return Response(self._order_response(order, [line]))
     
     @action(detail=True, methods=['get'], url_path='documents')
     def get_documents(self, request, pk=None):
@@ -968,6 +1262,8 @@ class OrderViewSet(viewsets.ModelViewSet):
             "customTimestamp": "2024-01-15T10:30:00Z" (optional)
         }
         """
+        from .models_order_line import OrderLine
+        
         order = self.get_object()
         
         try:
@@ -986,12 +1282,17 @@ class OrderViewSet(viewsets.ModelViewSet):
             history_entry.status = serializer.validated_data['status']
             
             # Also update the line's approval_status if this is a line-level approval
-            if history_entry.order_line:
-                order_line = history_entry.order_line
-                if not order_line.approval_status:
-                    order_line.approval_status = {}
-                order_line.approval_status[history_entry.approval_type] = serializer.validated_data['status']
-                order_line.save(update_fields=['approval_status', 'updated_at'])
+            if history_entry.order_line_id:
+                # Locked so the approval count diff (apps.orders.signals) is taken against the current row
+                with transaction.atomic():
+                    order_line = OrderLine.objects.select_for_update().get(pk=history_entry.order_line_id)
+                    if not order_line.approval_status:
+                        order_line.approval_status = {}
+                    order_line.approval_status[history_entry.approval_type] = serializer.validated_data['status']
+                    order_line.save(update_fields=['approval_status', 'updated_at'])
+                    
+                    # Aggregate line approvals to order level
+                    self._aggregate_line_approvals_to_order(order, history_entry.approval_type)
         
         if 'notes' in serializer.validated_data:
             history_entry.notes = serializer.validated_data['notes']
@@ -1003,8 +1304,18 @@ class OrderViewSet(viewsets.ModelViewSet):
             ApprovalHistory.objects.filter(pk=history_entry.pk).update(
                 created_at=serializer.validated_data['customTimestamp']
             )
+            order_changes.touch(order.id)
             history_entry.refresh_from_db()
         
+        if 'status' in serializer.validated_data and history_entry.order_line_id:
+            approval_state.set_line_status(
+                order.id,
+                history_entry.order_line_id,
+                history_entry.approval_type,
+                history_entry.status,
+                changed_at=history_entry.created_at,
+            )
+        
         response_serializer = ApprovalHistorySerializer(history_entry)
         return Response(response_serializer.data)
 
@@ -1017,6 +1328,8 @@ class OrderViewSet(viewsets.ModelViewSet):
         This also updates the line's current approval_status to the previous
         status in the history, or removes it if no previous entries exist.
         """
+        from .models_order_line import OrderLine
+        
         order = self.get_object()
         
         try:
@@ -1027,36 +1340,46 @@ class OrderViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        order_line = history_entry.order_line
+        order_line_id = history_entry.order_line_id
         approval_type = history_entry.approval_type
         
-        # Delete the entry
+        # Delete the entry (sends no change feed signal, see apps.orders.signals)
         history_entry.delete()
+        order_changes.touch(order.id)
         
         # Update the line's approval_status to reflect the previous state
-        if order_line:
-            # Find the most recent remaining history entry for this approval type
-            previous_entry = ApprovalHistory.objects.filter(
-                order=order,
-                order_line=order_line,
-                approval_type=approval_type
-            ).order_by('-created_at').first()
+        if order_line_id:
+            # Locked so the approval count diff (apps.orders.signals) is taken against the current row
+            with transaction.atomic():
+                order_line = OrderLine.objects.select_for_update().get(pk=order_line_id)
+                
+                # Find the most recent remaining history entry for this approval type
+                previous_entry = ApprovalHistory.objects.filter(
+                    order=order,
+                    order_line=order_line,
+                    approval_type=approval_type
+                ).order_by('-created_at').first()
             
-            if not order_line.approval_status:
-                order_line.approval_status = {}
+                if not order_line.approval_status:
+                    order_line.approval_status = {}
             
-            if previous_entry:
-                # Set to previous status
-                order_line.approval_status[approval_type] = previous_entry.status
-            else:
-                # No history left, remove the approval status
-                if approval_type in order_line.approval_status:
-                    del order_line.approval_status[approval_type]
+                if previous_entry:
+                    # Set to previous status
+                    order_line.approval_status[approval_type] = previous_entry.status
+                    approval_state.set_line_status(
+                        order.id, order_line.id, approval_type, previous_entry.status,
+                        changed_at=previous_entry.created_at,
+                    )
+                else:
+                    # No history left, remove the approval status
+                    if approval_type in order_line.approval_status:
+                        del order_line.approval_status[approval_type]
+                    approval_state.clear_line_status(order_line.id, approval_type)
             
-            order_line.save(update_fields=['approval_status', 'updated_at'])
+                order_line.save(update_fields=['approval_status', 'updated_at'])
             
-            # Aggregate line approvals to order level
-            self._aggregate_line_approvals_to_order(order, approval_type)
+                # Aggregate line approvals to order level
+                self._aggregate_line_approvals_to_order(order, approval_type)
         
         return Response({'message': 'Approval history entry deleted successfully'}, status=status.HTTP_200_OK)
 
@@ -1196,6 +1519,7 @@ class OrderViewSet(viewsets.ModelViewSet):
             )
         
         if request.method == 'DELETE':
+            approval_state.clear_line_status(gate.order_line_id, gate.gate_key)
             gate.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
         
@@ -1210,6 +1534,9 @@ class OrderViewSet(viewsets.ModelViewSet):
             # Update the gate status
             gate.status = new_status
             gate.save(update_fields=['status', 'updated_at'])
+            approval_state.set_line_status(
+                order.id, gate.order_line_id, gate.gate_key, new_status, changed_at=custom_timestamp
+            )
             
             # Create approval history record for custom gate status change
             # Only create if status actually changed and is not 'default'
@@ -1225,6 +1552,7 @@ class OrderViewSet(viewsets.ModelViewSet):
                 # Apply custom timestamp if provided
                 if custom_timestamp:
                     ApprovalHistory.objects.filter(pk=history_entry.pk).update(created_at=custom_timestamp)
+                    order_changes.touch(order.id)
             
             response_serializer = CustomApprovalGateSerializer(gate)
             return Response(response_serializer.data)
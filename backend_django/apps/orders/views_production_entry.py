@@ -2,16 +2,22 @@
 Views for ProductionEntry model
 Handles CRUD operations for knitting, dyeing, finishing entries
 """
+from datetime import datetime, timedelta
 from decimal import Decimal
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser, FormParser
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
-from django.db.models import Sum, Count, Q
 
+from .models import Order
 from .models_production_entry import ProductionEntry, ProductionEntryType
+from .models_production_rollup import ProductionRollup
 from .models_order_line import OrderLine
+from .utils import production_rollups, production_throughput
+from .utils.production_import import ProductionImportError, import_production_entries
 from .serializers_production_entry import (
     ProductionEntrySerializer,
     ProductionEntryCreateSerializer,
@@ -19,137 +25,111 @@ from .serializers_production_entry import (
     ProductionEntryListSerializer,
     ProductionEntrySummarySerializer,
 )
+from apps.authentication.models import User
+from apps.core.db_routing import ReplicaReadsMixin
 from apps.core.permissions import IsMerchandiser
 from apps.core.models import Notification
 
 
-def update_order_line_production_dates(entry: ProductionEntry):
+def _production_date_changes(order_line: OrderLine, entry_type: str, rollup):
     """
-    Update OrderLine start/complete dates based on production entries.
+    Start/complete date fields of `order_line` for `entry_type` that differ from
+    what its rollup gives, with their new values.
     
     Logic:
     - When a knitting/dyeing entry is recorded, set the start date to earliest entry date
     - When knitting/dyeing reaches 100% complete (quantity >= target), set the complete date
+    - When no entries of the type remain, clear both dates
     
     The entry_date from the production entry becomes the start/complete date.
     """
-    order_line = entry.order_line
+    if rollup is None or not rollup.entry_count:
+        start_date = None
+        complete_date = None
+    else:
+        # Get target quantity - prefer greige_quantity if > 0, otherwise use quantity
+        greige_qty = Decimal(str(order_line.greige_quantity or 0))
+        line_qty = Decimal(str(order_line.quantity or 0))
+        target_qty = greige_qty if greige_qty > 0 else line_qty
+        
+        # Check if 100% complete
+        is_complete = target_qty > 0 and Decimal(str(rollup.total_quantity)) >= target_qty
+        
+        start_date = rollup.first_entry_date
+        complete_date = rollup.last_entry_date if is_complete else None
+    
+    if entry_type == ProductionEntryType.KNITTING:
+        fields = ('knitting_start_date', 'knitting_complete_date')
+    else:
+        fields = ('dyeing_start_date', 'dyeing_complete_date')
+    
+    return {
+        field: value for field, value in zip(fields, (start_date, complete_date))
+        if getattr(order_line, field) != value
+    }
+
+
+def update_order_line_production_dates(order_line: OrderLine, entry_type: str):
+    """Update OrderLine start/complete dates from the line's production rollup"""
     if not order_line:
         return  # No order line associated, nothing to update
     
-    entry_type = entry.entry_type
-    
     # Only handle knitting and dyeing
     if entry_type not in [ProductionEntryType.KNITTING, ProductionEntryType.DYEING]:
         return
     
-    # Refresh order_line from DB to get latest state
-    order_line.refresh_from_db()
-    
-    # Get all entries for this order line and entry type
-    entries_queryset = ProductionEntry.objects.filter(
-        order_line=order_line,
-        entry_type=entry_type
-    )
-    
-    # Calculate total quantity for this entry type
-    total_qty = entries_queryset.aggregate(
-        total=Sum('quantity')
-    )['total'] or Decimal('0')
-    
-    # Get target quantity - prefer greige_quantity if > 0, otherwise use quantity
-    greige_qty = order_line.greige_quantity or Decimal('0')
-    line_qty = order_line.quantity or Decimal('0')
-    target_qty = greige_qty if greige_qty > 0 else line_qty
-    
-    # Ensure we're comparing Decimals
-    total_qty = Decimal(str(total_qty))
-    target_qty = Decimal(str(target_qty))
-    
-    # Get the earliest entry date for start date
-    earliest_entry = entries_queryset.order_by('entry_date').first()
-    earliest_date = earliest_entry.entry_date if earliest_entry else None
-    
-    # Get the latest entry date for complete date
-    latest_entry = entries_queryset.order_by('-entry_date').first()
-    latest_date = latest_entry.entry_date if latest_entry else None
-    
-    # Check if 100% complete
-    is_complete = target_qty > 0 and total_qty >= target_qty
-    
-    if entry_type == ProductionEntryType.KNITTING:
-        # Always set start date to earliest entry
-        if earliest_date:
-            order_line.knitting_start_date = earliest_date
-        
-        # Set complete date when 100% complete
-        if is_complete and latest_date:
-            order_line.knitting_complete_date = latest_date
-        elif not is_complete:
-            order_line.knitting_complete_date = None
-    
-    elif entry_type == ProductionEntryType.DYEING:
-        # Always set start date to earliest entry
-        if earliest_date:
-            order_line.dyeing_start_date = earliest_date
-        
-        # Set complete date when 100% complete
-        if is_complete and latest_date:
-            order_line.dyeing_complete_date = latest_date
-        elif not is_complete:
-            order_line.dyeing_complete_date = None
-    
-    # Save the changes
-    order_line.save(update_fields=[
-        'knitting_start_date', 'knitting_complete_date',
-        'dyeing_start_date', 'dyeing_complete_date',
-        'updated_at'
-    ])
+    rollup = ProductionRollup.objects.filter(order_line=order_line, entry_type=entry_type).first()
+    changes = _production_date_changes(order_line, entry_type, rollup)
+    if not changes:
+        return
+    for field, value in changes.items():
+        setattr(order_line, field, value)
+    order_line.save(update_fields=list(changes) + ['updated_at'])
 
 
-def clear_order_line_production_dates_if_empty(order_line: OrderLine, entry_type: str):
+def update_order_lines_production_dates(affected):
     """
-    Clear start/complete dates if all entries of a type are deleted.
+    update_order_line_production_dates for many {(line id, entry_type): order_line}
+    at once: one rollup query, and one bulk update per set of changed fields.
+    
+    Does what OrderLine.save(update_fields=...) would - local order
+    calculations, updated_at - without a save per line, so the lines'
+    style.order must already be loaded. Sends no post_save signals (callers
+    mark the change feed themselves).
     """
-    if not order_line:
+    affected = {
+        key: order_line for key, order_line in affected.items()
+        if key[1] in [ProductionEntryType.KNITTING, ProductionEntryType.DYEING]
+    }
+    if not affected:
         return
     
-    # Check if any entries of this type remain
-    remaining_entries = ProductionEntry.objects.filter(
-        order_line=order_line,
-        entry_type=entry_type
-    ).exists()
-    
-    if remaining_entries:
-        return  # Still have entries, dates will be updated by update_order_line_production_dates
-    
-    updated = False
-    
-    if entry_type == ProductionEntryType.KNITTING:
-        if order_line.knitting_start_date is not None:
-            order_line.knitting_start_date = None
-            updated = True
-        if order_line.knitting_complete_date is not None:
-            order_line.knitting_complete_date = None
-            updated = True
-    
-    elif entry_type == ProductionEntryType.DYEING:
-        if order_line.dyeing_start_date is not None:
-            order_line.dyeing_start_date = None
-            updated = True
-        if order_line.dyeing_complete_date is not None:
-            order_line.dyeing_complete_date = None
-            updated = True
+    rollups = {
+        (rollup.order_line_id, rollup.entry_type): rollup
+        for rollup in ProductionRollup.objects.filter(
+            order_line_id__in={line_id for line_id, _ in affected},
+            entry_type__in={entry_type for _, entry_type in affected},
+        )
+    }
+    changed = {}
+    for key, order_line in affected.items():
+        changes = _production_date_changes(order_line, key[1], rollups.get(key))
+        for field, value in changes.items():
+            setattr(order_line, field, value)
+        if changes:
+            changed.setdefault(order_line.pk, (order_line, set()))[1].update(changes)
     
-    if updated:
-        order_line.save(update_fields=[
-            'knitting_start_date', 'knitting_complete_date',
-            'dyeing_start_date', 'dyeing_complete_date',
-            'updated_at'
-        ])
+    now = timezone.now()
+    groups = {}
+    for order_line, fields in changed.values():
+        order_line.apply_local_order_calculations(order_line.style.order)
+        order_line.updated_at = now
+        groups.setdefault(tuple(sorted(fields)), []).append(order_line)
+    for fields, order_lines in groups.items():
+        OrderLine.objects.bulk_update(order_lines, list(fields) + ['updated_at'])
 
 
-class ProductionEntryViewSet(viewsets.ModelViewSet):
+class ProductionEntryViewSet(ReplicaReadsMixin, viewsets.ModelViewSet):
     """
     ViewSet for ProductionEntry CRUD operations
     
@@ -160,6 +140,8 @@ class ProductionEntryViewSet(viewsets.ModelViewSet):
     - PATCH /production-entries/{id}/ - Update entry
     - DELETE /production-entries/{id}/ - Delete entry
     - GET /production-entries/summary/?order={id} - Get aggregated summary for an order
+    - POST /production-entries/import/ - Import entries from an XLSX/CSV factory sheet
+    - GET /production-entries/throughput/ - Quantity per day/week/month per entry type
     """
     queryset = ProductionEntry.objects.select_related(
         'order', 'order_line', 'order_line__style', 'created_by'
@@ -171,6 +153,9 @@ class ProductionEntryViewSet(viewsets.ModelViewSet):
     ordering_fields = ['entry_date', 'created_at', 'quantity', 'entry_type']
     ordering = ['-entry_date', '-created_at']
     pagination_class = None  # Disable pagination - frontend expects array directly
+    # Served from the read replica when configured; throughput is not, its
+    # cache must not be filled from lagging data
+    replica_actions = {'list', 'summary'}
     
     def get_serializer_class(self):
         """Return appropriate serializer based on action"""
@@ -223,7 +208,7 @@ class ProductionEntryViewSet(viewsets.ModelViewSet):
         entry = serializer.save(created_by=request.user)
         
         # Update order line production dates (start/complete) based on this entry
-        update_order_line_production_dates(entry)
+        update_order_line_production_dates(entry.order_line, entry.entry_type)
         
         # Create notification for the order's merchandiser
         order = entry.order
@@ -248,6 +233,8 @@ class ProductionEntryViewSet(viewsets.ModelViewSet):
         """Update entry with custom response"""
         partial = kwargs.pop('partial', False)
         instance = self.get_object()
+        previous_line = instance.order_line
+        previous_type = instance.entry_type
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
@@ -255,8 +242,12 @@ class ProductionEntryViewSet(viewsets.ModelViewSet):
         # Re-fetch instance to get updated data
         instance.refresh_from_db()
         
-        # Update order line production dates (start/complete) based on this entry
-        update_order_line_production_dates(instance)
+        # Update order line production dates (start/complete) based on this entry,
+        # and on the line/type it was moved away from
+        update_order_line_production_dates(instance.order_line, instance.entry_type)
+        if previous_line and (previous_line.id != instance.order_line_id or previous_type != instance.entry_type):
+            previous_line.refresh_from_db()
+            update_order_line_production_dates(previous_line, previous_type)
         
         # Return full entry data
         response_serializer = ProductionEntrySerializer(instance)
@@ -273,21 +264,8 @@ class ProductionEntryViewSet(viewsets.ModelViewSet):
         # Delete the entry
         instance.delete()
         
-        # Clear or recalculate order line dates after deletion
-        if order_line and entry_type in [ProductionEntryType.KNITTING, ProductionEntryType.DYEING]:
-            # Check if any entries remain for this type
-            remaining_entries = ProductionEntry.objects.filter(
-                order_line=order_line,
-                entry_type=entry_type
-            )
-            
-            if remaining_entries.exists():
-                # Recalculate dates using the first remaining entry
-                first_remaining = remaining_entries.first()
-                update_order_line_production_dates(first_remaining)
-            else:
-                # No entries left, clear the dates
-                clear_order_line_production_dates_if_empty(order_line, entry_type)
+        # Recalculate (or clear) order line dates from the remaining entries
+        update_order_line_production_dates(order_line, entry_type)
         
         return Response(status=status.HTTP_204_NO_CONTENT)
     
@@ -308,22 +286,189 @@ class ProductionEntryViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        queryset = self.get_queryset().filter(order_id=order_id)
+        # Read totals from the rollups, scoped like get_queryset()
+        rollups = ProductionRollup.objects.filter(order_id=order_id)
+        if request.user.role == 'merchandiser':
+            rollups = rollups.filter(order__merchandiser=request.user)
+        entry_type = request.query_params.get('entry_type')
+        if entry_type:
+            rollups = rollups.filter(entry_type=entry_type)
         
         # Optionally filter by order line
         order_line_id = request.query_params.get('order_line')
         if order_line_id:
-            queryset = queryset.filter(order_line_id=order_line_id)
+            rollups = rollups.filter(order_line_id=order_line_id)
         
-        # Aggregate by entry type
-        summary = queryset.aggregate(
-            total_knitting=Sum('quantity', filter=Q(entry_type=ProductionEntryType.KNITTING)),
-            total_dyeing=Sum('quantity', filter=Q(entry_type=ProductionEntryType.DYEING)),
-            total_finishing=Sum('quantity', filter=Q(entry_type=ProductionEntryType.FINISHING)),
-            knitting_entries_count=Count('id', filter=Q(entry_type=ProductionEntryType.KNITTING)),
-            dyeing_entries_count=Count('id', filter=Q(entry_type=ProductionEntryType.DYEING)),
-            finishing_entries_count=Count('id', filter=Q(entry_type=ProductionEntryType.FINISHING)),
-        )
+        summary = production_rollups.summarize(rollups)
         
         serializer = ProductionEntrySummarySerializer(summary)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser, FormParser])
+    def import_entries(self, request):
+        """
+        Import production entries from a factory spreadsheet (XLSX or CSV)
+        
+        Form data:
+        - file: the sheet (columns: PO, Style, Color, CAD, Type, Date, Quantity, Unit, Notes)
+        
+        Valid rows are inserted in one batch; rows that cannot be matched or
+        validated are skipped and reported by spreadsheet row number. Line
+        start/complete dates are recalculated once per affected line and each
+        order's merchandiser gets one summary notification.
+        """
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({'error': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        orders = Order.objects.select_related('merchandiser')
+        if request.user.role == 'merchandiser':
+            orders = orders.filter(merchandiser=request.user)
+        
+        try:
+            entries, errors = import_production_entries(upload, orders, request.user)
+        except ProductionImportError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Recalculate line dates once per affected line and entry type, in bulk
+        affected = {}
+        for entry in entries:
+            if entry.order_line is not None:
+                # Already loaded; OrderLine local order calculations read it
+                entry.order_line.style.order = entry.order
+                affected.setdefault((entry.order_line.id, entry.entry_type), entry.order_line)
+        update_order_lines_production_dates(affected)
+        
+        # One notification per order summarizing its imported entries
+        imported = {}
+        for entry in entries:
+            order_summary = imported.setdefault(entry.order.id, {'order': entry.order, 'count': 0, 'totals': {}})
+            order_summary['count'] += 1
+            key = (entry.get_entry_type_display().lower(), entry.unit)
+            order_summary['totals'][key] = order_summary['totals'].get(key, Decimal('0')) + entry.quantity
+        for order_summary in imported.values():
+            order = order_summary['order']
+            if order.merchandiser and order.merchandiser != request.user:
+                totals = ', '.join(
+                    f"{entry_type} {quantity} {unit}" for (entry_type, unit), quantity in order_summary['totals'].items()
+                )
+                Notification.objects.create(
+                    user=order.merchandiser,
+                    title='Production Entries Imported',
+                    message=f"{order_summary['count']} production entries were imported for order {order.order_number} ({totals})",
+                    notification_type='production_entry_recorded',
+                    related_id=str(order.id),
+                    related_type='order'
+                )
+        
+        return Response({
+            'createdCount': len(entries),
+            'errorCount': len(errors),
+            'errors': errors,
+            'orders': [
+                {
+                    'id': str(order_summary['order'].id),
+                    'orderNumber': order_summary['order'].order_number,
+                    'createdCount': order_summary['count'],
+                }
+                for order_summary in imported.values()
+            ],
+        }, status=status.HTTP_201_CREATED if entries else status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=False, methods=['get'])
+    def throughput(self, request):
+        """
+        Production output over time, per entry type
+        
+        Query params:
+        - interval: day | week | month (default: day; weeks start on Monday)
+        - group_by: factory | order | line | merchandiser (default: factory)
+        - date_from / date_to: YYYY-MM-DD (default: the last 30 days). The range
+          is widened to whole buckets.
+        - entry_type: only this entry type (optional)
+        - order: only this order (optional)
+        
+        Every bucket is present in every series (zero-filled).
+        """
+        params = request.query_params
+        interval = params.get('interval', 'day')
+        group_by = params.get('group_by', 'factory')
+        if interval not in production_throughput.INTERVALS:
+            return Response({'error': 'interval must be day, week or month'}, status=status.HTTP_400_BAD_REQUEST)
+        if group_by not in production_throughput.GROUP_FIELDS:
+            return Response({'error': 'group_by must be factory, order, line or merchandiser'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        today = timezone.localdate()
+        try:
+            date_to = datetime.strptime(params['date_to'], '%Y-%m-%d').date() if params.get('date_to') else today
+            date_from = datetime.strptime(params['date_from'], '%Y-%m-%d').date() if params.get('date_from') else date_to - timedelta(days=29)
+        except ValueError:
+            return Response({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        if date_from > date_to:
+            return Response({'error': 'date_from must not be after date_to'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        entry_type = params.get('entry_type')
+        if entry_type and entry_type not in ProductionEntryType.values:
+            return Response({'error': 'Invalid entry_type'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        entries = ProductionEntry.objects.all()
+        scope = 'all'
+        if request.user.role == 'merchandiser':
+            entries = entries.filter(order__merchandiser=request.user)
+            scope = f'merchandiser:{request.user.id}'
+        if entry_type:
+            entries = entries.filter(entry_type=entry_type)
+        order_id = params.get('order')
+        if order_id:
+            entries = entries.filter(order_id=order_id)
+        
+        try:
+            buckets, series = production_throughput.throughput(
+                entries, interval, group_by, date_from, date_to,
+                cache_scope=f'{scope}|{entry_type or ""}|{order_id or ""}',
+                today=today,
+            )
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        filled = production_throughput.zero_filled(
+            buckets, series, group_by, [entry_type] if entry_type else None
+        )
+        labels = self._throughput_labels(group_by, {item['key'] for item in filled if item['key']})
+        for item in filled:
+            item['label'] = labels.get(item['key'])
+            item['total'] = sum(item['quantities'])
+        filled.sort(key=lambda item: ((item['label'] or ''), item['key'] or '', item['entryType']))
+        
+        return Response({
+            'interval': interval,
+            'groupBy': group_by,
+            'dateFrom': buckets[0].isoformat(),
+            'dateTo': (production_throughput.next_bucket(buckets[-1], interval) - timedelta(days=1)).isoformat(),
+            'buckets': [bucket.isoformat() for bucket in buckets],
+            'series': filled,
+        })
+    
+    @staticmethod
+    def _throughput_labels(group_by, keys):
+        """Display labels for throughput group keys (None = entries without a group)"""
+        labels = {None: {
+            'factory': 'All production',
+            'line': 'Order-level entries',
+            'merchandiser': 'Unassigned',
+        }.get(group_by)}
+        if not keys:
+            return labels
+        if group_by == 'order':
+            rows = Order.objects.filter(id__in=keys).values_list('id', 'order_number')
+            labels.update({str(pk): label for pk, label in rows})
+        elif group_by == 'line':
+            lines = OrderLine.objects.filter(id__in=keys).select_related('style__order')
+            labels.update({
+                str(line.id): f"{line.style.order.order_number} / {line.line_label}"
+                for line in lines
+            })
+        elif group_by == 'merchandiser':
+            rows = User.objects.filter(id__in=keys).values_list('id', 'full_name')
+            labels.update({str(pk): label for pk, label in rows})
+        return labels
@@ -13,12 +13,14 @@ from .serializers_supplier_delivery import (
     SupplierDeliveryUpdateSerializer,
     SupplierDeliveryListSerializer
 )
+from apps.authentication.user_details import UserDetailsMixin
+from apps.core.db_routing import ReplicaReadsMixin
 from apps.core.permissions import IsMerchandiser
 from apps.core.models import Notification
 from apps.authentication.models import User
 
 
-class SupplierDeliveryViewSet(viewsets.ModelViewSet):
+class SupplierDeliveryViewSet(ReplicaReadsMixin, UserDetailsMixin, viewsets.ModelViewSet):
     """
     ViewSet for SupplierDelivery CRUD operations
     
@@ -37,6 +39,7 @@ class SupplierDeliveryViewSet(viewsets.ModelViewSet):
     ordering_fields = ['delivery_date', 'created_at', 'delivered_quantity']
     ordering = ['-delivery_date', '-created_at']
     pagination_class = None  # Disable pagination - frontend expects array directly
+    replica_actions = {'list'}  # Served from the read replica when configured
     
     def get_serializer_class(self):
         """Return appropriate serializer based on action"""
@@ -65,6 +65,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.core.middleware.RequestMetricsMiddleware',  # First, so timings cover the whole request
+    'apps.core.middleware.RequestProfilingMiddleware',  # Admin requests with the X-Profile header
+    'apps.core.middleware.ReplicaPinningMiddleware',  # Only with REPLICA_DATABASE_URL and CACHE_SHARED
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Serve static files
     'corsheaders.middleware.CorsMiddleware',  # CORS - must be before CommonMiddleware
@@ -112,6 +115,35 @@ DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
 DATABASES['default']['CONN_MAX_AGE'] = 60  # Keep connections alive for 60 seconds
 DATABASES['default']['CONN_HEALTH_CHECKS'] = True  # Check connection health before use
 
+# Optional read replica: reporting and read-only endpoints read from it, writes and
+# reads after a write stay on default (apps.core.db_routing). For local testing,
+# point it at a second database alias, e.g. the same database under another URL.
+REPLICA_DATABASE_URL = env('REPLICA_DATABASE_URL', default='')
+if REPLICA_DATABASE_URL:
+    DATABASES['replica'] = env.db('REPLICA_DATABASE_URL')
+    DATABASES['replica']['DISABLE_SERVER_SIDE_CURSORS'] = True
+    DATABASES['replica']['CONN_MAX_AGE'] = 60
+    DATABASES['replica']['CONN_HEALTH_CHECKS'] = True
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}  # Tests read their own writes
+DATABASE_ROUTERS = ['apps.core.db_routing.ReplicaRouter']
+# Seconds a user's reads stay on default after a write request. Pins are kept in the cache, so
+# replica reads need a shared cache across workers (CACHE_SHARED); with per-process memory all
+# reads stay on default.
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', default=5)
+
+# Cache
+# Defaults to per-process memory. Use a shared backend when running several workers
+# so cached reports are invalidated everywhere, e.g. CACHE_URL=dbcache://django_cache
+# (then run `python manage.py createcachetable`) or CACHE_URL=redis://host:6379/0
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+# Per-process memory is not shared between workers: an entry invalidated in one
+# worker stays live in the others. Caches invalidated on writes are off without it.
+CACHE_SHARED = CACHES['default']['BACKEND'] != 'django.core.cache.backends.locmem.LocMemCache'
+# Seconds closed production throughput buckets stay cached (0 = off); always off without CACHE_SHARED
+PRODUCTION_THROUGHPUT_CACHE_SECONDS = env.int('PRODUCTION_THROUGHPUT_CACHE_SECONDS', default=24 * 3600) if CACHE_SHARED else 0
+
 # Custom User Model
 AUTH_USER_MODEL = 'authentication.User'
 
@@ -176,7 +208,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.authentication.authentication.CachedJWTAuthentication',
     ),
     # Don't set default permission - let views define their own
     # This allows login/register to be public while other endpoints require auth
@@ -188,7 +220,7 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ),
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
+        'apps.core.renderers.FastJSONRenderer',  # JSONRenderer output, encoded with orjson
         'rest_framework.renderers.BrowsableAPIRenderer',
     ),
     'EXCEPTION_HANDLER': 'apps.core.exceptions.custom_exception_handler',
@@ -216,8 +248,15 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
+    # Rotated and logged-out refresh tokens are recorded in RevokedToken (apps.authentication.tokens)
+    'TOKEN_REFRESH_SERIALIZER': 'apps.authentication.serializers.RevocableTokenRefreshSerializer',
 }
 
+# Seconds an authenticated user is cached by id (apps.authentication.authentication); 0 disables.
+# Needs a shared cache across workers (CACHE_SHARED): a user saved in one worker would keep
+# their cached is_active and role in the others. Always off with per-process memory.
+JWT_USER_CACHE_SECONDS = env.int('JWT_USER_CACHE_SECONDS', default=60) if CACHE_SHARED else 0
+
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = env.list(
     'CORS_ALLOWED_ORIGINS',
@@ -234,7 +273,9 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'x-profile',
 ]
+CORS_EXPOSE_HEADERS = ['x-profile-id', 'server-timing']
 
 # Cloudflare R2 Storage Configuration (S3-compatible)
 R2_ACCESS_KEY_ID = env('R2_ACCESS_KEY_ID', default='')
@@ -288,6 +329,35 @@ ALLOWED_FILE_EXTENSIONS = env.list(
     default=['.pdf', '.jpg', '.jpeg', '.png', '.doc', '.docx', '.xls', '.xlsx']
 )
 
+# In-process scheduler (python manage.py run_scheduler)
+# Jobs are guarded by database leases so several instances can run safely
+SCHEDULER_POLL_SECONDS = env.int('SCHEDULER_POLL_SECONDS', default=30)
+SCHEDULER_LEASE_SECONDS = env.int('SCHEDULER_LEASE_SECONDS', default=900)  # Max expected job runtime
+SCHEDULER_ALERT_INTERVAL_SECONDS = env.int('SCHEDULER_ALERT_INTERVAL_SECONDS', default=3600)
+SCHEDULER_MEDIA_CLEANUP_INTERVAL_SECONDS = env.int('SCHEDULER_MEDIA_CLEANUP_INTERVAL_SECONDS', default=86400)
+SCHEDULER_TOKEN_PRUNE_INTERVAL_SECONDS = env.int('SCHEDULER_TOKEN_PRUNE_INTERVAL_SECONDS', default=86400)
+# Unreferenced files under MEDIA_ROOT older than this are deleted by cleanup_media
+MEDIA_CLEANUP_MAX_AGE_DAYS = env.int('MEDIA_CLEANUP_MAX_AGE_DAYS', default=30)
+
+# Per-request timing and query metrics (apps.core.middleware.RequestMetricsMiddleware)
+# Requests at or over any threshold are logged as warnings with their most repeated SQL
+REQUEST_METRICS_ENABLED = env.bool('REQUEST_METRICS_ENABLED', default=True)
+REQUEST_METRICS_SLOW_MS = env.int('REQUEST_METRICS_SLOW_MS', default=1000)
+REQUEST_METRICS_MAX_QUERIES = env.int('REQUEST_METRICS_MAX_QUERIES', default=50)
+REQUEST_METRICS_MAX_DUPLICATES = env.int('REQUEST_METRICS_MAX_DUPLICATES', default=10)
+REQUEST_METRICS_TOP_STATEMENTS = env.int('REQUEST_METRICS_TOP_STATEMENTS', default=5)
+
+# On-demand profiling (apps.core.profiling): admin requests sending PROFILING_HEADER
+# run under cProfile; artifacts go to PROFILING_DIR and are served at /api/v1/profiles/
+PROFILING_ENABLED = env.bool('PROFILING_ENABLED', default=True)
+PROFILING_HEADER = env('PROFILING_HEADER', default='X-Profile')
+PROFILING_DIR = env('PROFILING_DIR', default=os.path.join(BASE_DIR, 'profiles'))
+PROFILING_MAX_BYTES = env.int('PROFILING_MAX_BYTES', default=2 * 1024 * 1024)  # Per artifact
+PROFILING_MAX_FILES = env.int('PROFILING_MAX_FILES', default=50)
+PROFILING_RETENTION_HOURS = env.int('PROFILING_RETENTION_HOURS', default=24)
+PROFILING_MAX_STATEMENTS = env.int('PROFILING_MAX_STATEMENTS', default=1000)
+PROFILING_TOP_FUNCTIONS = env.int('PROFILING_TOP_FUNCTIONS', default=100)
+
 # Logging Configuration
 # For production (DigitalOcean App Platform), only use console logging
 # File logging doesn't work reliably on ephemeral container filesystems
@@ -321,6 +391,11 @@ LOGGING = {
             'level': 'WARNING',  # Reduce DB query noise in production
             'propagate': False,
         },
+        'apps.request_metrics': {
+            'handlers': ['console'],
+            'level': env('REQUEST_METRICS_LOG_LEVEL', default='INFO'),  # WARNING: only requests over thresholds
+            'propagate': False,
+        },
     },
 }
 
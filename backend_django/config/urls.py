@@ -10,7 +10,7 @@ from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from apps.orders.views import OrderViewSet
 from rest_framework.routers import DefaultRouter
-from apps.core.views import NotificationViewSet, document_delete_view
+from apps.core.views import NotificationViewSet, document_delete_view, profile_download_view, profile_list_view
 
 # Swagger/OpenAPI Schema
 schema_view = get_schema_view(
@@ -82,6 +82,10 @@ urlpatterns = [
     
     # Notifications API
     path('api/v1/notifications/', include(notifications_router.urls)),
+
+    # Request profiles (admin only, see apps.core.profiling)
+    path('api/v1/profiles/', profile_list_view, name='profile-list'),
+    path('api/v1/profiles/<str:profile_id>/', profile_download_view, name='profile-download'),
     
     # =====================================================================
     # Duplicate routes for /v1/... (without /api prefix)
@@ -101,6 +105,8 @@ urlpatterns = [
     path('v1/production/', include('apps.production.urls')),
     path('v1/shipments/', include('apps.shipments.urls')),
     path('v1/notifications/', include(notifications_router.urls)),
+    path('v1/profiles/', profile_list_view, name='profile-list-v1'),
+    path('v1/profiles/<str:profile_id>/', profile_download_view, name='profile-download-v1'),
 ]
 
 # Serve media files in development